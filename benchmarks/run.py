@@ -0,0 +1,211 @@
+"""Benchmark the game states and the search.
+
+Measures the throughput of the `TicTacToeState` and `BitboardTicTacToeState`
+operations, random playouts per second on those and on 15 x 15 Gomoku
+boards, `MCTSAgent` iterations per second at
+several budgets, the peak memory of a search and the bytes allocated per
+`Node`. All random choices are seeded, so runs are comparable.
+
+Results are written as JSON. Pass a previous result file with --baseline to
+compare against it; the exit status is non-zero if any benchmark regressed by
+more than the tolerance.
+
+Usage:
+    python benchmarks/run.py [--output FILE] [--baseline FILE] [--tolerance FRACTION] [--quick]
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from random import Random
+
+from mcts.mcts import MCTSAgent, playout
+from mcts.ttt import TicTacToeState, BitboardTicTacToeState
+from mcts.mnk import MNKState
+
+BUDGETS = (100, 1000, 5000)
+
+def measure(fn, min_time: float, repeat: int = 3) -> float:
+    """Time a function and return its best rate, in calls per second.
+
+    The function is called in a loop for at least `min_time` seconds, `repeat`
+    times, and the fastest loop is reported.
+    """
+    best = 0.0
+    for _ in range(repeat):
+        calls = 0
+        start = time.perf_counter()
+        while True:
+            fn()
+            calls += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, calls / elapsed)
+    return best
+
+
+def positions(state_cls, count: int, seed: int):
+    """Generate undecided positions reached by random play."""
+    rng = Random(seed)
+    result = []
+    while len(result) < count:
+        state = state_cls()
+        for _ in range(rng.randrange(7)):
+            if state.outcome.is_decided:
+                break
+            state = state.next_move(state.current_player, rng.choice(state.possible_moves()))
+        if state.outcome.is_undecided:
+            result.append(state)
+    return result
+
+
+def copy_state(state):
+    """Recreate a state, so that nothing about it is cached yet."""
+    if isinstance(state, BitboardTicTacToeState):
+        return BitboardTicTacToeState(state.boards, state.players, state._turn, state.zobrist)
+    return TicTacToeState([list(row) for row in state.rows], zobrist=state.zobrist)
+
+
+def bench_states(results: dict, min_time: float):
+    """Benchmark outcome, possible_moves and next_move of each state class."""
+    for state_cls in (TicTacToeState, BitboardTicTacToeState):
+        name = state_cls.__name__
+        states = positions(state_cls, 64, seed=0)
+        moves = [state.possible_moves()[0] for state in states]
+
+        # Every outcome is computed on a state that has not cached it yet
+        fresh = [copy_state(state) for state in states for _ in range(200)]
+        start = time.perf_counter()
+        for state in fresh:
+            state.outcome
+        rate = len(fresh) / (time.perf_counter() - start)
+        record(results, f"{name}.outcome", rate, "ops/s")
+
+        rate = measure(lambda: [state.possible_moves() for state in states], min_time) * len(states)
+        record(results, f"{name}.possible_moves", rate, "ops/s")
+
+        rate = measure(lambda: [state.next_move(state.current_player, move) for state, move in zip(states, moves)], min_time) * len(states)
+        record(results, f"{name}.next_move", rate, "ops/s")
+
+        rng = Random(0)
+        rate = measure(lambda: playout(state_cls(), rng), min_time)
+        record(results, f"{name}.playout", rate, "playouts/s")
+
+    rng = Random(0)
+    rate = measure(lambda: playout(MNKState(15, 15, 5), rng), min_time)
+    record(results, "MNKState[15,15,5].playout", rate, "playouts/s")
+
+
+def fresh_agent(iterations: int) -> MCTSAgent:
+    """Create an agent about to search the start state with a seeded tree."""
+    agent = MCTSAgent(iterations=iterations, seed=0)
+    agent.reset(BitboardTicTacToeState())
+    return agent
+
+
+def search_rate(iterations: int, min_time: float, repeat: int = 3) -> float:
+    """Time seeded searches and return the best rate, in iterations per second.
+
+    The same search is repeated for at least `repeat` times `min_time`
+    seconds, and at least `repeat` times, and the fastest search is reported,
+    which is the one least disturbed by the rest of the system. Iterations
+    are counted as run, since a search stops early once its root is proven.
+    """
+    best = 0.0
+    runs = 0
+    total = 0.0
+    while runs < repeat or total < repeat * min_time:
+        # Only the search is timed, not the set up of the tree
+        agent = fresh_agent(iterations)
+        start = time.perf_counter()
+        run = agent.search()
+        elapsed = time.perf_counter() - start
+        best = max(best, run / elapsed)
+        runs += 1
+        total += elapsed
+    return best
+
+
+def bench_search(results: dict, budgets, min_time: float):
+    """Benchmark MCTSAgent iterations per second, peak memory and bytes per node."""
+    for iterations in budgets:
+        # Time the search without tracing, since tracing slows it down
+        rate = search_rate(iterations, min_time)
+        record(results, f"MCTSAgent.iterations_per_second[{iterations}]", rate, "it/s")
+
+        # Repeat the same seeded search to measure its memory
+        agent = fresh_agent(iterations)
+        tracemalloc.start()
+        agent.search()
+        size, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        record(results, f"MCTSAgent.peak_memory[{iterations}]", peak, "bytes", higher_is_better=False)
+        record(results, f"Node.bytes_per_node[{iterations}]", size / agent.node_count, "bytes", higher_is_better=False)
+
+
+def record(results: dict, name: str, value: float, unit: str, higher_is_better: bool = True):
+    """Add a benchmark result."""
+    results[name] = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+    print(f"{name:48} {value:14.1f} {unit}", file=sys.stderr)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Compare results against a baseline.
+
+    Returns:
+        The names of the benchmarks that regressed by more than `tolerance`.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result["value"] / baseline[name]["value"]
+        if not result["higher_is_better"]:
+            ratio = 1 / ratio
+
+        status = "REGRESSED" if ratio < 1 - tolerance else "ok"
+        if status != "ok":
+            regressions.append(name)
+        print(f"{name:48} {ratio:6.2f}x baseline  {status}", file=sys.stderr)
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="File to write the results to, instead of stdout")
+    parser.add_argument("--baseline", help="Result file of a previous run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed fractional slowdown before failing")
+    parser.add_argument("--quick", action="store_true", help="Run shorter benchmarks, e.g. as a smoke test")
+    args = parser.parse_args()
+
+    results = {}
+    min_time = 0.05 if args.quick else 0.5
+    bench_states(results, min_time)
+    bench_search(results, BUDGETS[:2] if args.quick else BUDGETS, min_time)
+
+    report = {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
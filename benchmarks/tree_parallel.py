@@ -0,0 +1,51 @@
+"""Compare tree-parallel search against sequential search.
+
+Runs a fixed-time search from the start of a Tic Tac Toe game with the
+sequential `MCTSAgent` and with `TreeParallelMCTSAgent` at 1, 2, 4 and 8
+threads, and prints the iterations per second of each. Every iteration plays
+out one game. Thread scaling is only expected on free-threaded builds of
+Python.
+
+Usage:
+    python benchmarks/tree_parallel.py [--time-limit SECONDS] [--repeat N]
+"""
+import argparse
+import sys
+
+from mcts.mcts import MCTSAgent
+from mcts.parallel import TreeParallelMCTSAgent
+from mcts.ttt import BitboardTicTacToeState
+
+THREADS = (1, 2, 4, 8)
+
+def iterations_per_second(agent: MCTSAgent, time_limit: float) -> float:
+    """Search the start state with a fresh tree and measure the throughput."""
+    agent.reset(BitboardTicTacToeState())
+    return agent.search() / time_limit
+
+
+def parallel_iterations_per_second(threads: int, time_limit: float, seed: int) -> float:
+    """Measure the throughput of a seeded tree-parallel search."""
+    with TreeParallelMCTSAgent(threads, time_limit=time_limit, seed=seed) as agent:
+        return iterations_per_second(agent, time_limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--time-limit", type=float, default=1.0, help="Seconds to search per run")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per configuration; the best is reported")
+    args = parser.parse_args()
+
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if is_gil_enabled else 'disabled'}")
+
+    sequential = max(iterations_per_second(MCTSAgent(time_limit=args.time_limit, seed=seed), args.time_limit) for seed in range(args.repeat))
+    print(f"{'sequential':>12}  {sequential:10.0f} it/s  {1:5.2f}x")
+
+    for threads in THREADS:
+        rate = max(parallel_iterations_per_second(threads, args.time_limit, seed) for seed in range(args.repeat))
+        print(f"{f'{threads} threads':>12}  {rate:10.0f} it/s  {rate / sequential:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
-from . import ttt
+from . import ttt, mnk
 
 games = [
-    ttt.TicTacToeState
+    ttt.TicTacToeState,
+    ttt.BitboardTicTacToeState,
+    mnk.MNKState,
 ]
\ No newline at end of file
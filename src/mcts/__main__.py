@@ -1,11 +1,67 @@
+"""Play Tic Tac Toe against the MCTS agent, or analyze positions in bulk.
+
+Usage:
+    python -m mcts
+    python -m mcts analyze [INPUT] [--output FILE] [--iterations N]
+        [--time-limit SECONDS] [--workers N] [--cache FILE]
+
+In analyze mode, positions such as "X_O/_X_/___" are read one per line from
+INPUT, or stdin if it is omitted or "-". One line of JSON with the best move,
+value and visit counts is written per position, in input order.
+"""
+import argparse
+import json
+import sys
+
 from .game import Game
-from .ttt import TicTacToeState
+from .ttt import BitboardTicTacToeState
 from .agents import ConsoleAgent
 from .mcts import MCTSAgent
+from .analysis import AnalysisCache, analyze_stream
 
-def main():
-    g = Game(TicTacToeState(), {"X": ConsoleAgent(), "O": MCTSAgent()})
+def play():
+    g = Game(BitboardTicTacToeState(), {"X": ConsoleAgent(), "O": MCTSAgent()})
     g.play()
 
-print()
-main()
\ No newline at end of file
+
+def analyze(args):
+    input = sys.stdin if args.input == "-" else open(args.input)
+    output = sys.stdout if args.output is None else open(args.output, "w")
+    cache = AnalysisCache(args.cache) if args.cache is not None else None
+
+    try:
+        for result in analyze_stream(input, args.iterations, args.time_limit, args.workers, cache):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if input is not sys.stdin:
+            input.close()
+        if output is not sys.stdout:
+            output.close()
+        if cache is not None:
+            print(f"Cache: {cache.hits} hits, {cache.misses} misses, {len(cache)} positions", file=sys.stderr)
+            cache.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m mcts", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command")
+
+    analyze_parser = commands.add_parser("analyze", help="Analyze a stream of positions and write the results as JSONL")
+    analyze_parser.add_argument("input", nargs="?", default="-", help="File of positions, one per line (default: stdin)")
+    analyze_parser.add_argument("--output", "-o", help="File to write the results to, instead of stdout")
+    analyze_parser.add_argument("--iterations", type=int, help="Search iterations per position")
+    analyze_parser.add_argument("--time-limit", type=float, help="Seconds of search per position")
+    analyze_parser.add_argument("--workers", type=int, default=1, help="Number of worker processes")
+    analyze_parser.add_argument("--cache", help="JSONL file caching results between runs")
+
+    args = parser.parse_args(argv)
+    if args.command == "analyze":
+        analyze(args)
+    else:
+        print()
+        play()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 from abc import ABCMeta, abstractmethod
 from typing import Any
+from random import Random
 
 from .state import AbstractState
 
@@ -22,7 +23,7 @@ class Agent(metaclass=ABCMeta):
     @abstractmethod
     def observe_move(self, player: Any, move: Any, new_state: AbstractState) -> None:
         """
-        Observe a move made by a different player agent.
+        Observe a move made by any player agent, including this one.
 
         Args:
             player: The player that makes the move
@@ -93,4 +94,35 @@ class ConsoleAgent(Agent):
         Args:
             state: The current game state.
         """
-        print(state)
\ No newline at end of file
+        print(state)
+
+
+class RandomAgent(Agent):
+    """Makes uniformly random moves.
+
+    Useful as a baseline opponent when measuring the strength of other agents.
+    """
+
+    def __init__(self, rng: Random = None):
+        """
+        Args:
+            rng: The random object used to pick moves.
+        """
+        self.rng = Random() if rng is None else rng
+
+    def make_move(self, state: AbstractState) -> Any:
+        """Pick a random possible move.
+
+        Args:
+            state: The current state of the game.
+
+        Returns:
+            A move chosen uniformly from `state.possible_moves()`.
+        """
+        return self.rng.choice(list(state.possible_moves()))
+
+    def observe_move(self, player: Any, move: Any, new_state: AbstractState) -> None:
+        pass
+
+    def see_state(self, state: AbstractState) -> None:
+        pass
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, TextIO
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import hashlib
+import json
+
+from .mcts import MCTSAgent
+from .state import credit
+from .ttt import BitboardTicTacToeState
+
+# Characters accepted for an empty square in a position
+EMPTY_SQUARES = "_. -"
+
+def parse_position(text: str, players=("X", "O")) -> BitboardTicTacToeState:
+    """Parse a Tic Tac Toe position.
+
+    Positions are written row by row, top to bottom, optionally separated by
+    "/", with "_", ".", " " or "-" for empty squares, e.g. "X_O/_X_/___". The
+    first player moves next if both players have made as many moves, and the
+    second player otherwise.
+
+    Args:
+        text:
+            The position to parse.
+        players:
+            The player symbols, in turn order.
+
+    Returns:
+        The game state of the position.
+
+    Raises:
+        ValueError: If the text is not a valid position.
+    """
+    N = BitboardTicTacToeState.N
+    squares = text.replace("/", "")
+    if len(squares) != N * N:
+        raise ValueError(f"Invalid position: {text!r} does not have {N * N} squares")
+
+    boards = [0] * len(players)
+    for sq, mark in enumerate(squares):
+        if mark in EMPTY_SQUARES:
+            continue
+        if mark not in players:
+            raise ValueError(f"Invalid position: {text!r} has unknown mark {mark!r}")
+        boards[players.index(mark)] |= 1 << sq
+
+    counts = [board.bit_count() for board in boards]
+    if counts[0] == counts[1]:
+        turn = 0
+    elif counts[0] == counts[1] + 1:
+        turn = 1
+    else:
+        raise ValueError(f"Invalid position: {text!r} cannot be reached by alternating moves")
+
+    return BitboardTicTacToeState(boards, players, turn)
+
+
+def format_position(state: BitboardTicTacToeState) -> str:
+    """Write a position in the format read by `parse_position`."""
+    return "/".join("".join(row) for row in state.rows).replace(" ", "_")
+
+
+def analyze_position(state: BitboardTicTacToeState, iterations: int = None, time_limit: float = None) -> Dict[str, Any]:
+    """Search a position and summarize the result.
+
+    Args:
+        state:
+            The position to analyze.
+        iterations, time_limit:
+            The search budget, as for `MCTSAgent`.
+
+    Returns:
+        The position, the player to move, the best move (None once the game
+        is decided), the value of the position for the player to move (their
+        share of the wins found by the search, with ties worth half a win),
+        the proven outcome if the search solved it, the visits of every move
+        and the iterations run.
+    """
+    result = {
+        "position": format_position(state),
+        "player": state.current_player,
+        "best_move": None,
+        "value": None,
+        "proven": None,
+        "visits": {},
+        "iterations": 0,
+    }
+
+    if state.outcome.is_decided:
+        result["proven"] = _describe(state.outcome)
+        return result
+
+    agent = MCTSAgent(iterations=iterations, time_limit=time_limit)
+    agent.reset(state)
+    result["iterations"] = agent.search()
+
+    node = agent.curr_node
+    simulations = node.scores.total()
+    result["best_move"] = node.best_move
+    result["value"] = credit(node.scores, state.current_player) / simulations if simulations else None
+    result["proven"] = _describe(node.proven)
+    result["visits"] = {move: child.scores.total() for move, child in node.children.items()}
+    return result
+
+
+def _describe(outcome) -> str:
+    """Describe a proven outcome for the JSON output."""
+    if outcome is None:
+        return None
+    if outcome.is_tie:
+        return "tie"
+    return f"win {outcome.winner}"
+
+
+def _analyze_line(position: str, iterations: int, time_limit: float) -> Dict[str, Any]:
+    """Parse and analyze one position.
+
+    This runs in the worker processes of `analyze_stream`.
+    """
+    return analyze_position(parse_position(position), iterations, time_limit)
+
+
+def _from_canonical(result: Dict[str, Any], state: BitboardTicTacToeState, symmetry: int) -> Dict[str, Any]:
+    """Map the moves of the analysis of a canonical state back to the state.
+
+    Args:
+        result:
+            The analysis of the canonical form of `state`.
+        state:
+            The position that was asked about.
+        symmetry:
+            The symmetry mapping `state` onto its canonical form.
+
+    Returns:
+        A copy of the result, for `state`.
+    """
+    def move(canonical_move):
+        return state.index_move(state.from_canonical_index(state.move_index(canonical_move), symmetry))
+
+    result = dict(result)
+    result["position"] = format_position(state)
+    if result["best_move"] is not None:
+        result["best_move"] = move(result["best_move"])
+    result["visits"] = {move(m): visits for m, visits in result["visits"].items()}
+    return result
+
+
+class AnalysisCache:
+    """A content-addressed store of analysis results.
+
+    Results are keyed by a digest of the position and the search budget, so
+    the same position searched with the same budget is only searched once.
+    The cache can be backed by a JSONL file, to which new results are
+    appended, so it persists between runs.
+
+    Attributes:
+        hits: The number of lookups answered from the cache.
+        misses: The number of lookups not in the cache.
+    """
+
+    def __init__(self, path: str = None):
+        """Create a cache, loading the results already saved.
+
+        Args:
+            path: The JSONL file backing the cache. If none, the cache only
+                lives in memory.
+        """
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Dict[str, Any]] = dict()
+        self._file: TextIO = None
+
+        if path is not None:
+            try:
+                with open(path) as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._entries[entry["key"]] = entry["result"]
+            except FileNotFoundError:
+                pass
+            self._file = open(path, "a")
+
+    @staticmethod
+    def key(position: str, iterations: int, time_limit: float) -> str:
+        """Get the content address of an analysis.
+
+        Args:
+            position: The position, as written by `format_position`.
+            iterations, time_limit: The search budget.
+
+        Returns:
+            A hex digest identifying the analysis.
+        """
+        content = json.dumps([position, iterations, time_limit])
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def get(self, key: str) -> Dict[str, Any]:
+        """Look up a result, or None if it is not in the cache."""
+        result = self._entries.get(key)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result, saving it to the backing file if there is one."""
+        self._entries[key] = result
+        if self._file is not None:
+            self._file.write(json.dumps({"key": key, "result": result}) + "\n")
+            self._file.flush()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def close(self):
+        """Close the backing file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> AnalysisCache:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def analyze_stream(lines: Iterable[str], iterations: int = None, time_limit: float = None, workers: int = 1, cache: AnalysisCache = None, window: int = None) -> Iterator[Dict[str, Any]]:
+    """Analyze a stream of positions, yielding results in input order.
+
+    Positions are read lazily, so arbitrarily long streams are analyzed in
+    bounded memory. At most `window` positions are in flight at once, and a
+    result is yielded as soon as it and every result before it are done.
+
+    Every position is searched in its canonical form under the symmetries of
+    the board, and the moves of the result are mapped back. Positions already
+    in the cache, or repeated within the window, are not searched again, even
+    if they are rotated or reflected. Lines of only whitespace are skipped, so
+    an empty board written with spaces needs its "/" separators. Invalid
+    positions yield a result with an "error" instead of stopping the stream.
+
+    Args:
+        lines:
+            The positions, one per line, as read by `parse_position`.
+        iterations, time_limit:
+            The search budget of every position, as for `MCTSAgent`.
+        workers:
+            The number of worker processes. With one worker, positions are
+            searched in this process.
+        cache:
+            The cache to answer repeated positions from and to store new
+            results in, if any.
+        window:
+            The maximum number of positions in flight. Defaults to four per
+            worker.
+
+    Yields:
+        The result of each position, as returned by `analyze_position`, with
+        "cached" set if the result came from the cache.
+    """
+    if iterations is None and time_limit is None:
+        iterations = MCTSAgent.DEFAULT_ITERATIONS
+    if window is None:
+        window = 4 * max(1, workers)
+
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    pending = deque()
+    in_flight: Dict[str, Future] = dict()
+
+    def finish(entry) -> Dict[str, Any]:
+        key, future, cached, state, symmetry = entry
+        result = future.result()
+        if key is not None:
+            if not cached and in_flight.get(key) is future:
+                # Store each result once, even if it was requested several
+                # times
+                del in_flight[key]
+                if cache is not None:
+                    cache.put(key, result)
+            result = _from_canonical(result, state, symmetry)
+        else:
+            result = dict(result)
+
+        result["cached"] = cached
+        return result
+
+    try:
+        for line in lines:
+            # Only the line ending is stripped, since spaces are empty squares
+            position = line.rstrip("\r\n")
+            if not position.strip():
+                continue
+
+            try:
+                state = parse_position(position)
+            except ValueError as e:
+                future = Future()
+                future.set_result({"position": position, "error": str(e)})
+                pending.append((None, future, False, None, 0))
+                state = None
+
+            if state is not None:
+                # Address the position by its canonical form, so that any
+                # equivalent position is also answered by the cache
+                canonical, symmetry = state.canonical()
+                canonical_position = format_position(canonical)
+                key = AnalysisCache.key(canonical_position, iterations, time_limit)
+
+                result = cache.get(key) if cache is not None else None
+                if result is not None:
+                    future = Future()
+                    future.set_result(result)
+                    pending.append((key, future, True, state, symmetry))
+                elif key in in_flight:
+                    pending.append((key, in_flight[key], False, state, symmetry))
+                else:
+                    if pool is None:
+                        future = Future()
+                        future.set_result(_analyze_line(canonical_position, iterations, time_limit))
+                    else:
+                        future = pool.submit(_analyze_line, canonical_position, iterations, time_limit)
+                    in_flight[key] = future
+                    pending.append((key, future, False, state, symmetry))
+
+            # Yield whatever is done at the front, and wait once the window
+            # is full
+            while pending and (len(pending) >= window or pending[0][1].done()):
+                yield finish(pending.popleft())
+
+        while pending:
+            yield finish(pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
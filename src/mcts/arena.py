@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+from typing import Any, Sequence
+
+import math
+from random import Random
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("mcts.arena requires NumPy, which is installed with the numpy extra: pip install mcts[numpy]") from e
+
+from .state import AbstractState, Outcome, TIE_CREDIT
+from .agents import Agent
+from .mcts import playout
+
+class NodeArena:
+    """A Monte Carlo search tree stored in contiguous NumPy arrays.
+
+    Nodes are identified by their index into the arrays, and the root is
+    always node 0. The children of a node occupy a contiguous range of
+    indices, so the UCT scores of all children are computed with a single
+    vectorized operation. Game states are not stored; they are recomputed
+    from the root state while descending the tree, with the unvalidated
+    `apply_unchecked`. Child `i` of a node is reached by making the `i`th
+    move of the node's `legal_move_indices()`.
+
+    Attributes:
+        players:
+            The players of the game. Their order gives the columns of `wins`.
+        size:
+            The number of nodes in the tree.
+        visits:
+            The number of playouts through each node.
+        wins:
+            The number of playouts through each node won by each player,
+            with `TIE_CREDIT` of a win to every player for each tie.
+        parent:
+            The index of the parent of each node, or -1 for the root.
+        first_child:
+            The index of the first child of each node.
+        num_children:
+            The number of children of each node. Zero for leaves.
+        mover:
+            The index of the player who made the move leading to each node,
+            or -1 for the root.
+        exploration_parameter:
+            Constant balancing exploration vs exploitation. Higher values
+            prioritize exploration.
+    """
+
+    def __init__(self, players: Sequence[Any], capacity: int = 1024, exploration_parameter: float = math.sqrt(2)):
+        """Create an arena holding only a root node.
+
+        Args:
+            players:
+                The players of the game.
+            capacity:
+                The number of nodes to allocate space for up front. The arrays
+                grow as needed.
+            exploration_parameter:
+                Constant balancing exploration vs exploitation.
+        """
+        self.players = tuple(players)
+        self.player_index = {player: i for i, player in enumerate(self.players)}
+        self.exploration_parameter = exploration_parameter
+
+        capacity = max(capacity, 1)
+        self.visits = np.zeros(capacity, dtype=np.int64)
+        self.wins = np.zeros((capacity, len(self.players)), dtype=np.float64)
+        self.parent = np.full(capacity, -1, dtype=np.int32)
+        self.first_child = np.zeros(capacity, dtype=np.int32)
+        self.num_children = np.zeros(capacity, dtype=np.int32)
+        self.mover = np.full(capacity, -1, dtype=np.int8)
+        self.size = 1
+
+    @property
+    def capacity(self) -> int:
+        """The number of nodes the arrays currently have space for."""
+        return len(self.visits)
+
+    @property
+    def nbytes(self) -> int:
+        """The number of bytes allocated for the node arrays."""
+        return sum(a.nbytes for a in (self.visits, self.wins, self.parent, self.first_child, self.num_children, self.mover))
+
+    def _grow(self, needed: int):
+        """Enlarge the arrays so they fit at least `needed` nodes."""
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+
+        def resize(a, fill):
+            grown = np.full((capacity,) + a.shape[1:], fill, dtype=a.dtype)
+            grown[:len(a)] = a
+            return grown
+
+        self.visits = resize(self.visits, 0)
+        self.wins = resize(self.wins, 0)
+        self.parent = resize(self.parent, -1)
+        self.first_child = resize(self.first_child, 0)
+        self.num_children = resize(self.num_children, 0)
+        self.mover = resize(self.mover, -1)
+
+    def select(self, state: AbstractState):
+        """Select a leaf to expand, starting from the root.
+
+        Args:
+            state: The game state at the root.
+
+        Returns:
+            The index of the selected leaf and its game state.
+        """
+        node = 0
+        while self.num_children[node] > 0:
+            first = self.first_child[node]
+            child = first + self.best_child(node)
+            state = state.apply_unchecked(state.legal_move_indices()[child - first])
+            node = child
+
+        return node, state
+
+    def best_child(self, node: int) -> int:
+        """Find the child of a node with the highest UCT score.
+
+        Args:
+            node: The index of the node.
+
+        Returns:
+            The position of the best child among the node's children.
+        """
+        first = self.first_child[node]
+        children = slice(first, first + self.num_children[node])
+
+        visits = self.visits[children]
+        wins = self.wins[children, self.mover[first]]
+
+        # Unvisited children are always tried first
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = wins / visits + self.exploration_parameter * np.sqrt(math.log(max(self.visits[node], 1)) / visits)
+        scores[visits == 0] = np.inf
+
+        return int(np.argmax(scores))
+
+    def expand(self, node: int, state: AbstractState) -> int:
+        """Add a child to a leaf for every possible move.
+
+        Args:
+            node: The index of the leaf.
+            state: The game state at the leaf.
+
+        Returns:
+            The number of children added.
+        """
+        count = len(state.legal_move_indices())
+        if count == 0:
+            return 0
+
+        if self.size + count > self.capacity:
+            self._grow(self.size + count)
+
+        first = self.size
+        children = slice(first, first + count)
+        self.parent[children] = node
+        self.mover[children] = self.player_index[state.current_player]
+        self.first_child[node] = first
+        self.num_children[node] = count
+        self.size += count
+
+        return count
+
+    def backpropagate(self, node: int, outcome: Outcome):
+        """Record the outcome of a playout at a node and all its ancestors.
+
+        Args:
+            node: The index of the node the playout started from.
+            outcome: The outcome of the playout.
+        """
+        winner = self.player_index[outcome.winner] if outcome.is_win else None
+        while node >= 0:
+            self.visits[node] += 1
+            if winner is not None:
+                self.wins[node, winner] += 1
+            else:
+                self.wins[node] += TIE_CREDIT
+            node = self.parent[node]
+
+    def best_move(self, state: AbstractState):
+        """The best move at the root, based on win counts.
+
+        Args:
+            state: The game state at the root.
+
+        Returns:
+            The move from the root with the most wins for the current player.
+        """
+        first = self.first_child[0]
+        wins = self.wins[first:first + self.num_children[0], self.player_index[state.current_player]]
+        return state.index_move(state.legal_move_indices()[int(np.argmax(wins))])
+
+
+class ArenaMCTSAgent(Agent):
+    """A player agent that searches with a `NodeArena` tree.
+
+    A new tree is built from the current state for every move.
+
+    Attributes:
+        players: The players of the game.
+        iterations: The number of playouts to run per move.
+        rng: The random object used for playouts.
+    """
+
+    def __init__(self, players: Sequence[Any] = ("X", "O"), iterations: int = 1000, rng: Random = None):
+        """Initialize the agent.
+
+        Args:
+            players:
+                The players of the game.
+            iterations:
+                The number of playouts to run per move.
+            rng:
+                The random object used for playouts.
+        """
+        self.players = tuple(players)
+        self.iterations = iterations
+        self.rng = Random() if rng is None else rng
+
+    def make_move(self, state: AbstractState):
+        """Search the game from the current state and pick the best move.
+
+        Args:
+            state: The current state of the game.
+
+        Returns:
+            The chosen move to make from the possible moves at this game state.
+        """
+        arena = NodeArena(self.players, capacity=self.iterations + 1)
+        for _ in range(self.iterations):
+            node, leaf_state = arena.select(state)
+
+            # Expand the leaf and play out from its first child
+            if arena.expand(node, leaf_state) > 0:
+                leaf_state = leaf_state.apply_unchecked(leaf_state.legal_move_indices()[0])
+                node = arena.first_child[node]
+
+            arena.backpropagate(node, playout(leaf_state, self.rng))
+
+        return arena.best_move(state)
+
+    def observe_move(self, player: Any, move: Any, new_state: AbstractState) -> None:
+        pass
+
+    def see_state(self, state: AbstractState) -> None:
+        pass
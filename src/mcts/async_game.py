@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+from abc import ABCMeta, abstractmethod
+from typing import Any, Dict
+
+import asyncio
+import threading
+
+from .state import AbstractState
+from .agents import Agent
+from .mcts import MCTSAgent
+
+class AsyncAgent(metaclass=ABCMeta):
+    """A player agent for `AsyncGame`.
+
+    Like `Agent`, but every method is a coroutine, so agents can keep working
+    in the background while other agents are thinking.
+    """
+
+    @abstractmethod
+    async def make_move(self, state: AbstractState) -> Any:
+        """
+        Get a move to make from the agent.
+
+        Args:
+            state: The current state of the game.
+
+        Returns:
+            The move the agent wishes to make in the current state.
+        """
+
+    @abstractmethod
+    async def observe_move(self, player: Any, move: Any, new_state: AbstractState) -> None:
+        """
+        Observe a move made by any player agent, including this one.
+
+        Args:
+            player: The player that makes the move
+            move: The move made
+            new_state: The state of the game after the move is made
+        """
+
+    @abstractmethod
+    async def see_state(self, state: AbstractState) -> None:
+        """
+        Observe the state of the game.
+
+        Args:
+            state: The current state of the game
+        """
+
+    async def take_seat(self, player: Any) -> None:
+        """Tell the agent which player it plays, before the game starts.
+
+        Args:
+            player: The player of this agent.
+        """
+
+    async def close(self) -> None:
+        """Stop any background work of the agent."""
+
+
+class ThreadedAgent(AsyncAgent):
+    """Runs a synchronous `Agent` in a worker thread.
+
+    Blocking agents, such as a `ConsoleAgent` waiting on `input()`, then do
+    not block the event loop.
+
+    Attributes:
+        agent: The wrapped agent.
+    """
+
+    def __init__(self, agent: Agent):
+        """
+        Args:
+            agent: The agent to wrap.
+        """
+        self.agent = agent
+
+    async def make_move(self, state: AbstractState) -> Any:
+        return await asyncio.to_thread(self.agent.make_move, state)
+
+    async def observe_move(self, player: Any, move: Any, new_state: AbstractState) -> None:
+        await asyncio.to_thread(self.agent.observe_move, player, move, new_state)
+
+    async def see_state(self, state: AbstractState) -> None:
+        await asyncio.to_thread(self.agent.see_state, state)
+
+
+class PonderingAgent(AsyncAgent):
+    """Runs an `MCTSAgent` that keeps searching during other players' turns.
+
+    Whenever a move is observed, including its own, the agent re-roots its
+    tree onto the subtree of the move and ponders, i.e. searches in a
+    background thread, until the next move. The search done while the
+    opponent is thinking then carries over to the agent's next move.
+
+    Attributes:
+        agent: The wrapped MCTS agent.
+        pondered: The total number of iterations run while pondering.
+    """
+
+    def __init__(self, agent: MCTSAgent, player: Any = None):
+        """
+        Args:
+            agent: The MCTS agent to ponder with.
+            player: The player of this agent. If none, it is learned from
+                `take_seat` or the first move the agent makes. The agent only
+                ponders once it knows which turns are not its own.
+        """
+        self.agent = agent
+        self.pondered = 0
+        self._player = player
+
+        self._stop = threading.Event()
+        self._pondering: asyncio.Task = None
+
+    async def make_move(self, state: AbstractState) -> Any:
+        """Search the current state and pick the best move.
+
+        Args:
+            state: The current state of the game.
+
+        Returns:
+            The chosen move.
+        """
+        await self._stop_pondering()
+        self._player = state.current_player
+        return await asyncio.to_thread(self.agent.make_move, state)
+
+    async def take_seat(self, player: Any) -> None:
+        self._player = player
+
+    async def observe_move(self, player: Any, move: Any, new_state: AbstractState) -> None:
+        """Stop pondering, re-root onto the subtree of the move made, and
+        ponder the new position.
+
+        Args:
+            player: The player that makes the move
+            move: The move made
+            new_state: The state of the game after the move is made
+        """
+        await self._stop_pondering()
+        self.agent.observe_move(player, move, new_state)
+
+        # Keep searching until it is this agent's turn
+        if self._player is not None and new_state.current_player != self._player:
+            self._start_pondering()
+
+    async def see_state(self, state: AbstractState) -> None:
+        await self._stop_pondering()
+        self.agent.see_state(state)
+
+    async def close(self) -> None:
+        await self._stop_pondering()
+
+    def _start_pondering(self):
+        """Start searching in a background thread."""
+        if self.agent.curr_node is None or self.agent.curr_node.state.outcome.is_decided:
+            return
+
+        self._stop.clear()
+        self._pondering = asyncio.create_task(asyncio.to_thread(self.agent.ponder, self._stop))
+
+    async def _stop_pondering(self):
+        """Stop the background search and wait for it to finish."""
+        if self._pondering is not None:
+            self._stop.set()
+            self.pondered += await self._pondering
+            self._pondering = None
+
+
+class AsyncGame:
+    """A simple turn-based game played by `AsyncAgent`s.
+
+    Attributes:
+        state:
+            The current game state
+        agents:
+            The players playing the game. Maps the representation of the
+            player (a name or symbol) to the agent.
+    """
+
+    def __init__(self, start_state: AbstractState, agents: Dict[str, AsyncAgent]):
+        """Construct a game.
+
+        Args:
+            start_state:
+                The starting state of the game.
+            agents:
+                The agents playing the game. Mapping of the representation of
+                the player to the agent."""
+        self.state = start_state
+        self.agents = agents
+
+    async def play(self):
+        """Play the game until it is decided.
+
+        Agents are told their seats, then take turns making moves, and game
+        notifies every agent of the moves made, including the agent that made
+        the move. Agents are closed once the game is decided.
+        """
+        try:
+            await asyncio.gather(*(agent.take_seat(player) for player, agent in self.agents.items()))
+
+            # Play until there is an outcome
+            while self.state.outcome.is_undecided:
+                player = self.state.current_player
+                move = await self.agents[player].make_move(self.state)
+
+                # Move to the next state. The state rejects invalid moves.
+                try:
+                    next_state = self.state.next_move(player, move)
+                except ValueError as e:
+                    raise ValueError(f"{player} selected move invalid move {move}") from e
+
+                # Notify every player that a move was made
+                await asyncio.gather(*(
+                    agent.observe_move(player, move, next_state)
+                    for agent in self.agents.values()
+                ))
+
+                self.state = next_state
+
+            ### The game is now decided ###
+
+            # Show the players the final game state
+            await asyncio.gather(*(agent.see_state(self.state) for agent in self.agents.values()))
+        finally:
+            await asyncio.gather(*(agent.close() for agent in self.agents.values()))
+
+        # Print the outcome
+        if self.state.outcome.is_tie:
+            print("The game ends in a tie.")
+        else:
+            print(f"The winner is {self.state.outcome.winner}")
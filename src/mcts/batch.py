@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from typing import Any, List, Sequence, Tuple
+
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("mcts.batch requires NumPy, which is installed with the numpy extra: pip install mcts[numpy]") from e
+
+from .ttt import TicTacToeState
+
+# Result code of a tied game. Won games are coded with the winner's index.
+TIE = -1
+# Result code of a game still being played
+UNDECIDED = -2
+
+def line_indices(n: int) -> np.ndarray:
+    """Get the squares of every winning line on an `n` x `n` grid.
+
+    Args:
+        n: The size of the grid.
+
+    Returns:
+        An array of shape (2n + 2, n) of square indices, one row per line.
+    """
+    squares = np.arange(n * n).reshape(n, n)
+    return np.concatenate([squares, squares.T, [squares.diagonal()], [np.fliplr(squares).diagonal()]])
+
+
+def board_tensor(states: Sequence[TicTacToeState], players: Sequence[Any] = ("X", "O")) -> Tuple[np.ndarray, np.ndarray]:
+    """Convert Tic Tac Toe states to arrays.
+
+    Works with any state with `rows`, such as `TicTacToeState` and
+    `BitboardTicTacToeState`.
+
+    Args:
+        states:
+            The states to convert.
+        players:
+            The player symbols, in turn order.
+
+    Returns:
+        The boards, of shape (len(states), N * N), holding 0 for empty squares
+        and the player's index plus one for marked squares, and the index of
+        the player to move in each state.
+    """
+    codes = {player: i + 1 for i, player in enumerate(players)}
+    codes[' '] = 0
+
+    boards = np.array([[codes[sq] for row in state.rows for sq in row] for state in states], dtype=np.int8)
+    turns = np.array([codes[state.current_player] - 1 for state in states], dtype=np.int8)
+    return boards.reshape(len(states), -1), turns
+
+
+def random_playouts(boards: np.ndarray, turns: np.ndarray, num_players: int = 2, rng: np.random.Generator = None) -> np.ndarray:
+    """Play uniformly random moves in a batch of games until all are decided.
+
+    Every step makes one move in each undecided game at once: legal moves are
+    masked, a move is drawn per game, and only the lines of the moving player
+    are checked for a win.
+
+    Args:
+        boards:
+            The boards of the games, as returned by `board_tensor`. They are
+            not modified.
+        turns:
+            The index of the player to move in each game.
+        num_players:
+            The number of players.
+        rng:
+            The random generator used to pick moves.
+
+    Returns:
+        The result of each game: the index of the winner, or `TIE`.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    boards = boards.copy()
+    turns = turns.astype(np.int8)
+    lines = line_indices(int(round(np.sqrt(boards.shape[1]))))
+
+    # Decide the games which are already over
+    marks = boards[:, lines]
+    results = np.full(len(boards), UNDECIDED, dtype=np.int8)
+    for p in range(num_players):
+        results[(results == UNDECIDED) & (marks == p + 1).all(axis=2).any(axis=1)] = p
+    results[(results == UNDECIDED) & (boards != 0).all(axis=1)] = TIE
+
+    active = np.flatnonzero(results == UNDECIDED)
+    while len(active) > 0:
+        games = boards[active]
+        movers = turns[active]
+
+        # Pick a random empty square in every game
+        weights = rng.random(games.shape)
+        weights[games != 0] = -1
+        squares = weights.argmax(axis=1)
+        games[np.arange(len(active)), squares] = movers + 1
+        boards[active] = games
+
+        # Only the player who just moved can have won
+        won = (games[:, lines] == (movers + 1)[:, None, None]).all(axis=2).any(axis=1)
+        full = (games != 0).all(axis=1)
+        results[active[won]] = movers[won]
+        results[active[full & ~won]] = TIE
+
+        turns[active] = (movers + 1) % num_players
+        active = active[~(won | full)]
+
+    return results
+
+
+def playout_counts(state: TicTacToeState, games: int, players: Sequence[Any] = ("X", "O"), rng: np.random.Generator = None) -> Tuple[Counter, int]:
+    """Play many random games from one state at once.
+
+    Args:
+        state:
+            The state to play out from.
+        games:
+            The number of games to play.
+        players:
+            The player symbols, in turn order.
+        rng:
+            The random generator used to pick moves.
+
+    Returns:
+        The number of games won by each player, and the number of tied games.
+    """
+    boards, turns = board_tensor([state], players)
+    results = random_playouts(np.repeat(boards, games, axis=0), np.repeat(turns, games), len(players), rng)
+    return _count(results, players)
+
+
+def batch_simulate(nodes: List, games: int = 1, players: Sequence[Any] = ("X", "O"), rng: np.random.Generator = None):
+    """Play out many nodes at once and record the results in bulk.
+
+    Args:
+        nodes:
+            The `Node`s to simulate. Their states must have `rows`.
+        games:
+            The number of games to play from each node.
+        players:
+            The player symbols, in turn order.
+        rng:
+            The random generator used to pick moves.
+    """
+    boards, turns = board_tensor([node.state for node in nodes], players)
+    results = random_playouts(np.repeat(boards, games, axis=0), np.repeat(turns, games), len(players), rng)
+
+    for node, node_results in zip(nodes, results.reshape(len(nodes), games)):
+        wins, ties = _count(node_results, players)
+        node.record(wins, ties)
+
+
+def _count(results: np.ndarray, players: Sequence[Any]) -> Tuple[Counter, int]:
+    """Count the wins of each player and the ties in an array of results."""
+    counts = np.bincount(results[results != TIE], minlength=len(players))
+    wins = Counter({player: int(count) for player, count in zip(players, counts) if count > 0})
+    return wins, int((results == TIE).sum())
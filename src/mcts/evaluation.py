@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from abc import ABCMeta, abstractmethod
+from typing import Any, Dict, List, Sequence
+
+from collections import Counter
+import threading
+
+from .state import AbstractState
+
+class Evaluator(metaclass=ABCMeta):
+    """Estimates the value of game states in batches, in place of playouts."""
+
+    @abstractmethod
+    def evaluate(self, states: Sequence[AbstractState]) -> List[Dict[Any, float]]:
+        """Estimate the value of undecided game states.
+
+        Args:
+            states: The states to evaluate.
+
+        Returns:
+            For each state, the expected score of each player, between 0 and
+            1, as the fraction of a win it is worth. Scores should sum to at
+            most 1; the rest is the chance of a tie.
+        """
+
+
+class EvaluationQueue:
+    """Collects leaves of one or more searches and evaluates them in batches.
+
+    A submitted leaf is not evaluated right away. Instead, it and its
+    ancestors carry a virtual loss, so that the search spreads out to other
+    leaves in the meantime. Once `batch_size` leaves are pending, they are
+    all evaluated in one call of the evaluator. Each value is recorded at its
+    leaf and backpropagated, and the virtual losses are removed.
+
+    Searches in several threads, or several searches taking turns, can share
+    one queue to fill batches faster.
+
+    Attributes:
+        evaluator: The evaluator of the batches.
+        batch_size: The number of leaves evaluated at once.
+        virtual_loss: The number of losses added to each node on the path of
+            a pending leaf.
+        batches: The number of batches evaluated.
+        evaluated: The number of leaves evaluated.
+    """
+
+    def __init__(self, evaluator: Evaluator, batch_size: int = 16, virtual_loss: int = 1):
+        """
+        Args:
+            evaluator: The evaluator of the batches.
+            batch_size: The number of leaves evaluated at once.
+            virtual_loss: The number of losses added to each node on the path
+                of a pending leaf.
+        """
+        self.evaluator = evaluator
+        self.batch_size = batch_size
+        self.virtual_loss = virtual_loss
+        self.batches = 0
+        self.evaluated = 0
+
+        self._pending = []
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def submit(self, node):
+        """Queue a leaf for evaluation, evaluating the batch once it is full.
+
+        Args:
+            node: The `Node` to evaluate. Its game must be undecided.
+        """
+        with self._lock:
+            ancestor = node
+            while ancestor is not None:
+                ancestor.virtual_loss += self.virtual_loss
+                ancestor = ancestor.parent
+
+            self._pending.append(node)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Evaluate every pending leaf now, however few there are."""
+        with self._lock:
+            if not self._pending:
+                return
+
+            nodes, self._pending = self._pending, []
+            values = self.evaluator.evaluate([node.state for node in nodes])
+            self.batches += 1
+            self.evaluated += len(nodes)
+
+            for node, value in zip(nodes, values):
+                ancestor = node
+                while ancestor is not None:
+                    ancestor.virtual_loss -= self.virtual_loss
+                    ancestor = ancestor.parent
+
+                # Scores summing to 1 may leave a tiny negative rest after
+                # rounding, which must not be recorded as ties
+                wins = Counter({player: score for player, score in value.items() if score})
+                node.record(wins, max(0.0, 1 - sum(value.values())))
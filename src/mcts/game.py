@@ -31,8 +31,8 @@ class Game:
     def play(self):
         """Play the game until it is decided.
         
-        Agents take turns making moves, and game notifies the other agents of
-        the moves made.
+        Agents take turns making moves, and game notifies every agent of the
+        moves made, including the agent that made the move.
         """
 
         # Play until there is an outcome
@@ -40,18 +40,16 @@ class Game:
             player = self.state.current_player
             move = self.agents[player].make_move(self.state)
 
-            # Check to make sure the agent chose a valid move
-            if move not in self.state.possible_moves():
-                raise ValueError(f"{player} selected move invalid move {move}")
-            
-            # Move to the next state
-            next_state = self.state.next_move(player, move)
+            # Move to the next state. The state rejects invalid moves, so
+            # they need not be looked up in `possible_moves()` here.
+            try:
+                next_state = self.state.next_move(player, move)
+            except ValueError as e:
+                raise ValueError(f"{player} selected move invalid move {move}") from e
 
-            # Notify the other players that a move was made
+            # Notify every player that a move was made, so that agents
+            # tracking the game can follow their own moves too
             for observer, agent in self.agents.items():
-                if observer == player:
-                    continue
-
                 agent.observe_move(player, move, next_state)
 
             self.state = next_state
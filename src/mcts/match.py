@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterator, Sequence, TextIO
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import math
+import time
+
+from .state import AbstractState
+from .agents import Agent
+
+def play_game(state: AbstractState, agents: Dict[Any, Agent]) -> Dict[str, Any]:
+    """Play a game to the end without any console output.
+
+    Unlike `Game.play`, moves are not checked against `possible_moves()`;
+    `next_move` rejects invalid moves itself.
+
+    Args:
+        state:
+            The starting state of the game.
+        agents:
+            The agents playing the game, by player.
+
+    Returns:
+        A record of the game, with the moves made, the winner (None for a tie)
+        and the seconds each move took.
+    """
+    moves = []
+    times = []
+    while state.outcome.is_undecided:
+        player = state.current_player
+
+        start = time.perf_counter()
+        move = agents[player].make_move(state)
+        times.append(time.perf_counter() - start)
+
+        try:
+            state = state.next_move(player, move)
+        except ValueError as e:
+            raise ValueError(f"{player} selected move invalid move {move}") from e
+        moves.append(move)
+
+        # Notify every player that a move was made, including the mover
+        for agent in agents.values():
+            agent.observe_move(player, move, state)
+
+    return {
+        "moves": moves,
+        "winner": state.outcome.winner if state.outcome.is_win else None,
+        "times": times,
+    }
+
+
+def _play_match_game(index: int, state: AbstractState, players: Sequence[Any], first: Callable[[], Agent], second: Callable[[], Agent]) -> Dict[str, Any]:
+    """Play one game of a match, alternating which agent plays which player.
+
+    Returns:
+        The game record of `play_game`, with the game index, the player of the
+        first agent and the result for the first agent ("win", "draw" or
+        "loss").
+    """
+    # The first agent plays the first player in even games
+    first_player, second_player = (players[0], players[1]) if index % 2 == 0 else (players[1], players[0])
+    record = play_game(state, {first_player: first(), second_player: second()})
+
+    if record["winner"] is None:
+        result = "draw"
+    elif record["winner"] == first_player:
+        result = "win"
+    else:
+        result = "loss"
+
+    return {"game": index, "first_player": first_player, "result": result, **record}
+
+
+class MatchResult:
+    """The results of a match from the point of view of the first agent.
+
+    Attributes:
+        wins: The number of games won by the first agent.
+        draws: The number of tied games.
+        losses: The number of games lost by the first agent.
+    """
+
+    def __init__(self, wins: int = 0, draws: int = 0, losses: int = 0):
+        self.wins = wins
+        self.draws = draws
+        self.losses = losses
+
+    @property
+    def games(self) -> int:
+        """The number of games played."""
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self) -> float:
+        """The average score of the first agent, counting draws as half a win.
+
+        None if no games have been played.
+        """
+        if self.games == 0:
+            return None
+        return (self.wins + self.draws / 2) / self.games
+
+    def confidence_interval(self, z: float = 1.96):
+        """The confidence interval of the first agent's score.
+
+        Uses the normal approximation of the mean of per-game scores of 1, 0.5
+        and 0.
+
+        Args:
+            z: The number of standard errors on either side. 1.96 gives a 95%
+                interval.
+
+        Returns:
+            The lower and upper bounds of the interval, or None if no games
+            have been played.
+        """
+        if self.games == 0:
+            return None
+
+        mean = self.score
+        variance = (self.wins * (1 - mean) ** 2 + self.draws * (0.5 - mean) ** 2 + self.losses * mean ** 2) / self.games
+        margin = z * math.sqrt(variance / self.games)
+        return max(0.0, mean - margin), min(1.0, mean + margin)
+
+    def add(self, result: str):
+        """Count the result ("win", "draw" or "loss") of one game."""
+        if result == "win":
+            self.wins += 1
+        elif result == "draw":
+            self.draws += 1
+        else:
+            self.losses += 1
+
+    def __str__(self) -> str:
+        if self.games == 0:
+            return "no games"
+
+        low, high = self.confidence_interval()
+        return f"+{self.wins} ={self.draws} -{self.losses} score {self.score:.3f} (95% CI {low:.3f}-{high:.3f})"
+
+
+def iter_match(state: AbstractState, players: Sequence[Any], first: Callable[[], Agent], second: Callable[[], Agent], games: int, workers: int = 1) -> Iterator[Dict[str, Any]]:
+    """Play a match between two agents, yielding game records as they finish.
+
+    Agents are created fresh for every game from their factories, which must
+    be picklable (e.g. classes or `functools.partial`s) when using more than
+    one worker. The agents alternate playing the first player.
+
+    Args:
+        state:
+            The starting state of every game.
+        players:
+            The two players of the game, in turn order.
+        first, second:
+            Factories creating the two agents.
+        games:
+            The number of games to play.
+        workers:
+            The number of worker processes. With one worker, games are played
+            in this process.
+
+    Yields:
+        The record of each game, as returned by `_play_match_game`, in the
+        order they finish.
+    """
+    if workers <= 1:
+        for index in range(games):
+            yield _play_match_game(index, state, players, first, second)
+        return
+
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_play_match_game, index, state, players, first, second) for index in range(games)]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_match(state: AbstractState, players: Sequence[Any], first: Callable[[], Agent], second: Callable[[], Agent], games: int, workers: int = 1, out: TextIO = None) -> MatchResult:
+    """Play a match between two agents and tally the results.
+
+    Args:
+        state, players, first, second, games, workers:
+            As for `iter_match`.
+        out:
+            If given, every game record is written to it as a line of JSON as
+            soon as the game finishes.
+
+    Returns:
+        The results of the match for the first agent.
+    """
+    result = MatchResult()
+    for record in iter_match(state, players, first, second, games, workers):
+        result.add(record["result"])
+        if out is not None:
+            out.write(json.dumps(record, default=str) + "\n")
+            out.flush()
+
+    return result
@@ -1,16 +1,27 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Hashable
+from typing import Any, Callable, Dict, Hashable, List, Tuple
 
 from collections import Counter
+from functools import partial
 
+import heapq
+import itertools
 import math
+import threading
+import time
 from random import Random
 
 import warnings
 
-from .state import AbstractState, Win, Tie, Undecided, Decided
+from .state import AbstractState, Outcome, Win, Tie, Undecided, Decided, TIES, credit
 from .agents import Agent
+from .transposition import TranspositionTable
+from .stats import SearchStats
+from .snapshot import TreeSnapshot
+from .policy import RolloutPolicy
+from .rng import SearchRandom
+from .evaluation import EvaluationQueue
 
 def default_score_function(node_wins, node_simulations, parent_simulations, exploration_parameter=math.sqrt(2)) -> float:
     """Score the value of the node for a player.
@@ -33,19 +44,249 @@ def default_score_function(node_wins, node_simulations, parent_simulations, expl
     return node_wins / node_simulations + exploration_parameter * math.sqrt(math.log(parent_simulations) / node_simulations)
 
 
+def rave_score_function(node_wins, node_simulations, parent_simulations, amaf_wins, amaf_simulations, equivalence=1000, exploration_parameter=math.sqrt(2)) -> float:
+    """Score the value of the node for a player, blending in its AMAF value.
+
+    Rapid action value estimation (RAVE) mixes the win rate of a node with
+    the all-moves-as-first (AMAF) win rate of its move: the share of wins of
+    every playout through the parent in which the player made the move at any
+    point. AMAF values are rough, but they gather statistics much faster, so
+    they guide the search until the node has been simulated enough. The AMAF
+    value is weighted by sqrt(k / (3n + k)) after n simulations, where k is
+    the equivalence parameter.
+
+    Args:
+        node_wins:
+            The number of wins for the player at this node
+        node_simulations:
+            The number of times this node has been simulated to a conclusion.
+        parent_simulations:
+            The number of times the parent of this node has been simulated.
+        amaf_wins:
+            The number of wins for the player in the playouts through the
+            parent in which the player made the move of this node.
+        amaf_simulations:
+            The number of playouts through the parent in which the player
+            made the move of this node.
+        equivalence:
+            The number of simulations at which the win rate and the AMAF
+            value are weighted about equally. Higher values trust the AMAF
+            value for longer.
+        exploration_parameter:
+            Constant balancing exploration vs exploitation. Higher values
+            prioritize exploration.
+
+    Returns:
+        The relative value of the node. A higher value means the node will be
+        explored and exploited more often.
+    """
+    value = node_wins / node_simulations
+    if amaf_simulations:
+        beta = math.sqrt(equivalence / (3 * node_simulations + equivalence))
+        value = (1 - beta) * value + beta * amaf_wins / amaf_simulations
+
+    return value + exploration_parameter * math.sqrt(math.log(parent_simulations) / node_simulations)
+
+
+def playout(state: AbstractState, rng: Random) -> Outcome:
+    """Play random moves from a state until the game is decided.
+
+    The playout runs in a plain loop over the game states and creates no
+    nodes, so its cost does not depend on the size of the tree and long games
+    cannot hit the recursion limit.
+
+    Args:
+        state:
+            The game state to play out from.
+        rng:
+            The random object used to pick moves.
+
+    Returns:
+        The outcome of the finished game.
+    """
+    while state.outcome.is_undecided:
+        state = state.apply_unchecked(state.random_move_index(rng))
+
+    return state.outcome
+
+
+def amaf_playout(state: AbstractState, rng: Random, policy: RolloutPolicy = None) -> Tuple[Outcome, Dict[Hashable, Any]]:
+    """Play out a game like `playout`, noting who made each move.
+
+    Args:
+        state:
+            The game state to play out from.
+        rng:
+            The random object used to pick moves.
+        policy:
+            The policy choosing the moves, if any. Its `playout` is not used,
+            since every move must be seen.
+
+    Returns:
+        The outcome of the finished game, and the player who first made each
+        move of the playout.
+    """
+    moves = dict()
+    while state.outcome.is_undecided:
+        index = state.random_move_index(rng) if policy is None else policy.choose(state, rng)
+        moves.setdefault(state.index_move(index), state.current_player)
+        state = state.apply_unchecked(index)
+
+    return state.outcome, moves
+
+
 class MCTSAgent(Agent):
     """A player agent that makes decisions using Monte Carlo Tree Search.
+
+    Each move is searched until one of the configured budgets is exhausted,
+    or the outcome of the current node is proven. At least one iteration is
+    run unless the outcome is already proven.
+
+    The agent must observe every move of the game, including its own. The
+    tree is then re-rooted at the node of the new state, keeping its subtree
+    and statistics, and the rest of the tree is released.
+
+    With a node or memory budget, the least useful leaves are evicted
+    whenever the tree outgrows it, so the search can run for any length of
+    time in bounded memory.
     
     Attributes:
-        root: The root node of the game played.
+        root: The root node of the search tree.
         curr_node: The node containing the current state of the game played.
+            After re-rooting, this is the same as `root`.
+        iterations: The maximum number of search iterations per move.
+        time_limit: The maximum number of seconds to search per move.
+        max_nodes: The maximum number of nodes in the search tree. Search
+            stops once the tree has grown to this size.
+        node_budget: The maximum number of nodes kept in the search tree.
+            Leaves are evicted to stay within it.
+        memory_budget: The maximum estimated memory of the search tree, in
+            bytes. Leaves are evicted to stay within it.
+        eviction: How leaves are chosen for eviction, "visits" or "lru".
+        node_count: The number of nodes in the search tree.
+        bytes_per_node: The estimated memory used by each node of the
+            current tree, see `estimate_bytes_per_node`.
+        table: The transposition table shared by the nodes of the tree, if any.
+        snapshot: The saved tree that new nodes take their initial statistics
+            from, if any.
+        widening: The progressive widening constants of the nodes, if any.
+        policy: The policy choosing the moves of playouts, if any.
+        queue: The queue evaluating leaves in batches instead of playing
+            them out, if any.
+        rave: The RAVE equivalence parameter, if AMAF statistics are used.
+        rng: The random generator shared by every node of the search.
+        collect_stats: Whether to collect `SearchStats` for every search.
+        on_search: Called with the `SearchStats` of every search, if set.
+        last_stats: The `SearchStats` of the latest search, if collected.
     """
 
-    def __init__(self):
-        """Initialize the MCTS agent."""
+    DEFAULT_ITERATIONS = 1000
+
+    # The memory allocated per node of a search of a game with small states,
+    # e.g. bitboards, before the costs per move below, as measured by
+    # benchmarks/run.py on Tic Tac Toe and m,n,k-games up to 15 x 15
+    BYTES_PER_NODE = 900
+
+    # The memory allocated per node for each legal move at the root of the
+    # tree: the untried moves of expanded nodes, averaged over every node,
+    # and the AMAF statistics gathered by every node with RAVE. Trees kept
+    # within a budget hold larger AMAF statistics, since evicted leaves leave
+    # theirs counted in their ancestors, so the estimate allows for them.
+    BYTES_PER_MOVE = 4
+    AMAF_BYTES_PER_MOVE = 130
+
+    # The fraction of the node budget evicted at once, so that trees are not
+    # scanned for leaves on every iteration
+    EVICTION_FRACTION = 0.1
+
+    def __init__(self, iterations: int = None, time_limit: float = None, max_nodes: int = None, table: TranspositionTable = None, collect_stats: bool = False, on_search: Callable[[SearchStats], None] = None, snapshot: TreeSnapshot = None, widening=None, policy: RolloutPolicy = None, seed: int = None, node_budget: int = None, eviction: str = "visits", queue: EvaluationQueue = None, rave: float = None, memory_budget: int = None):
+        """Initialize the MCTS agent.
+
+        Args:
+            iterations:
+                The maximum number of search iterations per move.
+            time_limit:
+                The maximum number of seconds to search per move. The best
+                move found so far is returned when the time runs out.
+            max_nodes:
+                The maximum number of nodes in the search tree. Search stops
+                once the tree has grown to this size.
+            table:
+                A transposition table through which nodes for the same
+                position share their statistics.
+            collect_stats:
+                Whether to time the phases of every search and gather
+                statistics about the tree. This slows the search slightly.
+            on_search:
+                A hook called with the statistics of every search. Setting it
+                enables `collect_stats`.
+            snapshot:
+                A saved tree, e.g. of pre-searched openings. Nodes for states
+                in the snapshot start with the saved statistics.
+            widening:
+                The constants (C, alpha) of progressive widening, as for
+                `Node`. Limits the children of each node by its visit count.
+            policy:
+                The policy choosing the moves of playouts. Playouts are
+                uniformly random if none is given.
+            seed:
+                The seed of the random generator of the search. Searches with
+                the same seed and an iteration or node budget are repeatable.
+            node_budget:
+                The maximum number of nodes to keep in the search tree. Unlike
+                `max_nodes`, search goes on once it is reached. Instead, the
+                least useful leaves are evicted. The current node and its
+                children are never evicted, so a budget smaller than them is
+                exceeded, with a warning.
+            eviction:
+                How leaves are chosen for eviction: "visits" evicts the
+                least-visited leaves, and "lru" the leaves simulated least
+                recently.
+            queue:
+                A queue of leaves to evaluate with an `Evaluator` instead of
+                playing them out. Leaves are evaluated in batches, and the
+                queue is flushed at the end of every search. The queue may be
+                shared with other searches. The phases of iterations are not
+                timed in `SearchStats`.
+            rave:
+                If given, nodes gather all-moves-as-first statistics from
+                their playouts, and children are selected with
+                `rave_score_function`, with this equivalence parameter. Moves
+                of one player must mean the same thing in every state, as
+                squares do in Tic Tac Toe and m,n,k-games.
+            memory_budget:
+                The maximum memory of the search tree, in bytes, as estimated
+                by `tree_bytes`. It is enforced like `node_budget`, as a
+                number of nodes that depends on the game and the settings.
+
+        If no budget is given, `DEFAULT_ITERATIONS` iterations are run per move.
+        """
+        if iterations is None and time_limit is None and max_nodes is None:
+            iterations = MCTSAgent.DEFAULT_ITERATIONS
+        if eviction not in ("visits", "lru"):
+            raise ValueError(f"Unknown eviction policy: {eviction}")
+
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes
+        self.node_budget = node_budget
+        self.memory_budget = memory_budget
+        self.eviction = eviction
+        self.table = table
+        self.snapshot = snapshot
+        self.widening = widening
+        self.policy = policy
+        self.queue = queue
+        self.rave = rave
+        self.rng = SearchRandom(seed)
+        self.collect_stats = collect_stats or on_search is not None
+        self.on_search = on_search
+        self.last_stats: SearchStats = None
 
         self.root:Node = None
         self.curr_node: Node = None
+        self.node_count = 0
+        self.bytes_per_node = MCTSAgent.BYTES_PER_NODE
 
     def make_move(self, state: AbstractState):
         """Explore possible moves and pick the best one.
@@ -57,18 +298,285 @@ class MCTSAgent(Agent):
             The chosen move to make from the possible moves at this game state.
         """
 
-        if self.curr_node.state != state:
-            warnings.warn("Current state of game does not match current state of MCT! Continuing with game state, but children may differ.")
-            self.curr_node.state = state
+        if self.curr_node is None:
+            # The game has just started with this agent's move
+            self.reset(state)
+        elif self.curr_node.state != state:
+            # The children of the current node are for a different state, so
+            # they may not even be valid moves. Search the game state afresh.
+            warnings.warn("Current state of game does not match current state of MCT! Continuing with game state in a new tree.")
+            self.reset(state)
 
-        # Select, expand, and choose the best move
-        expansion_node = self.curr_node.select()
-        expansion_node.expand()
+        # Search within the budget, and choose the best move
+        self.search()
         return self.curr_node.best_move
 
+    def reset(self, state: AbstractState):
+        """Start a new search tree at a state, releasing the current tree.
+
+        Use this to search a position with `search` directly, rather than
+        through `make_move` during a game.
+
+        Args:
+            state: The game state at the root of the new tree.
+        """
+        self._reroot(self._new_node(state))
+
+    @property
+    def tree_bytes(self) -> int:
+        """The estimated memory used by the search tree, in bytes."""
+        return self.node_count * self.bytes_per_node
+
+    def estimate_bytes_per_node(self, state: AbstractState) -> int:
+        """Estimate the memory used by each node of a tree searched from a state.
+
+        Nodes grow with the number of moves of the game, which the legal
+        moves of the root bound, and with RAVE, which keeps statistics of the
+        moves seen below every node. States larger than a few integers, e.g.
+        `TicTacToeState` with its lists of rows, add their own size, so the
+        estimate is low for them.
+
+        Args:
+            state: The game state at the root of the tree.
+
+        Returns:
+            The estimated bytes per node.
+        """
+        per_move = MCTSAgent.BYTES_PER_MOVE
+        if self.rave is not None:
+            per_move += MCTSAgent.AMAF_BYTES_PER_MOVE
+        return MCTSAgent.BYTES_PER_NODE + per_move * len(state.legal_move_indices())
+
+    @property
+    def _node_limit(self) -> int:
+        """The number of nodes the node and memory budgets allow, if any."""
+        limit = self.node_budget
+        if self.memory_budget is not None:
+            nodes = max(1, self.memory_budget // self.bytes_per_node)
+            limit = nodes if limit is None else min(limit, nodes)
+        return limit
+
+    def _new_node(self, state: AbstractState, parent: Node = None) -> Node:
+        """Create a node with the settings and random generator of this agent.
+
+        Args:
+            state: The game state of the node.
+            parent: The parent of the node, if any.
+
+        Returns:
+            The new node.
+        """
+        if self.rave is None:
+            return Node(state, parent=parent, rng=self.rng, table=self.table, snapshot=self.snapshot, widening=self.widening, policy=self.policy)
+
+        score_fn = partial(rave_score_function, equivalence=self.rave)
+        return Node(state, parent=parent, rng=self.rng, score_fn=score_fn, table=self.table, snapshot=self.snapshot, widening=self.widening, policy=self.policy, rave=True)
+
+    def search(self) -> int:
+        """Select and expand nodes below the current node until a budget is
+        exhausted, or the outcome of the current node is proven.
+
+        If `collect_stats` is set, the statistics of the search are stored in
+        `last_stats` and passed to `on_search`.
+
+        Returns:
+            The number of iterations run.
+        """
+        start = time.perf_counter()
+        deadline = None if self.time_limit is None else start + self.time_limit
+        stats = SearchStats() if self.collect_stats else None
+
+        iterations = 0
+        while self.curr_node.proven is None:
+            if stats is None or self.queue is not None:
+                self._iterate()
+            else:
+                self._timed_iteration(stats)
+            iterations += 1
+
+            if self.iterations is not None and iterations >= self.iterations:
+                break
+            if self.max_nodes is not None and self.node_count >= self.max_nodes:
+                break
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+
+        # Evaluate the leaves still pending, so the move is chosen on them
+        if self.queue is not None:
+            self.queue.flush()
+
+        if stats is not None:
+            stats.iterations = iterations
+            stats.elapsed = time.perf_counter() - start
+            stats.root_visits = {move: child.scores.total() for move, child in self.curr_node.children.items()}
+            self.last_stats = stats
+            if self.on_search is not None:
+                self.on_search(stats)
+
+        return iterations
+
+    def ponder(self, stop: threading.Event) -> int:
+        """Search below the current node until told to stop.
+
+        Meant to run in a background thread while another player is thinking,
+        so that the search can continue from the subtree of the move they
+        make. The time and iteration budgets do not apply, but `max_nodes`
+        does.
+
+        Args:
+            stop: Set to stop searching.
+
+        Returns:
+            The number of iterations run.
+        """
+        iterations = 0
+        while self.curr_node is not None and self.curr_node.proven is None and not stop.is_set():
+            if self.max_nodes is not None and self.node_count >= self.max_nodes:
+                break
+            self._iterate()
+            iterations += 1
+
+        if self.queue is not None:
+            self.queue.flush()
+
+        return iterations
+
+    def _iterate(self):
+        """Run one iteration of the search."""
+        # Select and expand a leaf, keeping track of the tree size
+        expansion_node = self.curr_node.select()
+        if self.queue is None:
+            self.node_count += len(expansion_node.expand())
+        else:
+            self._queue_leaf(expansion_node)
+
+        limit = self._node_limit
+        if limit is not None and self.node_count > limit:
+            self.evict()
+
+    def _queue_leaf(self, expansion_node: Node):
+        """Expand a node, and queue the new leaf for evaluation.
+
+        Decided games need no evaluation, so their outcome is recorded at
+        once.
+
+        Args:
+            expansion_node: The node selected for expansion.
+        """
+        node = expansion_node.add_child()
+        if node is None:
+            node = expansion_node
+        else:
+            self.node_count += 1
+
+        if node.state.outcome.is_decided:
+            node.update(node.state.outcome)
+        else:
+            self.queue.submit(node)
+
+    def evict(self, count: int = None) -> int:
+        """Remove leaves from the search tree to free memory.
+
+        Leaves are removed in order of the eviction policy, and their moves
+        are queued to be tried again at their parents. Their statistics stay
+        counted in their ancestors, whose scores aggregate every playout below
+        them. The current node and its children, which the next move is
+        chosen from, are never evicted, and neither are proven leaves, which
+        their ancestors' proofs rest on, or leaves waiting to be evaluated.
+
+        Args:
+            count: The number of leaves to evict. Defaults to the number
+                needed to bring the tree a tenth of the budget below the node
+                or memory budget.
+
+        Returns:
+            The number of nodes evicted.
+        """
+        limit = self._node_limit
+        if count is None:
+            count = self.node_count - int(limit * (1 - MCTSAgent.EVICTION_FRACTION))
+
+        # Find every leaf below the children of the current node
+        leaves = []
+        stack = [child for child in self.curr_node.children.values() if child.children]
+        while stack:
+            node = stack.pop()
+            for child in node.children.values():
+                if child.children:
+                    stack.append(child)
+                elif child.proven is None and not child.virtual_loss:
+                    leaves.append(child)
+
+        if self.eviction == "lru":
+            key = lambda leaf: leaf.last_visit
+        else:
+            key = lambda leaf: leaf.scores.total()
+
+        evicted = heapq.nsmallest(count, leaves, key=key)
+        for leaf in evicted:
+            leaf.parent.remove_child(leaf)
+
+        self.node_count -= len(evicted)
+        if limit is not None and self.node_count > limit:
+            # The message does not change while the tree stays over budget,
+            # so it is only shown once
+            warnings.warn(f"The search tree cannot be evicted below its budget of {limit} nodes, since the current node, its children and proven or pending leaves are never evicted.")
+        return len(evicted)
+
+    def _timed_iteration(self, stats: SearchStats):
+        """Run one iteration of the search, timing each phase.
+
+        This does the same as `_iterate`, but with the phases of
+        `Node.expand` run one by one.
+
+        Args:
+            stats: The statistics to add the timings and tree shape to.
+        """
+        t0 = time.perf_counter()
+        expansion_node = self.curr_node.select()
+        t1 = time.perf_counter()
+        stats.select_time += t1 - t0
+
+        # Measure the depth of the selected leaf below the current node, and
+        # the branching of the path to it
+        depth = 0
+        children = 0
+        node = expansion_node
+        while node is not self.curr_node:
+            node = node.parent
+            depth += 1
+            children += len(node.children)
+        stats.add_path(depth, children)
+
+        t1 = time.perf_counter()
+        node = expansion_node.add_child()
+        if node is not None:
+            stats.nodes += 1
+            self.node_count += 1
+        else:
+            # Simulate the leaf itself if it cannot be expanded
+            node = expansion_node
+        t2 = time.perf_counter()
+        stats.expand_time += t2 - t1
+
+        node, outcome, moves = node.rollout()
+        t3 = time.perf_counter()
+        node.update(outcome, moves)
+        t4 = time.perf_counter()
+        stats.simulate_time += t3 - t2
+        stats.backpropagate_time += t4 - t3
+
+        limit = self._node_limit
+        if limit is not None and self.node_count > limit:
+            self.evict()
+
     def observe_move(self, player: Any, move: Any, new_state: AbstractState) -> None:
-        """Observe a move made by another player, updating the state tree.
-        
+        """Observe a move made by any player, including this agent, and
+        re-root the search tree at the new state.
+
+        The subtree of the move is kept with its statistics, and the rest of
+        the tree is released.
+
         Args:
             player: The player making the move.
             move: The move made.
@@ -76,23 +584,39 @@ class MCTSAgent(Agent):
         """
         # If the game has just started, set the root
         if self.curr_node is None:
-            self.root = Node(new_state)
-            self.curr_node = self.root
+            self.reset(new_state)
             return
-        else:
-            # Otherwise, try to move down the pre-existing tree
-            next_node = self.curr_node.children.get(move, None)
+
+        # Otherwise, try to move down the pre-existing tree
+        next_node = self.curr_node.children.pop(move, None)
 
         if next_node is None:
             # This is a novel game state unseen before
-            next_node = Node(new_state, Counter(), parent=self.curr_node)
+            next_node = self._new_node(new_state)
         elif next_node.state != new_state:
             # We've seen this move before, but it led to a state not in the
-            # tree. Theoretically, this shouldn't happen.
-            next_node.state = new_state
-            warnings.warn("Next state does not match expected next state in MCT. Continuing with game-provided next state, but children may differ.")
-        
-        self.curr_node = next_node
+            # tree, e.g. because the tree missed a move. Its children cannot be
+            # trusted, so the game-provided state is searched afresh.
+            warnings.warn("Next state does not match expected next state in MCT. Continuing with game-provided next state in a new tree.")
+            next_node.release()
+            next_node = self._new_node(new_state)
+
+        self._reroot(next_node)
+
+    def _reroot(self, node: Node):
+        """Make a node the root of the search tree, releasing the old tree.
+
+        Args:
+            node: The new root. It must already be removed from the children
+                of its parent.
+        """
+        if self.curr_node is not None:
+            self.curr_node.release()
+
+        node.parent = None
+        self.root = self.curr_node = node
+        self.node_count = node.count_nodes()
+        self.bytes_per_node = self.estimate_bytes_per_node(node.state)
 
     def see_state(self, state: AbstractState) -> None:
         # TODO complete
@@ -100,8 +624,12 @@ class MCTSAgent(Agent):
 
         
 
+# Ticks once per simulation recorded, to order nodes by their last visit
+_clock = itertools.count(1)
+
+
 class Node:
-    def __init__(self, state: AbstractState, scores=Counter(), children: Dict[Hashable, Node] = dict(), rng=None, score_fn=default_score_function, parent=None):
+    def __init__(self, state: AbstractState, scores=None, children: Dict[Hashable, Node] = None, rng=None, score_fn=default_score_function, parent=None, grow_playouts=False, table: TranspositionTable = None, snapshot: TreeSnapshot = None, widening=None, policy: RolloutPolicy = None, rave: bool = False):
         """Create a node for a Monte Carlo search tree.
         Args:
             state:
@@ -111,11 +639,40 @@ class Node:
             children:
                 A mapping of the possible moves in this game state to the game states reached by making those moves.
             rng:
-                The random object to use for exploration
+                The random object to use for exploration. It is shared with
+                the descendants of the node, so one generator serves the
+                whole tree.
             score_fn:
                 The function to score the node for exploitability/explorability.
             parent:
                 The parent node of this one.
+            grow_playouts:
+                If True, every state visited by a playout is added to the tree
+                as a node. Otherwise, playouts are played out with `playout`
+                and only their result is recorded at this node.
+            table:
+                A transposition table. If given, the node and its descendants
+                share the scores of their state with every other node for a
+                transposition of it, unless `scores` is given.
+            snapshot:
+                A saved tree. If given, the node and its descendants start
+                with the statistics saved for their state, unless `scores` is
+                given. The statistics are only read when a node is created.
+            widening:
+                The constants (C, alpha) of progressive widening. If given,
+                the node may have at most ceil(C * n ** alpha) children after
+                n simulations. Otherwise, every move may be tried.
+            policy:
+                The policy choosing the moves of playouts from the node and
+                its descendants. If none, moves are chosen uniformly at
+                random.
+            rave:
+                If True, the node and its descendants gather AMAF statistics
+                of their moves from every playout through them. Untried moves
+                with the best AMAF value are tried first, and children are
+                scored with `score_fn(node_wins, node_simulations,
+                parent_simulations, amaf_wins, amaf_simulations)`, e.g. with
+                `rave_score_function`.
         """
         # Initialize rng if none is provided.
         if rng is None:
@@ -123,11 +680,46 @@ class Node:
         else:
             self.rng = rng
 
+        # Give every node its own containers, so that nodes never share them
+        # unless they are transpositions
+        if scores is None:
+            scores = Counter() if table is None else table.lookup(state)
+            if snapshot is not None and not scores:
+                scores.update(snapshot.lookup(state))
+        if children is None:
+            children = dict()
+
         self.state = state
         self.children = children
         self.scores = scores
         self.score_fn = score_fn
         self.parent = parent
+        self.grow_playouts = grow_playouts
+        self.table = table
+        self.snapshot = snapshot
+        self.widening = widening
+        self.policy = policy
+
+        # The move from the parent leading to this node
+        self.move: Hashable = None
+
+        # The results of the playouts through this node by each move first
+        # made in them by the player to move here, if RAVE is used
+        self.amaf: Dict[Hashable, Counter] = dict() if rave else None
+
+        # The indices of the moves without a child yet, in the random order
+        # they will be tried. Filled the first time the node is expanded.
+        self.untried: List[int] = None
+
+        # Pending simulations of parallel searches, counted as losses
+        self.virtual_loss = 0
+
+        # When the node was last simulated, in ticks of `_clock`
+        self.last_visit = 0
+
+        # The outcome of the game under perfect play from this node, once it
+        # is known for certain
+        self.proven: Outcome = None
 
     def select(self):
         """Select a node to expand in exploration.
@@ -135,14 +727,17 @@ class Node:
         Returns:
             The selected leaf node in the MCT to explore.
         """
-        if len(self.children) == 0:
-            # Select this node for exploration, since it has no children
+        if self.expandable or len(self.children) == 0:
+            # Select this node for exploration, since it can get a new child
+            # or has no children
             return self
         else:
             # Recursively select child nodes until we reach a leaf using the
             # explore/exploit potential of the nodes.
+            # Children are scored for the player choosing between them
             parent_simulations = self.scores.total()
-            next_state = max(self.children.values(), key=lambda s: s.score(parent_simulations))
+            player = self.state.current_player
+            next_state = max(self.children.values(), key=lambda s: s.score(parent_simulations, player))
             return next_state.select()
 
     def score(self, parent_simulations, player=None, **kwargs):
@@ -162,22 +757,210 @@ class Node:
         if player is None:
             player = self.state.current_player
 
-        node_wins = self.scores[player]
-        node_simulations = self.scores.total()
-        return self.score_fn(node_wins, node_simulations, parent_simulations)
+        # Solved nodes need no more search
+        if self.proven is not None:
+            return -math.inf
 
-    def expand(self):
-        """Try different moves at this state, checking which ones are effective."""
-        # TODO limit to less than all possible moves
+        node_wins = credit(self.scores, player)
+        node_simulations = self.scores.total() + self.virtual_loss
 
-        # If the game is decided now, we cannot expand
-        if self.state.outcome.is_decided:
-            return
+        # Nodes that have never been simulated are always explored first
+        if node_simulations == 0:
+            return math.inf
+
+        # Statistics shared through a transposition table may give a child
+        # playouts that its parent has not counted
+        parent_simulations = max(parent_simulations, 1)
+        if self.amaf is None or self.parent is None:
+            return self.score_fn(node_wins, node_simulations, parent_simulations)
+
+        amaf = self.parent.amaf.get(self.move, Counter())
+        return self.score_fn(node_wins, node_simulations, parent_simulations, credit(amaf, player), amaf.total())
+
+    @property
+    def expandable(self) -> bool:
+        """Whether a child can be added to this node.
+
+        This is the case if the game is undecided, some moves have not been
+        tried yet, and progressive widening allows another child.
+        """
+        if self.untried is None:
+            return self.state.outcome.is_undecided
+        if not self.untried:
+            return False
+        if self.widening is None:
+            return True
+
+        # Widen regardless once every child is solved, since there is nothing
+        # left to select below this node
+        if all(child.proven is not None for child in self.children.values()):
+            return True
+
+        c, alpha = self.widening
+        return len(self.children) < max(1, math.ceil(c * self.scores.total() ** alpha))
+
+    def expand(self) -> List[Node]:
+        """Try a new move at this state, checking whether it is effective.
+
+        Returns:
+            The children added to this node.
+        """
+        # If the node cannot be expanded, e.g. because the game is decided,
+        # its result is recorded again so that selecting it is not wasted
+        child = self.add_child()
+        if child is None:
+            self.simulate()
+            return []
+
+        child.simulate()
+        return [child]
+
+    def add_child(self) -> Node:
+        """Add a child node for the next untried move in this state.
+
+        Returns:
+            The child added to this node, or None if it cannot be expanded.
+        """
+        if not self.expandable:
+            return None
+
+        # Queue up the moves in a random order the first time, skipping any
+        # that already have a child, e.g. from a grown playout
+        if self.untried is None:
+            self.untried = [index for index in self.state.legal_move_indices() if self.state.index_move(index) not in self.children]
+            self.rng.shuffle(self.untried)
+            if not self.untried:
+                return None
+
+        if self.amaf:
+            # Try the move with the best AMAF value next, and moves not seen
+            # in any playout as if they were even
+            player = self.state.current_player
+
+            def amaf_value(i):
+                amaf = self.amaf.get(self.state.index_move(self.untried[i]))
+                return credit(amaf, player) / amaf.total() if amaf else 0.5
+
+            best = max(range(len(self.untried)), key=amaf_value)
+            self.untried[best], self.untried[-1] = self.untried[-1], self.untried[best]
+
+        index = self.untried.pop()
+        child = self.children[self.state.index_move(index)] = self._make_child(index)
 
-        # Try all the possible moves in this state (see TODO above)
-        for move in self.state.possible_moves():
-            self.children[move] = Node(self.state.next_move(self.state.current_player, move), parent=self)
-            self.children[move].simulate()
+        # A decided game is trivially proven, which may prove its ancestors
+        if child.state.outcome.is_decided:
+            child.proven = child.state.outcome
+            child.propagate_proof()
+
+        return child
+
+    def propagate_proof(self):
+        """Prove the ancestors of this node whose outcome is now certain.
+
+        A node is a proven win for the player to move if any child is, and
+        otherwise, once all its moves have been tried and every child is
+        proven, a tie if any child is one, or else a loss.
+        """
+        node = self.parent
+        while node is not None and node.proven is None and node._prove():
+            node = node.parent
+
+    def _prove(self) -> bool:
+        """Try to prove this node from the proven outcomes of its children.
+
+        Returns:
+            True if the node is now proven.
+        """
+        player = self.state.current_player
+        tie = None
+        unproven = False
+
+        # Copy the children, since tree-parallel threads may be adding to
+        # them while a proof is propagated
+        for child in list(self.children.values()):
+            if child.proven is None:
+                unproven = True
+            elif child.proven.is_win and child.proven.winner == player:
+                self.proven = child.proven
+                return True
+            elif child.proven.is_tie:
+                tie = child.proven
+
+        if unproven or self.untried is None or self.untried:
+            return False
+
+        # Every move loses unless one ties
+        self.proven = tie if tie is not None else next(iter(self.children.values())).proven
+        return True
+
+    def remove_child(self, child: Node):
+        """Remove a leaf child, so that its move is tried again later.
+
+        The move is queued to be tried after every other untried move.
+
+        Args:
+            child: The child to remove. It must have no children.
+        """
+        for move, node in self.children.items():
+            if node is child:
+                break
+        else:
+            raise ValueError("Not a child of this node")
+
+        del self.children[move]
+        if self.untried is not None:
+            self.untried.insert(0, self.state.move_index(move))
+        child.parent = None
+
+    def count_nodes(self) -> int:
+        """Count the nodes of the subtree of this node, including itself."""
+        count = 0
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.children.values())
+        return count
+
+    def release(self):
+        """Unlink this node and its descendants from each other.
+
+        Parents and children refer to each other, so a discarded subtree
+        would otherwise only be freed by the cyclic garbage collector. Once
+        unlinked, the nodes are freed as soon as nothing else refers to them.
+        """
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            stack.extend(node.children.values())
+            node.children = dict()
+            node.parent = None
+
+    def _make_child(self, index: int) -> Node:
+        """Create the child node reached by making a move in this state.
+
+        The child shares the rng and search settings of this node.
+
+        Args:
+            index: The index of a legal move of the current player.
+
+        Returns:
+            The new child node. It is not added to `children`.
+        """
+        child = Node(
+            self.state.apply_unchecked(index),
+            rng=self.rng,
+            score_fn=self.score_fn,
+            parent=self,
+            grow_playouts=self.grow_playouts,
+            table=self.table,
+            snapshot=self.snapshot,
+            widening=self.widening,
+            policy=self.policy,
+            rave=self.amaf is not None,
+        )
+        child.move = self.state.index_move(index)
+        return child
 
     def simulate(self):
         """Simulate a playout of the current node
@@ -185,26 +968,125 @@ class Node:
         Returns:
             The updated win counts of for the players at this node.
         """
-        if self.state.outcome.is_win:
-            # Update win counts if someone has won
-            self.scores[self.state.outcome.winner] += 1
-            self.backpropagate()
-        elif self.state.outcome.is_tie:
-            pass
-            # TODO: partial points for tie?
-        else:
-            # Make moves until this playout is decided
-            move = self.rng.choice(self.state.possible_moves())
-            self.children[move] = Node(self.state.next_move(self.state.current_player, move), parent=self)
-            self.children[move].simulate()
-
+        node, outcome, moves = self.rollout()
+        node.update(outcome, moves)
         return self.scores
-    
-    def backpropagate(self):
-        """Update the win scores for the parents of this node."""
-        if self.parent is not None:
-            self.parent.scores += self.scores
-            self.parent.backpropagate()
+
+    def rollout(self):
+        """Play out the game from this node until it is decided.
+
+        Returns:
+            The node at which the outcome should be recorded, the outcome of
+            the playout, and, if the node gathers AMAF statistics, the player
+            who first made each move of the playout after the node. Unless
+            `grow_playouts` is set, the node is this one; otherwise it is the
+            last node added by the playout.
+        """
+        if not self.grow_playouts:
+            # Play out the game without touching the tree
+            if self.amaf is not None:
+                return (self, *amaf_playout(self.state, self.rng, self.policy))
+            if self.policy is None:
+                return self, playout(self.state, self.rng), None
+            return self, self.policy.playout(self.state, self.rng), None
+
+        # Make moves until this playout is decided, adding every state to the
+        # tree
+        node = self
+        while node.state.outcome.is_undecided:
+            if node.policy is None:
+                index = node.state.random_move_index(node.rng)
+            else:
+                index = node.policy.choose(node.state, node.rng)
+
+            move = node.state.index_move(index)
+            child = node.children.get(move)
+            if child is None:
+                child = node.children[move] = node._make_child(index)
+
+                # The move has been tried, so expanding the node later tries
+                # the others
+                if node.untried is None:
+                    node.untried = [i for i in node.state.legal_move_indices() if i != index]
+                    node.rng.shuffle(node.untried)
+                elif index in node.untried:
+                    node.untried.remove(index)
+            node = child
+
+        # The moves of the playout are those of the new nodes, which
+        # backpropagation notes on its way up
+        return node, node.state.outcome, None if self.amaf is None else dict()
+
+    def update(self, outcome: Outcome, moves: Dict[Hashable, Any] = None):
+        """Record the outcome of a playout at this node and backpropagate it.
+
+        Args:
+            outcome:
+                The outcome of the playout.
+            moves:
+                The player who first made each move of the playout, if AMAF
+                statistics are gathered.
+        """
+        self.last_visit = next(_clock)
+        self.backpropagate(Counter({outcome.winner if outcome.is_win else TIES: 1}), moves)
+
+    def record(self, wins: Counter, ties: float = 0):
+        """Record the results of several playouts of this node at once.
+
+        Args:
+            wins:
+                The number of playouts won by each player. Counts may be
+                fractional, e.g. the expected scores of an `Evaluator`.
+            ties:
+                The number of tied playouts, counted under `TIES`.
+        """
+        self.last_visit = next(_clock)
+        delta = Counter(wins)
+        if ties:
+            delta[TIES] += ties
+        self.backpropagate(delta)
+
+    def backpropagate(self, delta: Counter, moves: Dict[Hashable, Any] = None):
+        """Add the results of new playouts to this node and its ancestors.
+
+        The tree is walked once from this node to the root, and only the new
+        results are added to the counts of each node, in place, so that
+        counts shared through a transposition table stay shared.
+
+        With the moves of the playout, the results are also added to the
+        AMAF statistics of every move the player to move at each node made
+        after it, in the tree or in the playout.
+
+        Args:
+            delta:
+                The new wins of each player, and ties under `TIES`.
+            moves:
+                The player who first made each move of the playout after this
+                node, if AMAF statistics are gathered. The moves of the tree
+                are added to it on the way up.
+        """
+        node = self
+        while node is not None:
+            scores = node.scores
+            for key, count in delta.items():
+                scores[key] += count
+
+            if moves is not None:
+                if node.amaf is not None:
+                    player = node.state.current_player
+                    for move, mover in moves.items():
+                        if mover == player:
+                            amaf = node.amaf.get(move)
+                            if amaf is None:
+                                amaf = node.amaf[move] = Counter()
+                            for key, count in delta.items():
+                                amaf[key] += count
+
+                # The move to this node was made before any move below it
+                if node.parent is not None:
+                    moves[node.move] = node.parent.state.current_player
+
+            node = node.parent
     
     @property
     def best_move(self, player=None):
@@ -217,6 +1099,12 @@ class Node:
         if player is None:
             player = self.state.current_player
 
-        # Choose the best move based on win counts
-        return max(self.children.keys(), key=lambda k: self.children[k].scores[player])
+        # Choose proven wins, and avoid proven losses. Otherwise, choose the
+        # best move based on win counts.
+        def proof_rank(child):
+            if child.proven is None or child.proven.is_tie:
+                return 1
+            return 2 if child.proven.winner == player else 0
+
+        return max(self.children.keys(), key=lambda k: (proof_rank(self.children[k]), credit(self.children[k].scores, player)))
 
@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+from typing import Any, Collection, Sequence
+from functools import lru_cache
+
+from .state import AbstractState, Outcome, Win, Tie, Undecided
+from .ttt import zobrist_key
+
+# The directions of lines on the board: horizontal, vertical and the two
+# diagonals
+DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1))
+
+def _column_name(x: int) -> str:
+    """Name a column with letters, like spreadsheet columns: A-Z, AA, AB..."""
+    name = ""
+    x += 1
+    while x > 0:
+        x, r = divmod(x - 1, 26)
+        name = chr(65 + r) + name
+    return name
+
+
+class MNKGeometry:
+    """The precomputed tables of an m x n board with k in a row to win.
+
+    Shared by every state of a board size, so states only hold their marks.
+    Square (y, x) is index `y * n + x`, with row 0 at the top.
+
+    Attributes:
+        m: The number of rows.
+        n: The number of columns.
+        k: The number of marks in a row needed to win.
+        area: The number of squares.
+        full: The bitmask of a completely filled board.
+        rays: For every square and direction, the squares on either side of
+            it along the direction, at most k - 1 steps away, nearest first.
+        moves: The name of the move on every square, e.g. "H8": the column
+            letter and the row number counted from the bottom.
+        squares: The square of every move name.
+        zobrist: The Zobrist keys of each player's mark on each square.
+        zobrist_turn: The Zobrist keys of the player to move.
+    """
+
+    def __init__(self, m: int, n: int, k: int, players: int):
+        """
+        Args:
+            m: The number of rows.
+            n: The number of columns.
+            k: The number of marks in a row needed to win.
+            players: The number of players.
+        """
+        if not (m > 0 and n > 0 and 0 < k <= max(m, n)):
+            raise ValueError(f"Invalid board: {m} x {n} with {k} in a row")
+
+        self.m = m
+        self.n = n
+        self.k = k
+        self.area = m * n
+        self.full = (1 << self.area) - 1
+
+        rays = []
+        for sq in range(self.area):
+            y, x = divmod(sq, n)
+            square_rays = []
+            for dy, dx in DIRECTIONS:
+                sides = []
+                for sign in (1, -1):
+                    side = []
+                    for step in range(1, k):
+                        ry, rx = y + sign * step * dy, x + sign * step * dx
+                        if not (0 <= ry < m and 0 <= rx < n):
+                            break
+                        side.append(ry * n + rx)
+                    sides.append(tuple(side))
+                square_rays.append(tuple(sides))
+            rays.append(tuple(square_rays))
+        self.rays = tuple(rays)
+
+        self.moves = tuple(f"{_column_name(sq % n)}{m - sq // n}" for sq in range(self.area))
+        self.squares = {move: sq for sq, move in enumerate(self.moves)}
+        self.zobrist = tuple(tuple(zobrist_key("mnk", p, sq) for sq in range(self.area)) for p in range(players))
+        self.zobrist_turn = tuple(zobrist_key("mnk turn", p) for p in range(players))
+
+    def wins(self, board: int, sq: int) -> bool:
+        """Check whether a mark on a square completes a line of k.
+
+        Only the lines through the square are checked, so the cost does not
+        depend on the size of the board.
+
+        Args:
+            board: The bitboard of the player, including the new mark.
+            sq: The square of the new mark.
+        """
+        for forward, backward in self.rays[sq]:
+            count = 1
+            for ray in (forward, backward):
+                for other in ray:
+                    if not board >> other & 1:
+                        break
+                    count += 1
+            if count >= self.k:
+                return True
+        return False
+
+
+@lru_cache(maxsize=None)
+def geometry(m: int, n: int, k: int, players: int = 2) -> MNKGeometry:
+    """Get the shared tables of a board size."""
+    return MNKGeometry(m, n, k, players)
+
+
+class MNKState(AbstractState):
+    """Game states of m,n,k-games: k in a row on an m x n board.
+
+    Tic Tac Toe is the 3,3,3-game, and Gomoku the 15,15,5-game. Each
+    player's marks are one integer bitboard. The outcome is found by checking
+    only the lines through the last move, the occupied squares are updated
+    with each move, and playouts pick random moves without listing the empty
+    squares, so the cost of a move does not grow with the board.
+
+    Moves are named by column letter and row number counted from the bottom,
+    e.g. "H8" is the center of a 15 x 15 board.
+
+    Attributes:
+        geometry: The shared tables of the board size.
+        boards: The bitboards of the players, in the same order as `players`.
+        players: The player symbols, in turn order.
+        occupied: The bitmask of all squares that have been played.
+        moves_made: The number of marks on the board.
+        zobrist: The Zobrist hash of the boards and player to move.
+    """
+
+    __slots__ = ("geometry", "boards", "players", "occupied", "moves_made", "zobrist", "_turn", "_last", "_outcome")
+
+    def __init__(self, m: int = 15, n: int = 15, k: int = 5, players=("X", "O"), boards=None, turn: int = 0):
+        """
+        Args:
+            m, n:
+                The number of rows and columns of the board.
+            k:
+                The number of marks in a row needed to win.
+            players:
+                The player symbols in turn order.
+            boards:
+                The bitboards of each player. If none, a new game is
+                constructed. The outcome of a given position is found by
+                checking every mark once.
+            turn:
+                The index into `players` of the player who moves next.
+        """
+        self.players = tuple(players)
+        self.geometry = geometry(m, n, k, len(self.players))
+        self.boards = tuple(boards) if boards is not None else (0,) * len(self.players)
+        self._turn = turn
+        self._last = None
+        self._outcome = None
+
+        self.occupied = 0
+        for board in self.boards:
+            self.occupied |= board
+        self.moves_made = self.occupied.bit_count()
+
+        zobrist = self.geometry.zobrist_turn[turn]
+        for p, board in enumerate(self.boards):
+            for sq in _bits(board):
+                zobrist ^= self.geometry.zobrist[p][sq]
+        self.zobrist = zobrist
+
+    @property
+    def outcome(self) -> Outcome:
+        if self._outcome is None:
+            self._outcome = self._compute_outcome()
+        return self._outcome
+
+    def _compute_outcome(self) -> Outcome:
+        g = self.geometry
+        if self._last is not None:
+            # Only the player who just moved can have won, on a line through
+            # their last move
+            mover = (self._turn - 1) % len(self.players)
+            if g.wins(self.boards[mover], self._last):
+                return Win(self.players[mover])
+        else:
+            # The history is unknown, so check every mark
+            for player, board in zip(self.players, self.boards):
+                for sq in _bits(board):
+                    if g.wins(board, sq):
+                        return Win(player)
+
+        if self.moves_made == g.area:
+            return Tie()
+
+        return Undecided()
+
+    @property
+    def current_player(self) -> Any:
+        return self.players[self._turn]
+
+    @property
+    def turn(self) -> int:
+        """The index into `players` of the player who moves next."""
+        return self._turn
+
+    def possible_moves(self) -> Collection[Any]:
+        return [self.geometry.moves[sq] for sq in self.legal_move_indices()]
+
+    def next_move(self, player, move) -> AbstractState:
+        sq = self.geometry.squares.get(move)
+        if sq is None or self.occupied >> sq & 1 or self.outcome.is_decided:
+            raise ValueError(f"Invalid move: {move}")
+
+        return self.apply_unchecked(sq)
+
+    @property
+    def legal_mask(self) -> int:
+        # No moves can be made once the game is decided
+        if self.outcome.is_decided:
+            return 0
+
+        return self.geometry.full & ~self.occupied
+
+    def legal_move_indices(self) -> Sequence[int]:
+        # Moves are indexed by square
+        return list(_bits(self.legal_mask))
+
+    def random_move_index(self, rng) -> int:
+        g = self.geometry
+
+        # While a quarter of the board is empty, random squares are tried
+        # until an empty one is found, which takes at most four tries on
+        # average. Only nearly full boards list their empty squares.
+        if 4 * (g.area - self.moves_made) >= g.area:
+            while True:
+                sq = rng.randrange(g.area)
+                if not self.occupied >> sq & 1:
+                    return sq
+
+        return rng.choice(self.legal_move_indices())
+
+    def move_index(self, move) -> int:
+        sq = self.geometry.squares.get(move)
+        if sq is None:
+            raise ValueError(f"Invalid move: {move}")
+        return sq
+
+    def index_move(self, index: int) -> Any:
+        return self.geometry.moves[index]
+
+    def apply_unchecked(self, sq: int) -> AbstractState:
+        # Successors are built without the constructor, updating the boards
+        # and hash with just the new mark
+        g = self.geometry
+        turn = (self._turn + 1) % len(self.players)
+        boards = list(self.boards)
+        boards[self._turn] |= 1 << sq
+
+        state = MNKState.__new__(MNKState)
+        state.geometry = g
+        state.players = self.players
+        state.boards = tuple(boards)
+        state.occupied = self.occupied | 1 << sq
+        state.moves_made = self.moves_made + 1
+        state.zobrist = self.zobrist ^ g.zobrist[self._turn][sq] ^ g.zobrist_turn[self._turn] ^ g.zobrist_turn[turn]
+        state._turn = turn
+        state._last = sq
+        state._outcome = None
+        return state
+
+    @property
+    def rows(self):
+        """The board as rows of player symbols, with ' ' for empty squares."""
+        g = self.geometry
+        rows = [[' ' for x in range(g.n)] for y in range(g.m)]
+        for player, board in zip(self.players, self.boards):
+            for sq in _bits(board):
+                rows[sq // g.n][sq % g.n] = player
+        return rows
+
+    def __eq__(self, value: object) -> bool:
+        if not isinstance(value, MNKState):
+            return False
+
+        return self.geometry is value.geometry and self.boards == value.boards and self.players == value.players and self._turn == value._turn
+
+    def __hash__(self) -> int:
+        return self.zobrist
+
+    def __str__(self) -> str:
+        g = self.geometry
+        row_width = len(str(g.m))
+        column_width = max(len(_column_name(x)) for x in range(g.n))
+
+        s = ""
+        for y, row in enumerate(self.rows):
+            s += f"{g.m - y:>{row_width}}  " + " ".join(f"{'.' if square == ' ' else square:^{column_width}}" for square in row) + "\n"
+        s += " " * (row_width + 2) + " ".join(f"{_column_name(x):^{column_width}}" for x in range(g.n)) + "\n"
+        s += f"{self.current_player}'s turn"
+        return s
+
+    def __repr__(self) -> str:
+        return "\n".join(["".join(row) for row in self.rows]).replace(' ', '_')
+
+
+def _bits(mask: int):
+    """Iterate over the indices of the set bits of a mask, lowest first."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+from abc import abstractmethod
+from typing import Any, Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("mcts.models requires NumPy, which is installed with the numpy extra: pip install mcts[numpy]") from e
+
+from .state import AbstractState
+from .evaluation import Evaluator
+from .batch import board_tensor, random_playouts
+
+def board_features(states: Sequence[AbstractState], area: int) -> np.ndarray:
+    """Convert two-player bitboard states to a feature tensor.
+
+    Works with any state with `boards` and `turn`, such as
+    `BitboardTicTacToeState` and `MNKState`. Features are relative to the
+    player to move, so one model serves both players.
+
+    Args:
+        states:
+            The states to convert.
+        area:
+            The number of squares of the board.
+
+    Returns:
+        An array of shape (len(states), 2 * area), holding 1 for the squares
+        of the player to move in the first half, and for the squares of their
+        opponent in the second.
+    """
+    length = (area + 7) // 8
+    data = bytearray()
+    for state in states:
+        data += state.boards[state.turn].to_bytes(length, "little")
+        data += state.boards[1 - state.turn].to_bytes(length, "little")
+
+    bits = np.unpackbits(np.frombuffer(bytes(data), dtype=np.uint8).reshape(len(states), 2, length), axis=2, bitorder="little")
+    return bits[:, :, :area].reshape(len(states), 2 * area).astype(np.float32)
+
+
+class ValueEvaluator(Evaluator):
+    """A model of the value of a position for the player to move.
+
+    The model scores a whole batch of feature vectors with one vectorized
+    call. A value of 1 is a certain win for the player to move, -1 a certain
+    loss, and 0 an even game.
+
+    Attributes:
+        area: The number of squares of the board.
+    """
+
+    def __init__(self, area: int):
+        """
+        Args:
+            area: The number of squares of the board.
+        """
+        self.area = area
+
+    @abstractmethod
+    def value(self, features: np.ndarray) -> np.ndarray:
+        """Score a batch of positions.
+
+        Args:
+            features: The features of the positions, as returned by
+                `board_features`.
+
+        Returns:
+            The value of each position for the player to move, in [-1, 1].
+        """
+
+    def evaluate(self, states: Sequence[AbstractState]) -> List[Dict[Any, float]]:
+        values = self.value(board_features(states, self.area))
+
+        # The player to move wins with probability (1 + value) / 2
+        return [
+            {state.players[state.turn]: (1 + v) / 2, state.players[1 - state.turn]: (1 - v) / 2}
+            for state, v in zip(states, values.tolist())
+        ]
+
+
+class LinearEvaluator(ValueEvaluator):
+    """A linear value model: tanh(features @ weights + bias).
+
+    Attributes:
+        weights: The weight of each feature.
+        bias: The bias.
+    """
+
+    def __init__(self, weights: np.ndarray, bias: float = 0.0):
+        """
+        Args:
+            weights: The weight of each feature, of shape (2 * area,).
+            bias: The bias.
+        """
+        super().__init__(len(weights) // 2)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = np.float32(bias)
+
+    def value(self, features: np.ndarray) -> np.ndarray:
+        return np.tanh(features @ self.weights + self.bias)
+
+    @classmethod
+    def load(cls, path: str) -> LinearEvaluator:
+        """Load the weights saved with `save`."""
+        with np.load(path) as data:
+            return cls(data["weights"], float(data["bias"]))
+
+    def save(self, path: str):
+        """Save the weights to a `.npz` file."""
+        np.savez(path, weights=self.weights, bias=self.bias)
+
+
+class MLPEvaluator(ValueEvaluator):
+    """A value model with one hidden layer of rectified linear units.
+
+    The value is tanh(relu(features @ w1 + b1) @ w2 + b2).
+
+    Attributes:
+        w1, b1: The weights and biases of the hidden layer.
+        w2, b2: The weights and bias of the output.
+    """
+
+    def __init__(self, w1: np.ndarray, b1: np.ndarray, w2: np.ndarray, b2: float = 0.0):
+        """
+        Args:
+            w1: The weights of the hidden layer, of shape (2 * area, hidden).
+            b1: The biases of the hidden layer, of shape (hidden,).
+            w2: The weights of the output, of shape (hidden,).
+            b2: The bias of the output.
+        """
+        super().__init__(len(w1) // 2)
+        self.w1 = np.asarray(w1, dtype=np.float32)
+        self.b1 = np.asarray(b1, dtype=np.float32)
+        self.w2 = np.asarray(w2, dtype=np.float32)
+        self.b2 = np.float32(b2)
+
+    @classmethod
+    def random(cls, area: int, hidden: int = 64, rng: np.random.Generator = None) -> MLPEvaluator:
+        """Create a model with random weights, e.g. as the start of training.
+
+        Args:
+            area: The number of squares of the board.
+            hidden: The number of hidden units.
+            rng: The random generator of the weights.
+        """
+        if rng is None:
+            rng = np.random.default_rng()
+
+        w1 = rng.normal(0, np.sqrt(2 / (2 * area)), (2 * area, hidden))
+        w2 = rng.normal(0, np.sqrt(1 / hidden), hidden)
+        return cls(w1, np.zeros(hidden), w2)
+
+    def value(self, features: np.ndarray) -> np.ndarray:
+        hidden = np.maximum(features @ self.w1 + self.b1, 0)
+        return np.tanh(hidden @ self.w2 + self.b2)
+
+    @classmethod
+    def load(cls, path: str) -> MLPEvaluator:
+        """Load the weights saved with `save`."""
+        with np.load(path) as data:
+            return cls(data["w1"], data["b1"], data["w2"], float(data["b2"]))
+
+    def save(self, path: str):
+        """Save the weights to a `.npz` file."""
+        np.savez(path, w1=self.w1, b1=self.b1, w2=self.w2, b2=self.b2)
+
+
+class PlayoutEvaluator(Evaluator):
+    """Evaluates Tic Tac Toe states by vectorized random playouts.
+
+    Every state in a batch is played out several times at once with
+    `random_playouts`, and valued by the fraction of games each player won.
+    Works with any state with `rows`.
+
+    Attributes:
+        games: The number of playouts per state.
+        players: The player symbols, in turn order.
+        rng: The random generator of the playouts.
+    """
+
+    def __init__(self, games: int = 1, players: Sequence[Any] = ("X", "O"), rng: np.random.Generator = None):
+        """
+        Args:
+            games: The number of playouts per state.
+            players: The player symbols, in turn order.
+            rng: The random generator of the playouts.
+        """
+        self.games = games
+        self.players = tuple(players)
+        self.rng = np.random.default_rng() if rng is None else rng
+
+    def evaluate(self, states: Sequence[AbstractState]) -> List[Dict[Any, float]]:
+        boards, turns = board_tensor(states, self.players)
+        results = random_playouts(np.repeat(boards, self.games, axis=0), np.repeat(turns, self.games), len(self.players), self.rng)
+
+        wins = np.stack([(results == p).reshape(len(states), self.games).mean(axis=1) for p in range(len(self.players))], axis=1)
+        return [dict(zip(self.players, row)) for row in wins.tolist()]
@@ -0,0 +1,339 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import threading
+import time
+from .state import AbstractState, TIES, credit
+from .mcts import MCTSAgent, Node, playout, _clock
+from .rng import SearchRandom
+
+def search_root(state: AbstractState, seed: int, iterations: int = None, time_limit: float = None, max_nodes: int = None) -> Dict[Hashable, Counter]:
+    """Run an independent search from a root state.
+
+    This is the unit of work of a root-parallel search. It is run in a worker
+    process, so it only takes and returns picklable values.
+
+    Args:
+        state:
+            The game state to search from.
+        seed:
+            The seed of the random generator of the search.
+        iterations, time_limit, max_nodes:
+            The search budgets, as for `MCTSAgent`.
+
+    Returns:
+        The win counts of each child of the root, by move.
+    """
+    agent = MCTSAgent(iterations, time_limit, max_nodes, seed=seed)
+    agent.reset(state)
+    agent.search()
+
+    return {move: child.scores for move, child in agent.root.children.items()}
+
+
+class RootParallelMCTSAgent(MCTSAgent):
+    """A player agent that runs independent searches in a process pool.
+
+    Every move, each worker searches from the current state with the full
+    budget and its own random stream, spawned from the agent's generator.
+    The win counts of the root's children are merged across workers before
+    the move is chosen. The pool is created on the first move and reused
+    until `close` is called, so process startup is only paid once. No tree
+    is kept between moves.
+
+    Attributes:
+        workers: The number of worker processes.
+    """
+
+    def __init__(self, workers: int = None, iterations: int = None, time_limit: float = None, max_nodes: int = None, seed: int = None):
+        """Initialize the agent.
+
+        Args:
+            workers:
+                The number of worker processes. Defaults to the number of CPUs.
+            iterations, time_limit, max_nodes:
+                The search budgets of each worker, as for `MCTSAgent`.
+            seed:
+                The seed of the generator the workers' streams are spawned
+                from.
+        """
+        super().__init__(iterations, time_limit, max_nodes, seed=seed)
+
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self._pool: ProcessPoolExecutor = None
+
+    def make_move(self, state: AbstractState):
+        """Search the current state in every worker and pick the best move.
+
+        Args:
+            state: The current state of the game.
+
+        Returns:
+            The move with the most merged wins for the current player.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+
+        futures = [
+            self._pool.submit(search_root, state, stream.initial_seed, self.iterations, self.time_limit, self.max_nodes)
+            for stream in self.rng.spawn(self.workers)
+        ]
+
+        # Merge the statistics of the root's children across workers
+        scores: Dict[Hashable, Counter] = dict()
+        for future in futures:
+            for move, counts in future.result().items():
+                scores.setdefault(move, Counter()).update(counts)
+
+        player = state.current_player
+        return max(scores.keys(), key=lambda move: credit(scores[move], player))
+
+    def observe_move(self, player: Any, move: Any, new_state: AbstractState) -> None:
+        # Every move is searched from scratch, so there is no tree to update
+        pass
+
+    def close(self):
+        """Shut down the worker pool."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> RootParallelMCTSAgent:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TreeParallelMCTSAgent(MCTSAgent):
+    """A player agent that searches one shared tree from several threads.
+
+    Every thread repeatedly selects a node, adds one untried child to it like
+    `Node.add_child`, plays out the child and backpropagates the result.
+    Nodes on the path of a pending playout carry a virtual loss, so
+    concurrent threads spread out across different branches. The statistics
+    and children of a node are only read and updated under one of a set of
+    striped locks, so threads only contend when they touch the same nodes.
+    Proofs of the solver are propagated as in `MCTSAgent`, and with a node
+    budget, leaves are evicted while every lock is held.
+
+    Each thread plays out games with its own random stream, spawned from the
+    agent's generator. Moves are still tried in an order drawn from the
+    shared generator, so searches with several threads are not repeatable.
+
+    The locking is pure overhead under the GIL: on a GIL build,
+    benchmarks/tree_parallel.py measured 0.65-0.85x the iterations per second
+    of the sequential `MCTSAgent` with 1 to 8 threads, so this agent is slower
+    than `MCTSAgent` there. Threads can only pay off on free-threaded builds
+    of Python.
+
+    Attributes:
+        threads: The number of search threads.
+        virtual_loss: The number of losses added to each node on the path of
+            a pending playout.
+    """
+
+    LOCK_STRIPES = 64
+
+    def __init__(self, threads: int = None, iterations: int = None, time_limit: float = None, max_nodes: int = None, virtual_loss: int = 1, seed: int = None, node_budget: int = None, eviction: str = "visits", memory_budget: int = None):
+        """Initialize the agent.
+
+        Args:
+            threads:
+                The number of search threads. Defaults to the number of CPUs.
+            iterations, time_limit, max_nodes:
+                The search budgets, shared by all threads, as for `MCTSAgent`.
+            virtual_loss:
+                The number of losses added to each node on the path of a
+                pending playout.
+            seed:
+                The seed of the generator the threads' streams are spawned
+                from.
+            node_budget, eviction, memory_budget:
+                The maximum number of nodes kept in the tree, how leaves are
+                chosen for eviction, and the maximum memory of the tree, as
+                for `MCTSAgent`.
+        """
+        super().__init__(iterations, time_limit, max_nodes, seed=seed, node_budget=node_budget, eviction=eviction, memory_budget=memory_budget)
+
+        self.threads = threads if threads is not None else os.cpu_count() or 1
+        self.virtual_loss = virtual_loss
+
+        self._locks = [threading.Lock() for _ in range(TreeParallelMCTSAgent.LOCK_STRIPES)]
+        self._budget_lock = threading.Lock()
+        self._local = threading.local()
+        self._iterations_run = 0
+        self._deadline = None
+        self._pool: ThreadPoolExecutor = None
+
+    def _lock(self, node: Node) -> threading.Lock:
+        """The lock guarding the statistics and children of a node."""
+        return self._locks[(id(node) >> 4) % len(self._locks)]
+
+    def search(self) -> int:
+        """Search below the current node from every thread until a budget is
+        exhausted, or the outcome of the current node is proven.
+
+        Returns:
+            The number of iterations run across all threads.
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.threads)
+
+        self._iterations_run = 0
+        self._deadline = None if self.time_limit is None else time.perf_counter() + self.time_limit
+
+        futures = [self._pool.submit(self._work, stream) for stream in self.rng.spawn(self.threads)]
+        for future in futures:
+            future.result()
+
+        return self._iterations_run
+
+    def _work(self, rng: SearchRandom):
+        """Run iterations in one thread until the budget is exhausted."""
+        self._local.rng = rng
+        while self._claim_iteration():
+            self._iterate()
+
+    def _claim_iteration(self) -> bool:
+        """Reserve one iteration of the shared budget.
+
+        Returns:
+            True if the iteration may run, or False if a budget is exhausted.
+        """
+        with self._budget_lock:
+            if self.curr_node.proven is not None:
+                return False
+            if self._iterations_run > 0:
+                if self.iterations is not None and self._iterations_run >= self.iterations:
+                    return False
+                if self.max_nodes is not None and self.node_count >= self.max_nodes:
+                    return False
+                if self._deadline is not None and time.perf_counter() >= self._deadline:
+                    return False
+
+            self._iterations_run += 1
+            return True
+
+    def _visit(self, node: Node, parent: Node, path: list) -> bool:
+        """Add a virtual loss to a node and append it to the selected path.
+
+        A node selected among the children of its parent may have been
+        evicted before its lock was taken. Once it carries a virtual loss, it
+        can no longer be evicted.
+
+        Args:
+            node: The node to visit.
+            parent: The parent the node was selected from, if any.
+            path: The nodes visited so far.
+
+        Returns:
+            False if the node is no longer a child of `parent`, in which case
+            nothing is added.
+        """
+        with self._lock(node):
+            if parent is not None and node.parent is not parent:
+                return False
+            node.virtual_loss += self.virtual_loss
+        path.append(node)
+        return True
+
+    def _best_child(self, node: Node) -> Node:
+        """The child of a node with the highest score, counting virtual losses.
+
+        The statistics of every node are read under its lock, since other
+        threads may be adding to them.
+        """
+        with self._lock(node):
+            parent_simulations = node.scores.total() + node.virtual_loss
+            children = list(node.children.values())
+
+        player = node.state.current_player
+
+        def score(child):
+            with self._lock(child):
+                return child.score(parent_simulations, player)
+
+        return max(children, key=score)
+
+    def _iterate(self):
+        """Run one select/expand/simulate/backpropagate iteration.
+
+        Playouts use the random stream of the calling thread, or the agent's
+        generator outside of `search`, e.g. when pondering.
+        """
+        rng = getattr(self._local, "rng", self.rng)
+
+        # Select a node that can be expanded, or a decided leaf, adding
+        # virtual losses along the path. A child is added under the lock of
+        # its parent, so no two threads try the same move, and gets its
+        # virtual loss before other threads can see it, so it is not evicted
+        # before it is simulated.
+        path = []
+        node = self.curr_node
+        self._visit(node, None, path)
+        while True:
+            with self._lock(node):
+                child = node.add_child() if node.expandable else None
+                if child is not None:
+                    child.virtual_loss += self.virtual_loss
+                is_leaf = not node.children
+
+            if child is not None:
+                with self._budget_lock:
+                    self.node_count += 1
+                node = child
+                path.append(node)
+                break
+            if is_leaf:
+                break
+
+            # Select again if the child was evicted in the meantime
+            child = self._best_child(node)
+            if self._visit(child, node, path):
+                node = child
+
+        # Simulate, and update the statistics of the path in place
+        outcome = playout(node.state, rng)
+        key = outcome.winner if outcome.is_win else TIES
+        for visited in path:
+            with self._lock(visited):
+                visited.scores[key] += 1
+                visited.virtual_loss -= self.virtual_loss
+        node.last_visit = next(_clock)
+
+        limit = self._node_limit
+        if limit is not None and self.node_count > limit:
+            self._evict_exclusive()
+
+    def _evict_exclusive(self):
+        """Evict leaves while holding every lock, so no thread sees it happen.
+
+        Leaves on the paths of pending playouts carry a virtual loss, so they
+        are never evicted.
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            with self._budget_lock:
+                if self.node_count > self._node_limit:
+                    self.evict()
+        finally:
+            for lock in self._locks:
+                lock.release()
+
+    def close(self):
+        """Shut down the search threads."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> TreeParallelMCTSAgent:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+from abc import ABCMeta, abstractmethod
+from random import Random
+
+from .state import AbstractState, Outcome, Win, Tie
+from .ttt import BitboardTicTacToeState
+
+class RolloutPolicy(metaclass=ABCMeta):
+    """Chooses the moves of playouts.
+
+    Subclasses choose one move at a time with `choose`. Policies may also
+    override `playout` to play whole games faster than move by move.
+    """
+
+    @abstractmethod
+    def choose(self, state: AbstractState, rng: Random) -> int:
+        """Choose a move to make in a playout.
+
+        Args:
+            state:
+                The undecided game state to move in.
+            rng:
+                The random object used to break ties between moves.
+
+        Returns:
+            The index of a legal move of the current player.
+        """
+
+    def playout(self, state: AbstractState, rng: Random) -> Outcome:
+        """Play moves chosen by the policy until the game is decided.
+
+        Args:
+            state:
+                The game state to play out from.
+            rng:
+                The random object passed to `choose`.
+
+        Returns:
+            The outcome of the finished game.
+        """
+        while state.outcome.is_undecided:
+            state = state.apply_unchecked(self.choose(state, rng))
+
+        return state.outcome
+
+
+class RandomPolicy(RolloutPolicy):
+    """Chooses moves uniformly at random, like `playout`."""
+
+    def choose(self, state: AbstractState, rng: Random) -> int:
+        return state.random_move_index(rng)
+
+
+class HeavyTicTacToePolicy(RolloutPolicy):
+    """Plays Tic Tac Toe playouts with one move of lookahead.
+
+    The policy takes an immediate win if there is one, and otherwise blocks
+    an immediate win of the opponent, choosing at random between several.
+    Other moves are chosen uniformly at random. Wins are found in the
+    precomputed `BitboardTicTacToeState.COMPLETIONS` table, so no board is
+    scanned. Games of `BitboardTicTacToeState` are played out directly on the
+    bitboards, without creating states.
+
+    Works with `TicTacToeState` and `BitboardTicTacToeState` of two players.
+    """
+
+    def choose(self, state: AbstractState, rng: Random) -> int:
+        own, other = _boards(state)
+        return _choose(own, other, state.legal_mask, rng)
+
+    def playout(self, state: AbstractState, rng: Random) -> Outcome:
+        if not isinstance(state, BitboardTicTacToeState) or state.outcome.is_decided:
+            return super().playout(state, rng)
+
+        full = BitboardTicTacToeState.FULL_MASK
+        completions = BitboardTicTacToeState.COMPLETIONS
+        boards = list(state.boards)
+        turn = state.turn
+        while True:
+            own, other = boards[turn], boards[1 - turn]
+            free = full & ~(own | other)
+            sq = _choose(own, other, free, rng)
+
+            # Only a square completing a line can win
+            if completions[own] >> sq & 1:
+                return Win(state.players[turn])
+
+            boards[turn] = own | 1 << sq
+            if free == 1 << sq:
+                return Tie()
+            turn = 1 - turn
+
+
+def _boards(state: AbstractState):
+    """Get the bitboards of the player to move and their opponent."""
+    if isinstance(state, BitboardTicTacToeState):
+        return state.boards[state.turn], state.boards[1 - state.turn]
+
+    own = other = 0
+    for sq, mark in enumerate(mark for row in state.rows for mark in row):
+        if mark == state.current_player:
+            own |= 1 << sq
+        elif mark != ' ':
+            other |= 1 << sq
+    return own, other
+
+
+def _choose(own: int, other: int, free: int, rng: Random) -> int:
+    """Choose the square of a winning move, else a blocking one, else any."""
+    completions = BitboardTicTacToeState.COMPLETIONS
+    candidates = completions[own] & free or completions[other] & free or free
+    return rng.choice(BitboardTicTacToeState.FREE_SQUARES[candidates])
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import List
+
+import hashlib
+import os
+from random import Random
+
+class SearchRandom(Random):
+    """The random generator of a whole search.
+
+    One generator is created per search and shared by every node, instead of
+    seeding a new generator for each node. Given a seed, a search using it is
+    reproducible. Parallel workers get their own independent streams from
+    `spawn`, which derives them from the seed and a counter, so they are
+    reproducible too, whatever the generator has been used for in between.
+
+    Attributes:
+        initial_seed: The seed the generator was created with.
+    """
+
+    def __init__(self, seed: int = None):
+        """Create a generator.
+
+        Args:
+            seed: The seed of the generator. If none, a seed is drawn from the
+                operating system's entropy source.
+        """
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "little")
+
+        self.initial_seed = seed
+        self._spawned = 0
+        super().__init__(seed)
+
+    def spawn(self, count: int = 1) -> List[SearchRandom]:
+        """Derive independent generators, e.g. for parallel workers.
+
+        The n-th generator spawned is seeded with a hash of the seed of this
+        generator and n, so the same seed always spawns the same generators.
+
+        Args:
+            count: The number of generators to derive.
+
+        Returns:
+            The new generators.
+        """
+        streams = []
+        for _ in range(count):
+            digest = hashlib.sha256(f"{self.initial_seed}:{self._spawned}".encode()).digest()
+            streams.append(SearchRandom(int.from_bytes(digest[:8], "little")))
+            self._spawned += 1
+        return streams
@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable, Sequence
+
+from collections import Counter, deque
+import hashlib
+import json
+import mmap
+import struct
+
+from .state import AbstractState, TIES
+
+# The file starts with the magic number, the format version, the number of
+# nodes, the number of players and the length of the JSON metadata. The
+# metadata holds the players and the table of moves, and is padded to 8 bytes.
+MAGIC = b"MCTS"
+VERSION = 3
+HEADER = struct.Struct("<4sIQII")
+
+# Each node record holds the state hash, the index of the first child, the
+# number of children, the index of the move leading to the node in the moves
+# table, and then the wins of each player and the number of ties.
+RECORD = struct.Struct("<QIII4x")
+
+# The hash index maps state hashes to nodes, sorted by hash. Each entry also
+# holds a check digest of the state, so that states whose hashes collide are
+# told apart.
+INDEX = struct.Struct("<QQI4x")
+
+NO_MOVE = 0xFFFFFFFF
+HASH_MASK = 0xFFFFFFFFFFFFFFFF
+
+def _check(state: AbstractState) -> int:
+    """A digest of the printed state, independent of its hash."""
+    digest = hashlib.blake2b(str(state).encode(), digest_size=8, person=b"mcts-snapshot").digest()
+    return int.from_bytes(digest, "little")
+
+
+def save_tree(root, path: str, players: Sequence[Any]) -> int:
+    """Save a search tree to a file in a flat binary format.
+
+    Nodes are written in breadth-first order, so the children of a node are
+    contiguous. Moves and players are stored as JSON, so they must be JSON
+    serializable. States are indexed by their hash and a digest of their
+    printed form, so both must be the same in every process that opens the
+    snapshot, see `AbstractState.__hash__`.
+
+    Args:
+        root:
+            The root `Node` of the tree to save.
+        path:
+            The file to write.
+        players:
+            The players whose wins are saved. Ties are always saved.
+
+    Returns:
+        The number of nodes written.
+    """
+    # Lay out the nodes breadth first
+    nodes = [root]
+    first_children = []
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        first_children.append(len(nodes))
+        nodes.extend(node.children.values())
+        queue.extend(node.children.values())
+
+    # Number the moves leading to each node
+    move_ids: Dict[Hashable, int] = dict()
+    for node in nodes:
+        for move in node.children:
+            move_ids.setdefault(move, len(move_ids))
+
+    metadata = json.dumps({"players": list(players), "moves": list(move_ids)}).encode()
+    metadata += b" " * (-len(metadata) % 8)
+    wins = struct.Struct(f"<{len(players) + 1}d")
+
+    hashes = []
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(nodes), len(players), len(metadata)))
+        f.write(metadata)
+
+        moves = [NO_MOVE] * len(nodes)
+        for node, first in zip(nodes, first_children):
+            for i, move in enumerate(node.children):
+                moves[first + i] = move_ids[move]
+
+        for index, (node, first, move) in enumerate(zip(nodes, first_children, moves)):
+            state_hash = hash(node.state) & HASH_MASK
+            hashes.append((state_hash, _check(node.state), index))
+            f.write(RECORD.pack(state_hash, first, len(node.children), move))
+            f.write(wins.pack(*(node.scores[player] for player in players), node.scores[TIES]))
+
+        for state_hash, check, index in sorted(hashes):
+            f.write(INDEX.pack(state_hash, check, index))
+
+    return len(nodes)
+
+
+class TreeSnapshot:
+    """A read-only search tree saved with `save_tree`, opened through `mmap`.
+
+    Nothing is read until it is needed, so even large trees open instantly,
+    and processes opening the same file share its pages. Nodes are looked up
+    by index, with the root at index 0, or by game state through a sorted
+    hash index. A state is only matched if a digest of its printed form
+    matches too, so a state whose hash collides with a saved state's is not
+    given that state's statistics.
+
+    Attributes:
+        players: The players whose wins are stored.
+        moves: The table of moves, indexed by move id.
+    """
+
+    def __init__(self, path: str):
+        """Open a snapshot.
+
+        Args:
+            path: The file written by `save_tree`.
+        """
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self._size, num_players, metadata_length = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} search tree snapshot")
+
+        metadata = json.loads(self._map[HEADER.size:HEADER.size + metadata_length])
+        self.players = tuple(metadata["players"])
+        self.moves = tuple(metadata["moves"])
+
+        self._wins = struct.Struct(f"<{num_players + 1}d")
+        self._record_size = RECORD.size + self._wins.size
+        self._records = HEADER.size + metadata_length
+        self._index = self._records + self._size * self._record_size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def close(self):
+        """Unmap the file."""
+        self._map.close()
+
+    def __enter__(self) -> TreeSnapshot:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def scores(self, index: int) -> Counter:
+        """Get the win counts of a node.
+
+        Args:
+            index: The index of the node.
+
+        Returns:
+            A new counter of the wins of each player at the node, and of ties
+            under `TIES`.
+        """
+        wins = self._wins.unpack_from(self._map, self._records + index * self._record_size + RECORD.size)
+        return Counter({player: w for player, w in zip(self.players + (TIES,), wins) if w})
+
+    def children(self, index: int) -> Dict[Hashable, int]:
+        """Get the children of a node.
+
+        Args:
+            index: The index of the node.
+
+        Returns:
+            The indices of the children of the node, by move.
+        """
+        _, first, count, _ = RECORD.unpack_from(self._map, self._records + index * self._record_size)
+        children = dict()
+        for child in range(first, first + count):
+            move = RECORD.unpack_from(self._map, self._records + child * self._record_size)[3]
+            children[self.moves[move]] = child
+        return children
+
+    def find(self, state: AbstractState) -> int:
+        """Find the node of a game state.
+
+        Args:
+            state: The game state to look up.
+
+        Returns:
+            The index of a node with the same state hash and check digest, or
+            None if the state is not in the tree.
+        """
+        state_hash = hash(state) & HASH_MASK
+
+        # Binary search the sorted hash index
+        low, high = 0, self._size
+        while low < high:
+            mid = (low + high) // 2
+            if INDEX.unpack_from(self._map, self._index + mid * INDEX.size)[0] < state_hash:
+                low = mid + 1
+            else:
+                high = mid
+
+        # Check every entry with the same hash, computing the digest of the
+        # state only if there is one
+        check = None
+        while low < self._size:
+            found_hash, found_check, index = INDEX.unpack_from(self._map, self._index + low * INDEX.size)
+            if found_hash != state_hash:
+                break
+            if check is None:
+                check = _check(state)
+            if found_check == check:
+                return index
+            low += 1
+        return None
+
+    def lookup(self, state: AbstractState) -> Counter:
+        """Get the win counts stored for a game state.
+
+        Args:
+            state: The game state to look up.
+
+        Returns:
+            A new counter of the wins of each player, empty if the state is
+            not in the tree.
+        """
+        index = self.find(state)
+        return Counter() if index is None else self.scores(index)
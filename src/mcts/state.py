@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 from abc import ABCMeta, abstractmethod
-from typing import Any, Collection
+import hashlib
+from typing import Any, Collection, Sequence, Tuple
 
 class Outcome(metaclass=ABCMeta):
     """
@@ -66,6 +67,25 @@ class Win(Decided):
     def is_win(self):
         return True
 
+# The key under which win counts of search nodes count tied games, next to
+# the wins of each player. No player is None, and unlike a sentinel object,
+# None survives pickling to worker processes.
+TIES = None
+
+# The fraction of a win a tie is worth to each player
+TIE_CREDIT = 0.5
+
+def credit(scores, player) -> float:
+    """The score of a player in some win counts, with partial credit for ties.
+
+    Args:
+        scores:
+            The win counts of each player, and of ties under `TIES`.
+        player:
+            The player to score.
+    """
+    return scores[player] + TIE_CREDIT * scores[TIES]
+
 class AbstractState(metaclass=ABCMeta):
     """Represent the state of a game at any particular time."""
 
@@ -102,10 +122,146 @@ class AbstractState(metaclass=ABCMeta):
             The state of the game after the player makes the move.
         """
 
+    # The integer move API below is optional. Search engines use it instead
+    # of `possible_moves` and `next_move`, which deal in moves of any type and
+    # validate them. The defaults index moves by their position in
+    # `possible_moves()`; games should override them with a fixed encoding,
+    # e.g. square numbers, and an `apply_unchecked` that skips validation.
+
+    def legal_move_indices(self) -> Sequence[int]:
+        """The indices of the possible moves of the current player.
+
+        Returns:
+            A sequence of move indices, empty if the game is decided.
+        """
+        return range(len(self.possible_moves()))
+
+    @property
+    def legal_mask(self) -> int:
+        """The possible moves as a bitmask, with bit `i` set for move index `i`."""
+        mask = 0
+        for index in self.legal_move_indices():
+            mask |= 1 << index
+        return mask
+
+    def random_move_index(self, rng) -> int:
+        """Pick a legal move uniformly at random, e.g. for a playout.
+
+        Games with many moves can override this to pick a move without
+        listing every legal move.
+
+        Args:
+            rng: The random object used to pick the move.
+
+        Returns:
+            The index of a legal move of the current player.
+        """
+        return rng.choice(self.legal_move_indices())
+
+    def move_index(self, move) -> int:
+        """Get the index of a move.
+
+        Args:
+            move: A possible move in this state.
+
+        Returns:
+            The index of the move.
+        """
+        return list(self.possible_moves()).index(move)
+
+    def index_move(self, index: int) -> Any:
+        """Get the move with an index.
+
+        Args:
+            index: The index of a possible move in this state.
+
+        Returns:
+            The move, as accepted by `next_move`.
+        """
+        return list(self.possible_moves())[index]
+
+    def apply_unchecked(self, index: int) -> AbstractState:
+        """Get the next game state when the current player makes a move.
+
+        Unlike `next_move`, the move is not validated, so it must be one of
+        `legal_move_indices()`.
+
+        Args:
+            index: The index of the move made.
+
+        Returns:
+            The state of the game after the move is made.
+        """
+        return self.next_move(self.current_player, self.index_move(index))
+
+    # Games with symmetries, e.g. rotations and reflections of the board,
+    # override the methods below so that equivalent positions can share
+    # search statistics. By default, a state has no symmetries.
+
+    def canonical(self) -> Tuple[AbstractState, int]:
+        """Get the canonical form of this state under the game's symmetries.
+
+        Every state equivalent to this one has the same canonical state, so
+        its hash is a key shared by all of them.
+
+        Returns:
+            The canonical state, and the symmetry that maps this state onto
+            it, for `to_canonical_index` and `from_canonical_index`.
+        """
+        return self, 0
+
+    def to_canonical_index(self, index: int, symmetry: int) -> int:
+        """Map a move index of this state to the canonical state.
+
+        Args:
+            index: The index of a move in this state.
+            symmetry: The symmetry returned by `canonical`.
+
+        Returns:
+            The index of the equivalent move in the canonical state.
+        """
+        return index
+
+    def from_canonical_index(self, index: int, symmetry: int) -> int:
+        """Map a move index of the canonical state back to this state.
+
+        Args:
+            index: The index of a move in the canonical state.
+            symmetry: The symmetry returned by `canonical`.
+
+        Returns:
+            The index of the equivalent move in this state.
+        """
+        return index
+
     @abstractmethod
     def __eq__(self, value: object) -> bool:
         pass
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        # Defining __eq__ makes Python set __hash__ to None, so subclasses
+        # that do not define their own hash get the default one back
+        if "__eq__" in cls.__dict__ and cls.__dict__.get("__hash__") is None:
+            cls.__hash__ = AbstractState.__hash__
+
+    def __hash__(self) -> int:
+        """Hash the state, so that transposed positions can be detected.
+
+        Equal states must have equal hashes. Search tree snapshots and
+        worker processes look states up by their hash, so it must also be
+        the same in every process. By default, a digest of the printed state
+        is used, which relies on equal states printing the same. Unlike
+        `hash(str(self))`, it does not change with `PYTHONHASHSEED`.
+
+        Subclasses should override this with a cheaper hash, e.g. a Zobrist
+        hash with keys drawn from a fixed seed, updated incrementally in
+        `next_move`.
+        """
+        digest = hashlib.blake2b(str(self).encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "little", signed=True)
+
     @abstractmethod
     def __str__(self) -> str:
         pass
\ No newline at end of file
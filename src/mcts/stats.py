@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Hashable
+
+class SearchStats:
+    """Statistics about one search of an `MCTSAgent`.
+
+    Times are in seconds, and depths are counted from the node searched from.
+
+    Attributes:
+        iterations: The number of iterations run.
+        elapsed: The total time of the search.
+        select_time: The time spent selecting leaves.
+        expand_time: The time spent adding children to leaves.
+        simulate_time: The time spent playing out games.
+        backpropagate_time: The time spent recording and backpropagating results.
+        nodes: The number of nodes added to the tree.
+        max_depth: The depth of the deepest selected leaf.
+        total_depth: The sum of the depths of all selected leaves.
+        total_children: The sum of the number of children of the nodes on
+            the paths to the selected leaves.
+        root_visits: The number of simulations through each child of the node
+            searched from, by move.
+    """
+
+    def __init__(self):
+        self.iterations = 0
+        self.elapsed = 0.0
+        self.select_time = 0.0
+        self.expand_time = 0.0
+        self.simulate_time = 0.0
+        self.backpropagate_time = 0.0
+        self.nodes = 0
+        self.max_depth = 0
+        self.total_depth = 0
+        self.total_children = 0
+        self.root_visits: Dict[Hashable, float] = dict()
+
+    def add_path(self, depth: int, children: int):
+        """Count the selection of a leaf.
+
+        Args:
+            depth: The depth of the leaf.
+            children: The total number of children of the nodes passed
+                through to reach it.
+        """
+        self.total_depth += depth
+        self.total_children += children
+        self.max_depth = max(self.max_depth, depth)
+
+    @property
+    def average_depth(self) -> float:
+        """The average depth of the selected leaves."""
+        return self.total_depth / self.iterations if self.iterations else 0.0
+
+    @property
+    def branching_factor(self) -> float:
+        """The average number of children of the nodes passed through during
+        selection."""
+        return self.total_children / self.total_depth if self.total_depth else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The statistics as a JSON-serializable dictionary."""
+        return {
+            "iterations": self.iterations,
+            "elapsed": self.elapsed,
+            "select_time": self.select_time,
+            "expand_time": self.expand_time,
+            "simulate_time": self.simulate_time,
+            "backpropagate_time": self.backpropagate_time,
+            "nodes": self.nodes,
+            "max_depth": self.max_depth,
+            "average_depth": self.average_depth,
+            "branching_factor": self.branching_factor,
+            "root_visits": {str(move): visits for move, visits in self.root_visits.items()},
+        }
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from collections import Counter, OrderedDict
+
+from .state import AbstractState
+
+class TranspositionTable:
+    """A bounded table of node statistics shared between transposed states.
+
+    Positions reached by different move orders are equal, so nodes for them
+    look up the same win counts in the table. Statistics gathered under one
+    move order are then used by every node for that position. Entries are
+    keyed by the states themselves, so positions whose hashes collide are
+    still told apart. When the table is full, the least recently used entry
+    is dropped. Nodes keep the statistics they already hold, but new nodes no
+    longer share them.
+
+    A symmetric table keys positions by their canonical state, so positions
+    equivalent under the game's symmetries, e.g. rotations of the board,
+    share their statistics too.
+
+    Attributes:
+        max_size: The maximum number of positions in the table.
+        symmetric: Whether equivalent positions share their statistics.
+        hits: The number of lookups that found a transposed position.
+        misses: The number of lookups that added a new position.
+    """
+
+    def __init__(self, max_size: int = 1_000_000, symmetric: bool = False):
+        """Create an empty table.
+
+        Args:
+            max_size: The maximum number of positions in the table.
+            symmetric: Whether to key positions by `AbstractState.canonical`.
+        """
+        self.max_size = max_size
+        self.symmetric = symmetric
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[AbstractState, Counter] = OrderedDict()
+
+    def lookup(self, state: AbstractState) -> Counter:
+        """Get the shared win counts of a state, adding them if they are new.
+
+        Args:
+            state: The game state to look up.
+
+        Returns:
+            The win counts shared by all nodes for the state.
+        """
+        key = self._key(state)
+        scores = self._entries.get(key)
+        if scores is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return scores
+
+        self.misses += 1
+        scores = self._entries[key] = Counter()
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+        return scores
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, state: AbstractState) -> bool:
+        return self._key(state) in self._entries
+
+    def _key(self, state: AbstractState) -> AbstractState:
+        """The key of a state in the table: the state, or its canonical form.
+
+        Lookups compare keys with `==` after matching their hashes, so the
+        statistics of different positions are never merged.
+        """
+        if self.symmetric:
+            return state.canonical()[0]
+        return state
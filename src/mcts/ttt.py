@@ -1,9 +1,26 @@
-from typing import Any, Collection
+from typing import Any, Collection, Sequence, Tuple
 from itertools import cycle
-from copy import deepcopy
+from functools import lru_cache
+from random import Random
 
 from .state import AbstractState, Outcome, Win, Tie, Undecided
 
+@lru_cache(maxsize=None)
+def zobrist_key(*feature) -> int:
+    """Get the Zobrist key of a board feature, such as a mark on a square.
+
+    Keys are pseudo-random, but fixed across runs and processes, so hashes can
+    be shared between workers.
+
+    Args:
+        feature: The parts identifying the feature, e.g. a player and a square.
+
+    Returns:
+        A 64-bit key for the feature.
+    """
+    return Random(repr(feature)).getrandbits(64)
+
+
 class TicTacToeState(AbstractState):
     """Game states for Tic Tac Toe.
     
@@ -13,22 +30,35 @@ class TicTacToeState(AbstractState):
     """
     N = 3
 
-    def __init__(self, rows=None, players=["X", "O"]):
+    def __init__(self, rows=None, players=["X", "O"], zobrist=None):
         """
         Args:
             rows:
                 The rows of the grid. If none, a new game is constructed.
             players:
                 The player symbols (X, and O) in the order of who will play
-                next. The player at the front of the list moves next."""
+                next. The player at the front of the list moves next.
+            zobrist:
+                The Zobrist hash of the rows, if already known."""
         if rows is None:
             # Construct a new game
             self.rows = [[' ' for i in range(TicTacToeState.N)] for i in range(TicTacToeState.N)]
         else:
             self.rows = rows
+
+        if zobrist is None:
+            zobrist = 0
+            for y, row in enumerate(self.rows):
+                for x, square in enumerate(row):
+                    if square != ' ':
+                        zobrist ^= zobrist_key(square, y, x)
+        self.zobrist = zobrist
         
-        # Create a cycling iterator to always have a next player
-        self.players = cycle(players)
+        # Create a cycling iterator to always have a next player. The order
+        # is also kept as a list, so that every next state gets its own
+        # iterator instead of advancing this one.
+        self._players = list(players)
+        self.players = cycle(self._players)
         self._player = next(self.players)
 
 
@@ -88,16 +118,67 @@ class TicTacToeState(AbstractState):
         return moves
 
     def next_move(self, player, move) -> AbstractState:
-        if move not in self.possible_moves():
+        try:
+            index = self.move_index(move)
+        except (TypeError, ValueError):
             raise ValueError(f"Invalid move: {move}")
-        
+
+        if self.rows[index // TicTacToeState.N][index % TicTacToeState.N] != ' ' or self.outcome.is_decided:
+            raise ValueError(f"Invalid move: {move}")
+
+        return self.apply_unchecked(index)
+
+    def legal_move_indices(self) -> Sequence[int]:
+        if self.outcome.is_decided:
+            return list()
+
+        # Moves are indexed by square, row by row
+        return [y * TicTacToeState.N + x for y, row in enumerate(self.rows) for x, square in enumerate(row) if square == ' ']
+
+    def move_index(self, move) -> int:
+        if not isinstance(move, str) or len(move) != 2:
+            raise ValueError(f"Invalid move: {move}")
+
         # Parse the move string into numerical coordinates
         y = 64 + TicTacToeState.N - ord(move[0])
-        x = int(move[1])
+        x = int(move[1:])
+        if not (0 <= y < TicTacToeState.N and 0 <= x < TicTacToeState.N):
+            raise ValueError(f"Invalid move: {move}")
+
+        return y * TicTacToeState.N + x
 
-        rows = deepcopy(self.rows)
+    def index_move(self, index: int) -> Any:
+        return f"{chr(64 + TicTacToeState.N - index // TicTacToeState.N)}{index % TicTacToeState.N}"
+
+    def apply_unchecked(self, index: int) -> AbstractState:
+        y, x = divmod(index, TicTacToeState.N)
+        rows = [list(row) for row in self.rows]
         rows[y][x] = self.current_player
-        return TicTacToeState(rows, players=self.players)
+        return TicTacToeState(rows, players=self._players[1:] + self._players[:1], zobrist=self.zobrist ^ zobrist_key(self.current_player, y, x))
+
+    def canonical(self) -> Tuple[AbstractState, int]:
+        # Find the symmetry giving the smallest tuple of squares
+        N = TicTacToeState.N
+        squares = [square for row in self.rows for square in row]
+        best, symmetry = None, 0
+        for s, permutation in enumerate(SYMMETRIES):
+            transformed = [' '] * (N * N)
+            for sq, square in enumerate(squares):
+                transformed[permutation[sq]] = square
+            if best is None or transformed < best:
+                best, symmetry = transformed, s
+
+        if symmetry == 0:
+            return self, 0
+
+        rows = [best[y * N:(y + 1) * N] for y in range(N)]
+        return TicTacToeState(rows, players=self._players), symmetry
+
+    def to_canonical_index(self, index: int, symmetry: int) -> int:
+        return SYMMETRIES[symmetry][index]
+
+    def from_canonical_index(self, index: int, symmetry: int) -> int:
+        return INVERSE_SYMMETRIES[symmetry][index]
 
     def __eq__(self, value: object) -> bool:
         if not isinstance(value, TicTacToeState):
@@ -105,6 +186,9 @@ class TicTacToeState(AbstractState):
         
         return self.rows == value.rows
 
+    def __hash__(self) -> int:
+        return self.zobrist
+
     def __str__(self) -> str:
         s = ""
         row_s = "{}  {} | {} | {} \n"
@@ -125,3 +209,347 @@ class TicTacToeState(AbstractState):
 
         
 
+
+
+def _line_masks(n):
+    """Build the bitmasks of every winning line on an `n` x `n` grid.
+
+    Square (y, x) is stored in bit `y * n + x`.
+
+    Args:
+        n: The size of the grid.
+
+    Returns:
+        A tuple of masks, one for each row, column and diagonal.
+    """
+    masks = []
+    for i in range(n):
+        masks.append(sum(1 << (i * n + x) for x in range(n)))
+        masks.append(sum(1 << (y * n + i) for y in range(n)))
+    masks.append(sum(1 << (i * n + i) for i in range(n)))
+    masks.append(sum(1 << (i * n + n - i - 1) for i in range(n)))
+    return tuple(masks)
+
+
+def _move_names(n):
+    """Name every square of an `n` x `n` grid in alpha-numeric coordinates.
+
+    Args:
+        n: The size of the grid.
+
+    Returns:
+        A tuple of move names, indexed by the bit of the square.
+    """
+    return tuple(f"{chr(64 + n - sq // n)}{sq % n}" for sq in range(n * n))
+
+
+def _bit_indices(bits):
+    """List the set bits of every mask of a number of bits.
+
+    Args:
+        bits: The number of bits in the masks.
+
+    Returns:
+        A tuple indexed by mask, holding the indices of the bits set in it.
+    """
+    return tuple(tuple(i for i in range(bits) if mask >> i & 1) for mask in range(1 << bits))
+
+
+def _completion_table(n):
+    """Find the squares completing a line for every board of one player.
+
+    Args:
+        n: The size of the grid.
+
+    Returns:
+        A tuple indexed by the bitboard of a player, holding the bitmask of
+        the squares that would complete one of their lines. Squares taken by
+        another player are not excluded.
+    """
+    lines = _line_masks(n)
+    table = []
+    for board in range(1 << (n * n)):
+        completions = 0
+        for line in lines:
+            if (board & line).bit_count() == n - 1:
+                completions |= line & ~board
+        table.append(completions)
+    return tuple(table)
+
+
+def _symmetries(n):
+    """List the rotations and reflections of an `n` x `n` grid.
+
+    Args:
+        n: The size of the grid.
+
+    Returns:
+        A tuple of 8 permutations, the identity first. Each maps the index
+        `y * n + x` of every square to the index of the square it moves to.
+    """
+    m = n - 1
+    transforms = (
+        lambda y, x: (y, x),
+        lambda y, x: (x, m - y),
+        lambda y, x: (m - y, m - x),
+        lambda y, x: (m - x, y),
+        lambda y, x: (y, m - x),
+        lambda y, x: (m - y, x),
+        lambda y, x: (x, y),
+        lambda y, x: (m - x, m - y),
+    )
+    permutations = []
+    for transform in transforms:
+        permutation = []
+        for sq in range(n * n):
+            y, x = transform(*divmod(sq, n))
+            permutation.append(y * n + x)
+        permutations.append(tuple(permutation))
+    return tuple(permutations)
+
+
+def _invert(permutations):
+    """Invert every permutation of a tuple of permutations."""
+    inverses = []
+    for permutation in permutations:
+        inverse = [0] * len(permutation)
+        for i, image in enumerate(permutation):
+            inverse[image] = i
+        inverses.append(tuple(inverse))
+    return tuple(inverses)
+
+
+def _permuted_boards(permutations, bits):
+    """Apply every permutation to every bitboard of a number of bits.
+
+    Returns:
+        A tuple indexed by permutation and then by bitboard, holding the
+        bitboard with bit `i` moved to bit `permutation[i]`.
+    """
+    return tuple(
+        tuple(sum(1 << permutation[i] for i in range(bits) if board >> i & 1) for board in range(1 << bits))
+        for permutation in permutations
+    )
+
+
+def _zobrist_table(players, n):
+    """Get the Zobrist keys of every player's mark on every square.
+
+    Args:
+        players: The number of players.
+        n: The size of the grid.
+
+    Returns:
+        The keys, indexed by player index and then by square bit.
+    """
+    return tuple(tuple(zobrist_key(p, sq) for sq in range(n * n)) for p in range(players))
+
+
+# The symmetries of the Tic Tac Toe grid, as permutations of square indices,
+# and their inverses
+SYMMETRIES = _symmetries(TicTacToeState.N)
+INVERSE_SYMMETRIES = _invert(SYMMETRIES)
+
+
+class BitboardTicTacToeState(AbstractState):
+    """Compact game states for Tic Tac Toe.
+
+    Each player's marks are stored as one integer bitboard, where square
+    (y, x) is bit `y * N + x`. Wins are checked against a precomputed table of
+    line masks, and the outcome is computed at most once per state. Moves use
+    the same alpha-numeric coordinates as `TicTacToeState`, so the two are
+    interchangeable for agents and games.
+
+    Attributes:
+        N: (class constant) The size of the Tic Tac Toe grid.
+        WIN_MASKS: (class constant) The bitmasks of every winning line.
+        FULL_MASK: (class constant) The bitmask of a completely filled grid.
+        ZOBRIST: (class constant) The Zobrist keys of each player's mark on
+            each square, for the two players of the game.
+        ZOBRIST_TURN: (class constant) The Zobrist keys of the player to move.
+        COMPLETIONS: (class constant) The squares completing a line of each
+            bitboard, i.e. the squares that win immediately.
+        SYMMETRY_BOARDS: (class constant) Every bitboard under every symmetry
+            of the grid, indexed by symmetry and then by bitboard.
+        boards: The bitboards of the players, in the same order as `players`.
+        players: The player symbols, in turn order.
+        zobrist: The Zobrist hash of the boards and player to move.
+    """
+    N = 3
+    WIN_MASKS = _line_masks(N)
+    FULL_MASK = (1 << (N * N)) - 1
+    ZOBRIST = _zobrist_table(2, N)
+    ZOBRIST_TURN = tuple(zobrist_key("turn", p) for p in range(2))
+    COMPLETIONS = _completion_table(N)
+    SYMMETRY_BOARDS = _permuted_boards(_symmetries(N), N * N)
+
+    # Alpha-numeric move names by square index, and the inverse mapping
+    MOVES = _move_names(N)
+    SQUARES = {move: sq for sq, move in enumerate(MOVES)}
+
+    # The squares of every mask of free squares
+    FREE_SQUARES = _bit_indices(N * N)
+
+    __slots__ = ("boards", "players", "zobrist", "_turn", "_outcome")
+
+    def __init__(self, boards=None, players=("X", "O"), turn=0, zobrist=None):
+        """
+        Args:
+            boards:
+                The bitboards of each player. If none, a new game is
+                constructed.
+            players:
+                The player symbols (X, and O) in turn order.
+            turn:
+                The index into `players` of the player who moves next.
+            zobrist:
+                The Zobrist hash of the state, if already known.
+        """
+        self.players = tuple(players)
+        self.boards = tuple(boards) if boards is not None else (0,) * len(self.players)
+        self._turn = turn
+
+        if zobrist is None:
+            zobrist = BitboardTicTacToeState.ZOBRIST_TURN[turn]
+            for p, board in enumerate(self.boards):
+                for sq in range(BitboardTicTacToeState.N ** 2):
+                    if board >> sq & 1:
+                        zobrist ^= BitboardTicTacToeState.ZOBRIST[p][sq]
+        self.zobrist = zobrist
+
+        # The outcome is computed lazily the first time it is needed
+        self._outcome = None
+
+    @property
+    def outcome(self) -> Outcome:
+        if self._outcome is None:
+            self._outcome = self._compute_outcome()
+        return self._outcome
+
+    def _compute_outcome(self) -> Outcome:
+        # Check every line of every player for a win
+        for player, board in zip(self.players, self.boards):
+            for mask in BitboardTicTacToeState.WIN_MASKS:
+                if board & mask == mask:
+                    return Win(player)
+
+        # A full board without a winner is a tie
+        if self.occupied == BitboardTicTacToeState.FULL_MASK:
+            return Tie()
+
+        return Undecided()
+
+    @property
+    def occupied(self) -> int:
+        """The bitmask of all squares that have been played."""
+        occupied = 0
+        for board in self.boards:
+            occupied |= board
+        return occupied
+
+    @property
+    def current_player(self) -> Any:
+        return self.players[self._turn]
+
+    @property
+    def turn(self) -> int:
+        """The index into `players` of the player who moves next."""
+        return self._turn
+
+    def possible_moves(self) -> Collection[Any]:
+        return [BitboardTicTacToeState.MOVES[sq] for sq in self.legal_move_indices()]
+
+    def next_move(self, player, move) -> AbstractState:
+        sq = BitboardTicTacToeState.SQUARES.get(move)
+        if sq is None or self.occupied >> sq & 1 or self.outcome.is_decided:
+            raise ValueError(f"Invalid move: {move}")
+
+        return self.apply_unchecked(sq)
+
+    @property
+    def legal_mask(self) -> int:
+        # No moves can be made once the game is decided
+        if self.outcome.is_decided:
+            return 0
+
+        return BitboardTicTacToeState.FULL_MASK & ~self.occupied
+
+    def legal_move_indices(self) -> Sequence[int]:
+        # Moves are indexed by the bit of their square
+        return BitboardTicTacToeState.FREE_SQUARES[self.legal_mask]
+
+    def move_index(self, move) -> int:
+        sq = BitboardTicTacToeState.SQUARES.get(move)
+        if sq is None:
+            raise ValueError(f"Invalid move: {move}")
+        return sq
+
+    def index_move(self, index: int) -> Any:
+        return BitboardTicTacToeState.MOVES[index]
+
+    def apply_unchecked(self, sq: int) -> AbstractState:
+        # Mark the square on the board of the moving player, and update the
+        # hash with the new mark and player to move
+        turn = (self._turn + 1) % len(self.players)
+        boards = list(self.boards)
+        boards[self._turn] |= 1 << sq
+        zobrist = self.zobrist ^ BitboardTicTacToeState.ZOBRIST[self._turn][sq] \
+            ^ BitboardTicTacToeState.ZOBRIST_TURN[self._turn] ^ BitboardTicTacToeState.ZOBRIST_TURN[turn]
+        return BitboardTicTacToeState(boards, self.players, turn, zobrist)
+
+    def canonical(self) -> Tuple[AbstractState, int]:
+        # Find the symmetry giving the smallest boards, using the precomputed
+        # table of transformed bitboards
+        best, symmetry = self.boards, 0
+        for s in range(1, len(BitboardTicTacToeState.SYMMETRY_BOARDS)):
+            table = BitboardTicTacToeState.SYMMETRY_BOARDS[s]
+            boards = tuple(table[board] for board in self.boards)
+            if boards < best:
+                best, symmetry = boards, s
+
+        if symmetry == 0:
+            return self, 0
+        return BitboardTicTacToeState(best, self.players, self._turn), symmetry
+
+    def to_canonical_index(self, index: int, symmetry: int) -> int:
+        return SYMMETRIES[symmetry][index]
+
+    def from_canonical_index(self, index: int, symmetry: int) -> int:
+        return INVERSE_SYMMETRIES[symmetry][index]
+
+    @property
+    def rows(self):
+        """The grid as rows of player symbols, as in `TicTacToeState`."""
+        N = BitboardTicTacToeState.N
+        rows = [[' ' for i in range(N)] for i in range(N)]
+        for player, board in zip(self.players, self.boards):
+            for sq in range(N * N):
+                if board >> sq & 1:
+                    rows[sq // N][sq % N] = player
+        return rows
+
+    def __eq__(self, value: object) -> bool:
+        if not isinstance(value, BitboardTicTacToeState):
+            return False
+
+        return self.boards == value.boards and self.players == value.players and self._turn == value._turn
+
+    def __hash__(self) -> int:
+        return self.zobrist
+
+    def __str__(self) -> str:
+        s = ""
+        row_s = "{}  {} | {} | {} \n"
+        rows = self.rows
+        for y, row in enumerate(rows):
+            s += row_s.format(chr(64 + BitboardTicTacToeState.N - y), *row)
+
+            if y < len(rows) - 1:
+                s += "  ---+---+---\n"
+
+        s += "  " + "".join([f" {i}  " for i in range(BitboardTicTacToeState.N)]) + "\n"
+        s += f"{self.current_player}'s turn"
+        return s
+
+    def __repr__(self) -> str:
+        return "\n".join(["".join(row) for row in self.rows]).replace(' ', '_')
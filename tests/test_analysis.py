@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+
+from mcts.analysis import AnalysisCache, analyze_stream, format_position, parse_position
+
+
+def winning_moves(position: str):
+    """The moves that win a position at once."""
+    state = parse_position(position)
+    return {move for move in state.possible_moves() if state.next_move(state.current_player, move).outcome.is_win}
+
+
+class TestPositions(unittest.TestCase):
+    def test_round_trip(self):
+        for position in ("___/___/___", "X_O/_X_/___", "XOX/OXO/OX_", "XX_/OO_/X__"):
+            with self.subTest(position=position):
+                self.assertEqual(format_position(parse_position(position)), position)
+
+        # Any of the empty square characters can be used, without separators
+        self.assertEqual(format_position(parse_position("X.O-X ___")), "X_O/_X_/___")
+
+    def test_turn(self):
+        self.assertEqual(parse_position("___/_X_/___").current_player, "O")
+        self.assertEqual(parse_position("O__/_X_/___").current_player, "X")
+
+    def test_invalid_positions(self):
+        for position in ("", "___/___", "___/___/___/___", "XXX/___/___", "O__/___/___", "X_Y/___/___"):
+            with self.subTest(position=position):
+                with self.assertRaises(ValueError):
+                    parse_position(position)
+
+
+class TestAnalyzeStream(unittest.TestCase):
+    ITERATIONS = 2000
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "cache.jsonl")
+
+    def analyze(self, lines, cache):
+        return list(analyze_stream(lines, iterations=self.ITERATIONS, cache=cache))
+
+    def test_cache(self):
+        # A second run is answered from the cache, which persists in its file
+        lines = ["XX_/OO_/___", "X__/_O_/___", "___/___/___"]
+        with AnalysisCache(self.path) as cache:
+            first = self.analyze(lines, cache)
+            self.assertEqual([result["cached"] for result in first], [False] * 3)
+            self.assertEqual(len(cache), 3)
+
+        with AnalysisCache(self.path) as cache:
+            self.assertEqual(len(cache), 3)
+            second = self.analyze(lines, cache)
+            self.assertEqual([result["cached"] for result in second], [True] * 3)
+            self.assertEqual(cache.hits, 3)
+            self.assertEqual(cache.misses, 0)
+
+        for a, b in zip(first, second):
+            del a["cached"], b["cached"]
+            self.assertEqual(a, b)
+
+    def test_symmetric_positions(self):
+        # Rotations and reflections of a position share its cache entry, and
+        # the moves of the cached result are mapped onto each position
+        positions = ["XX_/OO_/___", "XO_/XO_/___", "_XX/_OO/___", "___/OO_/XX_", "___/_OO/_XX"]
+        with AnalysisCache(self.path) as cache:
+            results = self.analyze(positions, cache)
+            self.assertEqual(len(cache), 1)
+
+        self.assertEqual([result["cached"] for result in results], [False] + [True] * 4)
+        for position, result in zip(positions, results):
+            with self.subTest(position=position):
+                self.assertEqual(result["position"], position)
+                self.assertEqual(len(winning_moves(position)), 1)
+                self.assertIn(result["best_move"], winning_moves(position))
+                self.assertEqual(result["proven"], "win X")
+                self.assertLessEqual(set(result["visits"]), set(parse_position(position).possible_moves()))
+
+    def test_spaces(self):
+        # Spaces are empty squares even at either end of a line
+        lines = ["  X/   /   \n", "X_O/_X_/__ \r\n", "   /   /   \n"]
+        results = self.analyze(lines, AnalysisCache())
+        self.assertEqual([result["position"] for result in results], ["__X/___/___", "X_O/_X_/___", "___/___/___"])
+        self.assertFalse(any("error" in result for result in results))
+
+    def test_errors(self):
+        # Invalid positions are reported in order and blank lines are skipped
+        results = self.analyze(["XX_/OO_/___", "", "XXX/___/___", "  ", "not a position", "X__/___/___"], AnalysisCache())
+        self.assertEqual([result["position"] for result in results], ["XX_/OO_/___", "XXX/___/___", "not a position", "X__/___/___"])
+        self.assertEqual(["error" in result for result in results], [False, True, True, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import unittest
+from random import Random
+
+try:
+    from mcts.arena import ArenaMCTSAgent, NodeArena
+except ImportError:
+    NodeArena = None
+from mcts.mnk import MNKState
+from mcts.state import Tie, Win
+from mcts.ttt import BitboardTicTacToeState
+
+
+@unittest.skipIf(NodeArena is None, "requires NumPy")
+class TestNodeArena(unittest.TestCase):
+    def test_backpropagate(self):
+        # Ties count as half a win for every player
+        state = BitboardTicTacToeState()
+        arena = NodeArena(state.players, capacity=16)
+        root = 0
+        self.assertEqual(arena.expand(root, state), 9)
+        child = arena.first_child[root]
+
+        arena.backpropagate(child, Tie())
+        arena.backpropagate(child, Win("X"))
+
+        self.assertEqual(arena.visits[root], 2)
+        self.assertEqual(arena.wins[root].tolist(), [1.5, 0.5])
+        self.assertEqual(arena.wins[child].tolist(), [1.5, 0.5])
+
+    def test_grows(self):
+        state = MNKState(5, 5, 4)
+        arena = NodeArena(state.players, capacity=4)
+        arena.expand(0, state)
+        self.assertGreaterEqual(arena.capacity, 26)
+
+
+@unittest.skipIf(NodeArena is None, "requires NumPy")
+class TestArenaMCTSAgent(unittest.TestCase):
+    def test_takes_win(self):
+        for state, moves, win in ((BitboardTicTacToeState(), ("A0", "B0", "A1", "B1"), "A2"), (MNKState(3, 3, 3), ("A1", "A3", "B1", "B3"), "C1")):
+            with self.subTest(state=type(state).__name__):
+                for move in moves:
+                    state = state.next_move(state.current_player, move)
+
+                agent = ArenaMCTSAgent(iterations=500, rng=Random(0))
+                self.assertEqual(agent.make_move(state), win)
+
+
+if __name__ == "__main__":
+    unittest.main()
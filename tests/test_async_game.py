@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import threading
+import time
+import unittest
+from random import Random
+
+from mcts.agents import RandomAgent
+from mcts.async_game import AsyncGame, PonderingAgent, ThreadedAgent
+from mcts.mcts import MCTSAgent
+from mcts.mnk import MNKState
+from mcts.ttt import BitboardTicTacToeState
+
+
+class SlowAgent(RandomAgent):
+    """Thinks for a while before making a random move."""
+
+    def __init__(self, log: list, seed: int, delay: float = 0.05):
+        super().__init__(Random(seed))
+        self.log = log
+        self.delay = delay
+
+    def make_move(self, state):
+        self.log.append(("move", state.current_player))
+        time.sleep(self.delay)
+        return super().make_move(state)
+
+
+class RecordingAgent(MCTSAgent):
+    """Records when it ponders and where its tree is re-rooted."""
+
+    def __init__(self, log: list, **kwargs):
+        super().__init__(**kwargs)
+        self.log = log
+        self.reroots = []
+        self.pondering = False
+        self.moved_while_pondering = False
+
+    def make_move(self, state):
+        self.log.append(("move", state.current_player))
+        self.moved_while_pondering |= self.pondering
+        return super().make_move(state)
+
+    def ponder(self, stop):
+        self.log.append(("ponder", self.curr_node.state.current_player))
+        self.pondering = True
+        try:
+            return super().ponder(stop)
+        finally:
+            self.pondering = False
+
+    def observe_move(self, player, move, new_state):
+        subtree = self.curr_node.children.get(move) if self.curr_node is not None else None
+        visits = None if subtree is None else subtree.scores.total()
+        super().observe_move(player, move, new_state)
+        self.reroots.append((subtree, visits))
+
+
+def play(state, agents):
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(AsyncGame(state, agents).play())
+
+
+class TestPonder(unittest.TestCase):
+    def test_until_stopped(self):
+        agent = MCTSAgent(iterations=1, seed=5)
+        agent.reset(MNKState(5, 5, 4))
+        stop = threading.Event()
+        timer = threading.Timer(0.05, stop.set)
+        timer.start()
+
+        # The iteration budget does not apply while pondering
+        run = agent.ponder(stop)
+        timer.join()
+        self.assertGreater(run, 1)
+        self.assertEqual(agent.curr_node.scores.total(), run)
+
+    def test_max_nodes(self):
+        agent = MCTSAgent(max_nodes=50, seed=6)
+        agent.reset(MNKState(5, 5, 4))
+        self.assertEqual(agent.ponder(threading.Event()), 49)
+        self.assertEqual(agent.node_count, 50)
+
+
+class TestPonderingAgent(unittest.TestCase):
+    def test_ponders_on_opponent_turns(self):
+        # The agent ponders only while the slow opponent thinks, and every
+        # move of the game re-roots its tree onto the subtree of that move
+        log = []
+        mcts = RecordingAgent(log, iterations=100, seed=0)
+        agent = PonderingAgent(mcts)
+        play(BitboardTicTacToeState(), {"X": agent, "O": ThreadedAgent(SlowAgent(log, seed=1))})
+
+        ponders = [player for event, player in log if event == "ponder"]
+        self.assertTrue(ponders)
+        self.assertEqual(set(ponders), {"O"})
+        self.assertGreater(agent.pondered, 0)
+
+        self.assertFalse(mcts.moved_while_pondering)
+
+        for subtree, visits in mcts.reroots:
+            self.assertIsNotNone(subtree)
+            self.assertGreater(visits, 0)
+        self.assertIs(mcts.curr_node, mcts.reroots[-1][0])
+        self.assertIsNone(mcts.curr_node.parent)
+
+    def test_ponders_before_first_move(self):
+        # Seated as the third player, the agent ponders from the first move
+        # of the game, before it has made a move of its own
+        log = []
+        state = MNKState(5, 5, 4, players=("X", "O", "Y"))
+        agent = PonderingAgent(RecordingAgent(log, iterations=50, seed=2))
+        play(state, {"X": ThreadedAgent(SlowAgent(log, seed=3)), "O": ThreadedAgent(SlowAgent(log, seed=4)), "Y": agent})
+
+        self.assertLess(log.index(("ponder", "O")), log.index(("move", "Y")))
+        self.assertEqual({player for event, player in log if event == "ponder"}, {"X", "O"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import unittest
+from collections import Counter
+from random import Random
+
+try:
+    import numpy as np
+    from mcts.batch import TIE, batch_simulate, board_tensor, line_indices, playout_counts, random_playouts
+except ImportError:
+    np = None
+from mcts.mcts import Node
+from mcts.state import TIES
+from mcts.ttt import BitboardTicTacToeState, TicTacToeState
+
+from .test_mcts import StatisticalTestCase, random_play
+
+
+def positions(count: int, seed: int):
+    """Undecided positions reached by random play, for both state classes."""
+    rng = Random(seed)
+    while count:
+        moves = []
+        state = BitboardTicTacToeState()
+        for _ in range(rng.randrange(6)):
+            move = rng.choice(state.possible_moves())
+            state = state.next_move(state.current_player, move)
+            moves.append(move)
+        if state.outcome.is_undecided:
+            other = TicTacToeState()
+            for move in moves:
+                other = other.next_move(other.current_player, move)
+            yield state, other
+            count -= 1
+
+
+@unittest.skipIf(np is None, "requires NumPy")
+class TestRandomPlayouts(StatisticalTestCase):
+    GAMES = 20000
+
+    def test_line_indices(self):
+        lines = {tuple(sorted(line)) for line in line_indices(3).tolist()}
+        self.assertEqual(lines, {(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6), (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)})
+
+    def test_board_tensor(self):
+        # Both state classes convert to the same arrays
+        bitboards, others = zip(*positions(20, seed=0))
+        boards, turns = board_tensor(bitboards)
+        other_boards, other_turns = board_tensor(others)
+        np.testing.assert_array_equal(boards, other_boards)
+        np.testing.assert_array_equal(turns, other_turns)
+
+        for state, board, turn in zip(bitboards, boards, turns):
+            self.assertEqual(state.current_player, "XO"[turn])
+            self.assertEqual([" XO"[code] for code in board], [square for row in state.rows for square in row])
+
+    def test_decided_games(self):
+        # Games already decided are not played on
+        boards, turns = board_tensor([BitboardTicTacToeState([0b000000111, 0b000011000], turn=1), BitboardTicTacToeState([0b101011010, 0b010100101])])
+        before = boards.copy()
+        results = random_playouts(boards, turns, rng=np.random.default_rng(0))
+        self.assertEqual(results.tolist(), [0, TIE])
+        np.testing.assert_array_equal(boards, before)
+
+    def test_probabilities(self):
+        # Results follow the exact probabilities of random play
+        rng = np.random.default_rng(1)
+        for state, _ in positions(5, seed=2):
+            with self.subTest(state=repr(state)):
+                wins, ties = playout_counts(state, self.GAMES, rng=rng)
+                counts = Counter(wins)
+                counts[TIES] = ties
+                self.assertFrequencies(+counts, random_play(state), self.GAMES)
+
+    def test_batch_simulate(self):
+        # Every node records its games at once, and backpropagates them
+        root = Node(BitboardTicTacToeState())
+        children = [Node(BitboardTicTacToeState().next_move("X", move), parent=root) for move in ("A0", "B1", "C2")]
+        batch_simulate(children, games=self.GAMES, rng=np.random.default_rng(3))
+
+        for child in children:
+            self.assertEqual(child.scores.total(), self.GAMES)
+            self.assertFrequencies(child.scores, random_play(child.state), self.GAMES)
+        self.assertEqual(root.scores.total(), 3 * self.GAMES)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import unittest
+
+from mcts.evaluation import EvaluationQueue, Evaluator
+from mcts.mcts import MCTSAgent
+from mcts.state import TIES
+from mcts.ttt import BitboardTicTacToeState
+
+
+class Constant(Evaluator):
+    """Values every state the same."""
+
+    def __init__(self, value):
+        self.value = value
+        self.batches = []
+
+    def evaluate(self, states):
+        self.batches.append(len(states))
+        return [dict(self.value) for _ in states]
+
+
+def nodes(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children.values())
+
+
+class TestEvaluationQueue(unittest.TestCase):
+    def search(self, evaluator, iterations=100, batch_size=8):
+        queue = EvaluationQueue(evaluator, batch_size=batch_size)
+        agent = MCTSAgent(iterations=iterations, seed=6, queue=queue)
+        agent.reset(BitboardTicTacToeState())
+        agent.search()
+        return queue, agent.curr_node
+
+    def test_search(self):
+        # Every iteration is evaluated once, in full batches but the last,
+        # and no virtual loss is left behind
+        evaluator = Constant({"X": 0.5, "O": 0.25})
+        queue, root = self.search(evaluator)
+
+        self.assertEqual(len(queue), 0)
+        self.assertEqual(queue.evaluated, sum(evaluator.batches))
+        self.assertTrue(all(size == 8 for size in evaluator.batches[:-1]))
+        self.assertAlmostEqual(root.scores.total(), 100)
+        for node in nodes(root):
+            self.assertEqual(node.virtual_loss, 0)
+
+    def test_no_negative_ties(self):
+        # Scores summing to slightly more than 1 are not recorded as
+        # negative ties
+        _, root = self.search(Constant({"X": 0.7, "O": 0.3 + 1e-12}))
+        for node in nodes(root):
+            self.assertGreaterEqual(node.scores[TIES], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
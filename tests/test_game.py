@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import io
+import unittest
+from collections import Counter
+
+from mcts.async_game import AsyncGame, ThreadedAgent
+from mcts.game import Game
+from mcts.match import play_game
+from mcts.mcts import MCTSAgent
+from mcts.ttt import BitboardTicTacToeState
+
+
+class Following(MCTSAgent):
+    """Records how its tree follows the moves of the game."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.followed = []
+
+    def observe_move(self, player, move, new_state):
+        subtree = None if self.curr_node is None else self.curr_node.children.get(move)
+        scores = None if subtree is None else Counter(subtree.scores)
+        super().observe_move(player, move, new_state)
+        self.followed.append({
+            "player": player,
+            "subtree": subtree,
+            "scores": scores,
+            "node": self.curr_node,
+            "node_scores": Counter(self.curr_node.scores),
+            "parent": self.curr_node.parent,
+            "state": new_state,
+            "node_state": self.curr_node.state,
+        })
+
+
+def run_game(runner: str, agents):
+    """Play a game of Tic Tac Toe with one of the game runners."""
+    state = BitboardTicTacToeState()
+    with contextlib.redirect_stdout(io.StringIO()):
+        if runner == "Game":
+            Game(state, agents).play()
+        elif runner == "play_game":
+            play_game(state, agents)
+        else:
+            asyncio.run(AsyncGame(state, {player: ThreadedAgent(agent) for player, agent in agents.items()}).play())
+
+
+class TestFollowingMoves(unittest.TestCase):
+    def test_runners(self):
+        # Every runner tells both agents about every move, including their
+        # own, and each agent's tree moves down to the subtree of the move
+        # with the statistics of its search, detached from the old tree
+        for runner in ("Game", "play_game", "AsyncGame"):
+            with self.subTest(runner=runner):
+                agents = {"X": Following(iterations=200, seed=1), "O": Following(iterations=200, seed=2)}
+                run_game(runner, agents)
+
+                moves = [(entry["player"], entry["state"]) for entry in agents["X"].followed]
+                self.assertEqual({player for player, _ in moves}, {"X", "O"})
+                self.assertTrue(moves[-1][1].outcome.is_decided)
+
+                for agent in agents.values():
+                    self.assertEqual([(entry["player"], entry["state"]) for entry in agent.followed], moves)
+
+                    kept = 0
+                    for entry in agent.followed:
+                        self.assertEqual(entry["node_state"], entry["state"])
+                        self.assertIsNone(entry["parent"])
+                        if entry["subtree"] is not None:
+                            self.assertIs(entry["node"], entry["subtree"])
+                            self.assertEqual(entry["node_scores"], entry["scores"])
+                            kept += entry["scores"].total() > 0
+                    self.assertIs(agent.curr_node, agent.root)
+
+                    # Subtrees are kept through the moves of both players
+                    players = {entry["player"] for entry in agent.followed if entry["subtree"] is not None}
+                    self.assertEqual(players, {"X", "O"})
+                    self.assertGreater(kept, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
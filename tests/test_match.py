@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import io
+import json
+import unittest
+from functools import partial
+from random import Random
+
+from mcts.agents import Agent, RandomAgent
+from mcts.match import MatchResult, play_game, run_match
+from mcts.ttt import TicTacToeState
+
+
+class FirstMoveAgent(Agent):
+    """Always plays the first of the sorted possible moves."""
+
+    def make_move(self, state):
+        return min(state.possible_moves())
+
+    def observe_move(self, player, move, new_state):
+        pass
+
+    def see_state(self, state):
+        pass
+
+
+class TestPlayGame(unittest.TestCase):
+    def test_record(self):
+        # The moves of the record replay the game to its winner
+        for seed in range(10):
+            rng = Random(seed)
+            record = play_game(TicTacToeState(), {"X": RandomAgent(rng), "O": RandomAgent(rng)})
+            self.assertEqual(len(record["times"]), len(record["moves"]))
+            self.assertTrue(all(seconds >= 0 for seconds in record["times"]))
+
+            state = TicTacToeState()
+            for move in record["moves"]:
+                self.assertTrue(state.outcome.is_undecided)
+                state = state.next_move(state.current_player, move)
+            self.assertFalse(state.outcome.is_undecided)
+            self.assertEqual(record["winner"], state.outcome.winner if state.outcome.is_win else None)
+
+    def test_invalid_move(self):
+        class Cheater(FirstMoveAgent):
+            def make_move(self, state):
+                return "A0"
+
+        with self.assertRaises(ValueError):
+            play_game(TicTacToeState(), {"X": Cheater(), "O": Cheater()})
+
+
+class TestRunMatch(unittest.TestCase):
+    def test_alternates_players(self):
+        # The same game is played with the agents swapping seats, so the first
+        # agent wins exactly the games where it plays the winner
+        winner = play_game(TicTacToeState(), {"X": FirstMoveAgent(), "O": FirstMoveAgent()})["winner"]
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                out = io.StringIO()
+                result = run_match(TicTacToeState(), ("X", "O"), FirstMoveAgent, FirstMoveAgent, games=6, workers=workers, out=out)
+                records = sorted((json.loads(line) for line in out.getvalue().splitlines()), key=lambda record: record["game"])
+
+                self.assertEqual([record["game"] for record in records], list(range(6)))
+                self.assertEqual([record["first_player"] for record in records], ["X", "O"] * 3)
+                for record in records:
+                    self.assertEqual(record["winner"], winner)
+                    expected = "draw" if winner is None else "win" if record["first_player"] == winner else "loss"
+                    self.assertEqual(record["result"], expected)
+
+                self.assertEqual(result.games, 6)
+                self.assertEqual((result.wins, result.draws, result.losses), (3, 0, 3) if winner else (0, 6, 0))
+
+    def test_factories(self):
+        # Every game gets fresh agents from the factories
+        created = []
+
+        def factory():
+            agent = RandomAgent(Random(len(created)))
+            created.append(agent)
+            return agent
+
+        result = run_match(TicTacToeState(), ("X", "O"), factory, partial(RandomAgent, Random(0)), games=4)
+        self.assertEqual(result.games, 4)
+        self.assertEqual(len(set(map(id, created))), 4)
+
+
+class TestMatchResult(unittest.TestCase):
+    def test_no_games(self):
+        result = MatchResult()
+        self.assertEqual(result.games, 0)
+        self.assertIsNone(result.score)
+        self.assertIsNone(result.confidence_interval())
+        self.assertEqual(str(result), "no games")
+
+    def test_score(self):
+        result = MatchResult()
+        for outcome in ("win", "win", "draw", "loss"):
+            result.add(outcome)
+
+        self.assertEqual((result.wins, result.draws, result.losses), (2, 1, 1))
+        self.assertEqual(result.score, 0.625)
+        low, high = result.confidence_interval()
+        self.assertLess(low, 0.625)
+        self.assertGreater(high, 0.625)
+        self.assertTrue(str(result).startswith("+2 =1 -1 score 0.625"))
+
+    def test_sweep(self):
+        # With no variance, the interval is the score itself
+        self.assertEqual(MatchResult(wins=10).confidence_interval(), (1.0, 1.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
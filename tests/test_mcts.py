@@ -0,0 +1,508 @@
+"""Statistical and structural checks of playouts, backpropagation and search.
+
+Random playouts are compared against the exact outcome probabilities of
+uniformly random Tic Tac Toe, found by enumerating the game tree, and search
+trees are checked to count every playout exactly once at every node on its
+path. Proofs of the solver are checked against minimax.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+import tracemalloc
+import unittest
+from collections import Counter
+from functools import lru_cache
+from random import Random
+
+from mcts.agents import RandomAgent
+from mcts.match import play_game
+from mcts.mcts import MCTSAgent, Node, default_score_function, playout, rave_score_function
+from mcts.mnk import MNKState
+from mcts.policy import RandomPolicy
+from mcts.rng import SearchRandom
+from mcts.state import TIES, Tie, Win, credit
+from mcts.ttt import BitboardTicTacToeState, TicTacToeState
+
+# Deviations from an expected frequency larger than this many standard errors
+# fail a test. Seeds are fixed, so the tests are deterministic, but the bound
+# keeps them valid for any seed.
+SIGMAS = 4.5
+
+@lru_cache(maxsize=None)
+def random_play(state: BitboardTicTacToeState) -> Counter:
+    """The exact probabilities of each result of a uniformly random playout."""
+    if state.outcome.is_decided:
+        return Counter({result(state.outcome): 1.0})
+
+    moves = state.legal_move_indices()
+    probabilities = Counter()
+    for index in moves:
+        for key, p in random_play(state.apply_unchecked(index)).items():
+            probabilities[key] += p / len(moves)
+    return probabilities
+
+
+@lru_cache(maxsize=None)
+def minimax(state: BitboardTicTacToeState):
+    """The winner under perfect play, or `TIES`."""
+    if state.outcome.is_decided:
+        return result(state.outcome)
+
+    results = {minimax(state.apply_unchecked(index)) for index in state.legal_move_indices()}
+    if state.current_player in results:
+        return state.current_player
+    if TIES in results:
+        return TIES
+    return results.pop()
+
+
+def result(outcome):
+    """The key of an outcome in win counts."""
+    return outcome.winner if outcome.is_win else TIES
+
+
+def direct(node: Node) -> Counter:
+    """The playouts recorded at a node itself, rather than below it."""
+    counts = Counter(node.scores)
+    for child in node.children.values():
+        counts.subtract(child.scores)
+    return counts
+
+
+def nodes(root: Node):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children.values())
+
+
+def searched(iterations: int, seed: int, state=None, **kwargs) -> Node:
+    """Search a state, by default the empty board, and return its node."""
+    agent = MCTSAgent(iterations=iterations, seed=seed, **kwargs)
+    agent.reset(BitboardTicTacToeState() if state is None else state)
+    agent.search()
+    return agent.curr_node
+
+
+class StatisticalTestCase(unittest.TestCase):
+    def assertFrequencies(self, counts: Counter, expected: Counter, n: int):
+        """Check observed counts against expected probabilities."""
+        self.assertEqual(sum(counts.values()), n)
+        for key, p in expected.items():
+            error = SIGMAS * math.sqrt(p * (1 - p) / n)
+            self.assertAlmostEqual(counts[key] / n, p, delta=error, msg=f"frequency of {key!r}")
+
+
+class TestPlayout(StatisticalTestCase):
+    PLAYOUTS = 20000
+
+    def setUp(self):
+        self.expected = random_play(BitboardTicTacToeState())
+
+    def test_exact_probabilities(self):
+        # The known probabilities of random Tic Tac Toe
+        self.assertAlmostEqual(sum(self.expected.values()), 1)
+        self.assertAlmostEqual(self.expected["X"], 737 / 1260)
+        self.assertAlmostEqual(self.expected["O"], 121 / 420)
+        self.assertAlmostEqual(self.expected[TIES], 8 / 63)
+
+    def test_playout(self):
+        for state in (TicTacToeState(), BitboardTicTacToeState(), MNKState(3, 3, 3)):
+            with self.subTest(state=type(state).__name__):
+                rng = SearchRandom(1)
+                counts = Counter(result(playout(state, rng)) for _ in range(self.PLAYOUTS))
+                self.assertFrequencies(counts, self.expected, self.PLAYOUTS)
+
+    def test_random_policy(self):
+        rng = SearchRandom(2)
+        policy = RandomPolicy()
+        counts = Counter(result(policy.playout(BitboardTicTacToeState(), rng)) for _ in range(self.PLAYOUTS))
+        self.assertFrequencies(counts, self.expected, self.PLAYOUTS)
+
+    def test_grown_playouts(self):
+        # Playouts that grow the tree record the same results
+        node = Node(BitboardTicTacToeState(), rng=SearchRandom(3), grow_playouts=True)
+        for _ in range(2000):
+            node.simulate()
+            node.release()
+
+        self.assertFrequencies(node.scores, self.expected, 2000)
+
+    def test_expand_grown_nodes(self):
+        # Expanding a node added by a grown playout keeps the child the
+        # playout added, rather than trying its move again
+        root = Node(BitboardTicTacToeState(), rng=SearchRandom(0), grow_playouts=True)
+        for _ in range(200):
+            before = list(nodes(root))
+            root.select().expand()
+            for node in before[1:]:
+                self.assertIs(node.parent.children[node.move], node)
+
+        for node in nodes(root):
+            if node.untried is not None:
+                tried = {node.state.move_index(move) for move in node.children}
+                self.assertFalse(tried & set(node.untried))
+
+    def test_simulate(self):
+        # Repeated simulations of one node estimate its expected score
+        node = Node(BitboardTicTacToeState(), rng=SearchRandom(4))
+        for _ in range(self.PLAYOUTS):
+            node.simulate()
+
+        self.assertFrequencies(node.scores, self.expected, self.PLAYOUTS)
+
+        value = credit(node.scores, "X") / self.PLAYOUTS
+        expected = credit(self.expected, "X")
+        self.assertAlmostEqual(value, expected, delta=SIGMAS * 0.5 / math.sqrt(self.PLAYOUTS))
+
+
+class TestBackpropagation(unittest.TestCase):
+    def chain(self, depth: int):
+        """Make a path of nodes, returning the root and the leaf."""
+        state = BitboardTicTacToeState()
+        root = leaf = Node(state)
+        for _ in range(depth):
+            leaf = Node(state, parent=leaf)
+        return root, leaf
+
+    def path(self, leaf: Node):
+        node = leaf
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def test_update(self):
+        root, leaf = self.chain(5)
+        leaf.update(Win("X"))
+        leaf.update(Tie())
+        leaf.parent.update(Win("O"))
+
+        for node in self.path(leaf.parent):
+            self.assertEqual(node.scores, Counter({"X": 1, TIES: 1, "O": 1}))
+        self.assertEqual(leaf.scores, Counter({"X": 1, TIES: 1}))
+
+    def test_tie_credit(self):
+        node = Node(BitboardTicTacToeState())
+        node.update(Tie())
+        node.update(Tie())
+        node.update(Win("X"))
+
+        self.assertEqual(node.scores.total(), 3)
+        self.assertEqual(credit(node.scores, "X"), 2)
+        self.assertEqual(credit(node.scores, "O"), 1)
+
+    def test_record(self):
+        root, leaf = self.chain(3)
+        leaf.record(Counter({"X": 0.5, "O": 0.25}), 0.25)
+        leaf.record(Counter({"X": 3}), 1)
+
+        for node in self.path(leaf):
+            self.assertEqual(node.scores, Counter({"X": 3.5, "O": 0.25, TIES: 1.25}))
+
+    def test_deep_tree(self):
+        # Backpropagation is iterative, so depth is not limited by recursion
+        root, leaf = self.chain(5000)
+        leaf.update(Win("O"))
+        self.assertEqual(root.scores, Counter({"O": 1}))
+
+    def test_shared_scores(self):
+        # Counts shared through a transposition table are updated in place
+        shared = Counter()
+        root = Node(BitboardTicTacToeState(), scores=shared)
+        Node(BitboardTicTacToeState(), parent=root).update(Tie())
+        self.assertIs(root.scores, shared)
+        self.assertEqual(shared, Counter({TIES: 1}))
+
+    def test_search_conservation(self):
+        # Every iteration records one playout at one new leaf, so every node
+        # but the root holds exactly one playout of its own, and the root
+        # counts every playout
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                root = searched(500, seed)
+                self.assertEqual(root.scores.total(), 500)
+                self.assertEqual(+direct(root), Counter())
+
+                playouts = Counter()
+                for node in nodes(root):
+                    counts = direct(node)
+                    self.assertTrue(all(count >= 0 for count in counts.values()))
+                    if node is not root:
+                        self.assertEqual(counts.total(), 1)
+                    playouts += counts
+
+                self.assertEqual(+playouts, +root.scores)
+                self.assertEqual(root.count_nodes(), 501)
+
+    def test_root_value(self):
+        # The tree chooses moves better than random play for both players,
+        # so its playouts end in more ties
+        scores = searched(2000, 5).scores
+        self.assertEqual(scores.total(), 2000)
+        self.assertGreater(scores[TIES] / 2000, random_play(BitboardTicTacToeState())[TIES])
+
+
+class TestSolver(unittest.TestCase):
+    def test_empty_board(self):
+        root = searched(100000, 7)
+        self.assertIsNotNone(root.proven)
+        self.assertTrue(root.proven.is_tie)
+
+    def test_proofs(self):
+        # Proofs of random positions agree with minimax, and a search only
+        # stops early once it has a proof
+        rng = Random(11)
+        for _ in range(30):
+            state = BitboardTicTacToeState()
+            for _ in range(rng.randrange(1, 6)):
+                if state.outcome.is_decided:
+                    break
+                state = state.apply_unchecked(rng.choice(state.legal_move_indices()))
+            if state.outcome.is_decided:
+                continue
+
+            with self.subTest(state=repr(state)):
+                root = searched(20000, 12, state)
+                self.assertIsNotNone(root.proven)
+                self.assertEqual(result(root.proven), minimax(state))
+
+    def test_proven_before_search(self):
+        # No iterations are run from a node that is already proven, but the
+        # agent still picks the proven move
+        state = BitboardTicTacToeState()
+        for move in ("A0", "B0", "A1", "B1"):
+            state = state.next_move(state.current_player, move)
+
+        agent = MCTSAgent(iterations=20000, seed=24)
+        agent.reset(state)
+        agent.search()
+        self.assertIsNotNone(agent.curr_node.proven)
+        total = agent.curr_node.scores.total()
+
+        self.assertEqual(agent.search(), 0)
+        self.assertEqual(agent.curr_node.scores.total(), total)
+        self.assertEqual(agent.make_move(state), "A2")
+
+    def test_forced_win(self):
+        # X threatens both A2 and C0 through the center, so O cannot stop it
+        state = BitboardTicTacToeState()
+        for move in ("B1", "A1", "C2", "A0"):
+            state = state.next_move(state.current_player, move)
+
+        root = searched(5000, 13, state)
+        self.assertTrue(root.proven.is_win)
+        self.assertEqual(root.proven.winner, "X")
+        self.assertEqual(root.best_move, "A2")
+
+
+class TestSearch(unittest.TestCase):
+    def test_takes_win(self):
+        state = BitboardTicTacToeState()
+        for move in ("A0", "B0", "A1", "B1"):
+            state = state.next_move(state.current_player, move)
+
+        for seed in range(5):
+            agent = MCTSAgent(iterations=200, seed=seed)
+            self.assertEqual(agent.make_move(state), "A2")
+
+    def test_time_limit(self):
+        agent = MCTSAgent(time_limit=0.05, seed=17)
+        agent.reset(MNKState(7, 7, 4))
+        start = time.perf_counter()
+        run = agent.search()
+        elapsed = time.perf_counter() - start
+
+        self.assertGreater(run, 0)
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(agent.curr_node.scores.total(), run)
+
+    def test_max_nodes(self):
+        # Every iteration adds a node, so the search stops at the node budget
+        # even with iterations left
+        agent = MCTSAgent(iterations=1000, max_nodes=100, seed=18)
+        agent.reset(MNKState(5, 5, 4))
+        self.assertEqual(agent.search(), 99)
+        self.assertEqual(agent.node_count, 100)
+        self.assertEqual(agent.curr_node.count_nodes(), 100)
+
+    def test_plays_random_agent(self):
+        # The tree follows the game, so every move chosen is legal, also for
+        # TicTacToeState and whichever player the agent is
+        for seed in range(10):
+            for player in ("X", "O"):
+                with self.subTest(seed=seed, player=player):
+                    opponent = "O" if player == "X" else "X"
+                    agents = {player: MCTSAgent(iterations=50, seed=seed), opponent: RandomAgent(Random(seed))}
+                    record = play_game(TicTacToeState(), agents)
+                    self.assertGreaterEqual(len(record["moves"]), 5)
+
+    def test_seeded(self):
+        def search(seed):
+            root = searched(300, seed)
+            return {move: child.scores for move, child in root.children.items()}
+
+        self.assertEqual(search(8), search(8))
+
+    def test_node_budget(self):
+        agent = MCTSAgent(iterations=3000, seed=14, node_budget=200)
+        agent.reset(MNKState(5, 5, 4))
+        agent.search()
+
+        self.assertLessEqual(agent.node_count, 200)
+        self.assertEqual(agent.node_count, agent.curr_node.count_nodes())
+        self.assertEqual(agent.curr_node.scores.total(), 3000)
+
+    def test_memory_budget(self):
+        # The traced memory of the tree stays close to the budget, with and
+        # without RAVE
+        for rave in (None, 300):
+            with self.subTest(rave=rave):
+                agent = MCTSAgent(iterations=3000, seed=15, rave=rave, memory_budget=1_000_000)
+                tracemalloc.start()
+                agent.reset(BitboardTicTacToeState())
+                agent.search()
+                size, _ = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                self.assertLessEqual(agent.tree_bytes, 1_000_000)
+                self.assertLess(size, 1_250_000)
+
+    def test_bytes_per_node(self):
+        # Nodes of games with more moves, or gathering AMAF statistics, are
+        # estimated to be larger
+        def estimate(state, rave=None):
+            agent = MCTSAgent(rave=rave)
+            agent.reset(state)
+            return agent.bytes_per_node
+
+        small = estimate(MNKState(3, 3, 3))
+        self.assertLess(small, estimate(MNKState(15, 15, 5)))
+        self.assertLess(small, estimate(MNKState(3, 3, 3), rave=300))
+        self.assertGreater(estimate(MNKState(15, 15, 5), rave=300), 10 * small)
+
+    def test_budget_too_small(self):
+        # The children of the current node are kept even over the budget
+        agent = MCTSAgent(iterations=300, seed=16, node_budget=10)
+        agent.reset(MNKState(5, 5, 4))
+        with self.assertWarns(UserWarning):
+            agent.search()
+        self.assertEqual(agent.node_count, agent.curr_node.count_nodes())
+        self.assertEqual(agent.node_count, 26)
+
+
+class TestWidening(unittest.TestCase):
+    def test_children_limited(self):
+        # Nodes get at most ceil(C * n**alpha) children after n simulations
+        c, alpha = 1.5, 0.25
+        agent = MCTSAgent(iterations=2000, seed=21, widening=(c, alpha))
+        agent.reset(MNKState(7, 7, 4))
+        agent.search()
+
+        root = agent.curr_node
+        self.assertEqual(len(root.children), math.ceil(c * 2000 ** alpha))
+        checked = 0
+        for node in nodes(root):
+            if node.children and not any(child.proven is not None for child in node.children.values()):
+                self.assertLessEqual(len(node.children), max(1, math.ceil(c * node.scores.total() ** alpha)))
+                checked += 1
+        self.assertGreater(checked, 100)
+
+    def test_widens_solved_nodes(self):
+        # Widening alone would allow a single child, but once every child is
+        # solved more are added, until the position is solved
+        state = BitboardTicTacToeState()
+        for move in ("B1", "A0", "C2", "A2"):
+            state = state.next_move(state.current_player, move)
+
+        root = searched(3000, seed=22, state=state, widening=(0.5, 0.1))
+        self.assertEqual(math.ceil(0.5 * root.scores.total() ** 0.1), 1)
+        self.assertTrue(root.proven.is_tie)
+        self.assertEqual(len(root.children), 5)
+
+
+class TestSearchStats(unittest.TestCase):
+    def test_stats(self):
+        searches = []
+        agent = MCTSAgent(iterations=500, seed=19, on_search=searches.append)
+        agent.reset(MNKState(4, 4, 3))
+        agent.search()
+
+        stats = agent.last_stats
+        self.assertEqual(searches, [stats])
+        self.assertEqual(stats.iterations, 500)
+        self.assertEqual(stats.nodes, agent.node_count - 1)
+        self.assertEqual(stats.root_visits, {move: child.scores.total() for move, child in agent.curr_node.children.items()})
+        self.assertEqual(sum(stats.root_visits.values()), 500)
+
+        times = (stats.select_time, stats.expand_time, stats.simulate_time, stats.backpropagate_time)
+        self.assertTrue(all(seconds >= 0 for seconds in times))
+        self.assertLessEqual(sum(times), stats.elapsed)
+        self.assertGreaterEqual(stats.max_depth, stats.average_depth)
+        self.assertGreater(stats.average_depth, 0)
+        self.assertGreater(stats.branching_factor, 1)
+        self.assertEqual(stats.as_dict()["iterations"], 500)
+
+    def test_not_collected(self):
+        agent = MCTSAgent(iterations=50, seed=20)
+        agent.reset(BitboardTicTacToeState())
+        agent.search()
+        self.assertIsNone(agent.last_stats)
+
+
+class TestAMAF(unittest.TestCase):
+    def child(self, node: Node, move) -> Node:
+        child = Node(node.state.next_move(node.state.current_player, move), parent=node, rave=True)
+        child.move = move
+        node.children[move] = child
+        return child
+
+    def test_update(self):
+        # X plays A0 and O plays B0 in the tree, and the playout goes on
+        # with X's C0 and O's C1
+        root = Node(BitboardTicTacToeState(), rave=True)
+        child = self.child(root, "A0")
+        leaf = self.child(child, "B0")
+
+        leaf.update(Win("X"), {"C0": "X", "C1": "O"})
+
+        self.assertEqual(root.amaf, {"A0": Counter({"X": 1}), "C0": Counter({"X": 1})})
+        self.assertEqual(child.amaf, {"B0": Counter({"X": 1}), "C1": Counter({"X": 1})})
+        self.assertEqual(leaf.amaf, {"C0": Counter({"X": 1})})
+
+    def test_search(self):
+        # Every playout through a child counts toward the AMAF statistics of
+        # its move, and no playout counts twice
+        root = searched(500, 10, rave=100)
+
+        for node in nodes(root):
+            for move, child in node.children.items():
+                self.assertGreaterEqual(node.amaf[move].total(), child.scores.total())
+            for amaf in node.amaf.values():
+                self.assertLessEqual(amaf.total(), node.scores.total())
+
+    def test_score_function(self):
+        # Without AMAF statistics, RAVE scores like UCT
+        self.assertEqual(rave_score_function(3, 10, 100, 0, 0), default_score_function(3, 10, 100))
+
+        # AMAF values weigh less as the node is simulated more
+        few = rave_score_function(1, 10, 1000, 90, 100, exploration_parameter=0)
+        many = rave_score_function(10000, 100000, 100000, 90, 100, exploration_parameter=0)
+        self.assertGreater(few, 0.8)
+        self.assertAlmostEqual(many, 0.1, delta=0.05)
+
+    def test_takes_win(self):
+        state = MNKState(5, 5, 4)
+        for move in ("A1", "A5", "B1", "B5", "C1", "C5"):
+            state = state.next_move(state.current_player, move)
+
+        for seed in range(3):
+            agent = MCTSAgent(iterations=300, seed=seed, rave=300)
+            self.assertEqual(agent.make_move(state), "D1")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+import unittest
+from random import Random
+
+from mcts.mnk import MNKState
+
+
+def describe(outcome):
+    return "undecided" if outcome.is_undecided else "tie" if outcome.is_tie else outcome.winner
+
+
+class TestMNKState(unittest.TestCase):
+    SIZES = ((3, 3, 3), (4, 4, 3), (5, 7, 4), (6, 6, 5), (1, 5, 2))
+
+    def test_incremental_outcome(self):
+        # Outcomes checked through the last move agree with a full scan of a
+        # state built from the same boards, and so do the hashes
+        rng = Random(0)
+        for m, n, k in self.SIZES:
+            with self.subTest(size=(m, n, k)):
+                for _ in range(50):
+                    state = MNKState(m, n, k)
+                    while True:
+                        scanned = MNKState(m, n, k, boards=state.boards, turn=state.turn)
+                        self.assertEqual(describe(state.outcome), describe(scanned.outcome), repr(state))
+                        self.assertEqual(state, scanned)
+                        self.assertEqual(hash(state), hash(scanned))
+                        if state.outcome.is_decided:
+                            break
+                        state = state.apply_unchecked(state.random_move_index(rng))
+
+    def test_tic_tac_toe(self):
+        state = MNKState(3, 3, 3)
+        for move in ("A1", "A2", "B1", "B2"):
+            state = state.next_move(state.current_player, move)
+        self.assertTrue(state.outcome.is_undecided)
+
+        state = state.next_move("X", "C1")
+        self.assertTrue(state.outcome.is_win)
+        self.assertEqual(state.outcome.winner, "X")
+        self.assertEqual(state.legal_move_indices(), [])
+
+    def test_move_names(self):
+        state = MNKState(15, 15, 5)
+        self.assertEqual(state.index_move(7 * 15 + 7), "H8")
+        self.assertEqual(state.move_index("A15"), 0)
+        self.assertEqual(MNKState(3, 30, 3).index_move(29), "AD3")
+
+    def test_invalid_moves(self):
+        state = MNKState(5, 5, 4).next_move("X", "C3")
+        for move in ("C3", "F1", "A0", "", None):
+            with self.subTest(move=move):
+                with self.assertRaises(ValueError):
+                    state.next_move("O", move)
+
+        with self.assertRaises(ValueError):
+            MNKState(3, 3, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+
+try:
+    import numpy as np
+    from mcts.models import LinearEvaluator, MLPEvaluator, board_features
+except ImportError:
+    np = None
+from mcts.evaluation import EvaluationQueue
+from mcts.mcts import MCTSAgent
+from mcts.mnk import MNKState
+from mcts.ttt import BitboardTicTacToeState
+
+
+def play(state, moves):
+    for move in moves:
+        state = state.next_move(state.current_player, move)
+    return state
+
+
+@unittest.skipIf(np is None, "requires NumPy")
+class TestBoardFeatures(unittest.TestCase):
+    def test_relative_to_player(self):
+        # X on A0 and C2, O on B1, with O to move
+        state = play(BitboardTicTacToeState(), ("A0", "B1", "C2"))
+        features = board_features([BitboardTicTacToeState(), state], 9)
+        self.assertEqual(features.shape, (2, 18))
+        self.assertEqual(features.dtype, np.float32)
+        self.assertFalse(features[0].any())
+
+        mover, opponent = features[1, :9], features[1, 9:]
+        self.assertEqual(mover.sum(), 1)
+        self.assertEqual(opponent.sum(), 2)
+        self.assertFalse((mover * opponent).any())
+        self.assertEqual(int(mover @ (1 << np.arange(9))), state.boards[1])
+        self.assertEqual(int(opponent @ (1 << np.arange(9))), state.boards[0])
+
+    def test_large_boards(self):
+        # Boards wider than a byte and not a multiple of eight squares
+        state = play(MNKState(7, 7, 4), ("A1", "G7", "D4"))
+        features = board_features([state], 49)
+        self.assertEqual(features.shape, (1, 98))
+        self.assertEqual(int(features[0, :49] @ (1 << np.arange(49, dtype=object))), state.boards[state.turn])
+        self.assertEqual(int(features[0, 49:] @ (1 << np.arange(49, dtype=object))), state.boards[1 - state.turn])
+
+
+@unittest.skipIf(np is None, "requires NumPy")
+class TestValueEvaluators(unittest.TestCase):
+    def states(self):
+        return [BitboardTicTacToeState(), play(BitboardTicTacToeState(), ("B1",)), play(BitboardTicTacToeState(), ("B1", "A0", "C2"))]
+
+    def test_linear(self):
+        # Weighing the squares of the player to move favours them
+        weights = np.concatenate([np.full(9, 0.5), np.zeros(9)])
+        evaluator = LinearEvaluator(weights, bias=0.1)
+        self.assertEqual(evaluator.area, 9)
+
+        states = self.states()
+        values = evaluator.value(board_features(states, 9))
+        np.testing.assert_allclose(values, np.tanh([0.1, 0.1, 0.6]), rtol=1e-6)
+
+        for state, value, evaluation in zip(states, values, evaluator.evaluate(states)):
+            mover, opponent = state.players[state.turn], state.players[1 - state.turn]
+            self.assertAlmostEqual(evaluation[mover], (1 + value) / 2, places=6)
+            self.assertAlmostEqual(evaluation[mover] + evaluation[opponent], 1, places=6)
+
+    def test_mlp(self):
+        evaluator = MLPEvaluator.random(9, hidden=16, rng=np.random.default_rng(0))
+        self.assertEqual(evaluator.area, 9)
+        self.assertEqual(evaluator.w1.shape, (18, 16))
+
+        features = board_features(self.states(), 9)
+        hidden = np.maximum(features @ evaluator.w1, 0)
+        values = evaluator.value(features)
+        np.testing.assert_allclose(values, np.tanh(hidden @ evaluator.w2), rtol=1e-5)
+        self.assertTrue((np.abs(values) <= 1).all())
+
+    def test_save_load(self):
+        models = (LinearEvaluator(np.random.default_rng(1).normal(size=18), bias=0.25), MLPEvaluator.random(9, hidden=8, rng=np.random.default_rng(2)))
+        features = board_features(self.states(), 9)
+        with tempfile.TemporaryDirectory() as directory:
+            for model in models:
+                with self.subTest(model=type(model).__name__):
+                    path = os.path.join(directory, type(model).__name__ + ".npz")
+                    model.save(path)
+                    loaded = type(model).load(path)
+                    np.testing.assert_array_equal(loaded.value(features), model.value(features))
+
+    def test_search(self):
+        # A model guides a search through the evaluation queue
+        queue = EvaluationQueue(MLPEvaluator.random(9, hidden=16, rng=np.random.default_rng(3)), batch_size=8)
+        agent = MCTSAgent(iterations=200, seed=23, queue=queue)
+        agent.reset(BitboardTicTacToeState())
+        agent.search()
+        self.assertAlmostEqual(agent.curr_node.scores.total(), 200)
+        self.assertIn(agent.make_move(BitboardTicTacToeState()), BitboardTicTacToeState().possible_moves())
+
+
+if __name__ == "__main__":
+    unittest.main()
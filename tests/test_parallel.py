@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from collections import Counter
+
+from mcts.mnk import MNKState
+from mcts.parallel import RootParallelMCTSAgent, TreeParallelMCTSAgent, search_root
+from mcts.rng import SearchRandom
+from mcts.state import credit
+from mcts.ttt import BitboardTicTacToeState
+
+
+def nodes(root):
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node.children.values())
+
+
+class TestRootParallelMCTSAgent(unittest.TestCase):
+    def test_search_root(self):
+        # Searches are repeatable, and every iteration is counted at a child
+        # of the root
+        state = MNKState(4, 4, 3)
+        scores = search_root(state, 5, iterations=300)
+        self.assertEqual(scores, search_root(state, 5, iterations=300))
+        self.assertNotEqual(scores, search_root(state, 6, iterations=300))
+        self.assertLessEqual(set(scores), set(state.possible_moves()))
+        self.assertEqual(sum(counts.total() for counts in scores.values()), 300)
+
+    def test_merge(self):
+        # The move is chosen on the win counts of every worker's search,
+        # each seeded from a stream spawned from the agent's seed
+        state = MNKState(4, 4, 3)
+        merged = dict()
+        for stream in SearchRandom(3).spawn(2):
+            for move, counts in search_root(state, stream.initial_seed, iterations=200).items():
+                merged.setdefault(move, Counter()).update(counts)
+        expected = max(merged, key=lambda move: credit(merged[move], "X"))
+
+        with RootParallelMCTSAgent(workers=2, iterations=200, seed=3) as agent:
+            self.assertEqual(agent.make_move(state), expected)
+
+    def test_takes_win(self):
+        state = BitboardTicTacToeState()
+        for move in ("A0", "B0", "A1", "B1"):
+            state = state.next_move(state.current_player, move)
+
+        with RootParallelMCTSAgent(workers=2, iterations=100, seed=4) as agent:
+            self.assertEqual(agent.make_move(state), "A2")
+            # The pool is kept for later moves
+            self.assertEqual(agent.make_move(state), "A2")
+
+
+class TestTreeParallelMCTSAgent(unittest.TestCase):
+    def setUp(self):
+        # Switch threads far more often than usual, so that they interleave
+        # inside every critical section
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+        self.addCleanup(sys.setswitchinterval, interval)
+
+    def search(self, state, threads=4, **kwargs):
+        with TreeParallelMCTSAgent(threads, seed=0, **kwargs) as agent:
+            agent.reset(state)
+            run = agent.search()
+        return agent, run
+
+    def assertConsistent(self, agent):
+        """Check that no virtual loss is left and the tree is counted right."""
+        root = agent.curr_node
+        for node in nodes(root):
+            self.assertEqual(node.virtual_loss, 0)
+            if node is not root:
+                self.assertIs(node.parent.children[node.move], node)
+        self.assertEqual(agent.node_count, root.count_nodes())
+
+    def test_iterations(self):
+        # Every iteration of every thread adds one node and records one
+        # playout at every node on its path
+        agent, run = self.search(MNKState(5, 5, 4), iterations=2000)
+        root = agent.curr_node
+
+        self.assertEqual(run, 2000)
+        self.assertEqual(root.scores.total(), 2000)
+        self.assertEqual(agent.node_count, 2001)
+        for node in nodes(root):
+            if node.children:
+                self.assertEqual(node.scores.total(), sum(child.scores.total() for child in node.children.values()) + (node is not root))
+        self.assertConsistent(agent)
+
+    def test_node_budget(self):
+        # Leaves are evicted by one thread while the others search, and the
+        # tree ends within its budget with every node counted once
+        for eviction in ("visits", "lru"):
+            with self.subTest(eviction=eviction):
+                agent, run = self.search(MNKState(5, 5, 4), iterations=3000, node_budget=150, eviction=eviction)
+                self.assertEqual(run, 3000)
+                self.assertEqual(agent.curr_node.scores.total(), 3000)
+                self.assertLessEqual(agent.node_count, 150)
+                self.assertConsistent(agent)
+
+    def test_solves_empty_board(self):
+        # Threads stop claiming iterations once the root is proven
+        agent, run = self.search(BitboardTicTacToeState(), threads=2, iterations=100000)
+        self.assertIsNotNone(agent.curr_node.proven)
+        self.assertTrue(agent.curr_node.proven.is_tie)
+        self.assertLess(run, 100000)
+        self.assertConsistent(agent)
+
+    def test_takes_win(self):
+        state = BitboardTicTacToeState()
+        for move in ("A0", "B0", "A1", "B1"):
+            state = state.next_move(state.current_player, move)
+
+        with TreeParallelMCTSAgent(2, iterations=200, seed=1) as agent:
+            self.assertEqual(agent.make_move(state), "A2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import unittest
+from collections import Counter
+from random import Random
+
+from mcts.policy import HeavyTicTacToePolicy
+from mcts.ttt import BitboardTicTacToeState, TicTacToeState
+
+
+def position(cls, moves):
+    state = cls()
+    for move in moves:
+        state = state.next_move(state.current_player, move)
+    return state
+
+
+class TestHeavyTicTacToePolicy(unittest.TestCase):
+    def choices(self, moves):
+        """The moves the policy chooses in a position, for both state classes."""
+        policy = HeavyTicTacToePolicy()
+        rng = Random(0)
+        chosen = set()
+        for cls in (TicTacToeState, BitboardTicTacToeState):
+            state = position(cls, moves)
+            chosen |= {state.index_move(policy.choose(state, rng)) for _ in range(50)}
+        return chosen
+
+    def test_takes_win(self):
+        # X can win at A2 or block O at B2, and wins
+        self.assertEqual(self.choices(("A0", "B0", "A1", "B1")), {"A2"})
+
+    def test_blocks(self):
+        # O must block X at A2
+        self.assertEqual(self.choices(("A0", "B0", "A1")), {"A2"})
+
+    def test_random_moves(self):
+        # Without wins or threats, every move is played
+        self.assertEqual(self.choices(("B1",)), set(position(TicTacToeState, ("B1",)).possible_moves()))
+
+    def test_playout(self):
+        # With both players taking wins and blocking, most games are tied,
+        # far more than the 13% of random play
+        policy = HeavyTicTacToePolicy()
+        rng = Random(1)
+        for cls in (TicTacToeState, BitboardTicTacToeState):
+            with self.subTest(state=cls.__name__):
+                counts = Counter(policy.playout(cls(), rng).is_tie for _ in range(2000))
+                self.assertGreater(counts[True] / 2000, 0.3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import unittest
+
+from mcts.rng import SearchRandom
+
+
+def draws(rng, count: int = 5):
+    return [rng.random() for _ in range(count)]
+
+
+class TestSearchRandom(unittest.TestCase):
+    def test_seeded(self):
+        self.assertEqual(draws(SearchRandom(1)), draws(SearchRandom(1)))
+        self.assertNotEqual(draws(SearchRandom(1)), draws(SearchRandom(2)))
+        self.assertEqual(SearchRandom(3).initial_seed, 3)
+        self.assertIsInstance(SearchRandom().initial_seed, int)
+
+    def test_spawn(self):
+        # The same seed spawns the same streams, whatever the generator is used
+        # for in between, and whether they are spawned together or one by one
+        rng = SearchRandom(4)
+        together = [draws(stream) for stream in rng.spawn(3)]
+
+        rng = SearchRandom(4)
+        one_by_one = []
+        for _ in range(3):
+            draws(rng, 100)
+            one_by_one.extend(draws(stream) for stream in rng.spawn())
+
+        self.assertEqual(together, one_by_one)
+
+    def test_independent(self):
+        # Spawned streams differ from each other, from their parent and from
+        # the streams of other seeds
+        rng = SearchRandom(5)
+        streams = [draws(rng)] + [draws(stream) for stream in rng.spawn(3)] + [draws(stream) for stream in SearchRandom(6).spawn(3)]
+        self.assertEqual(len({tuple(stream) for stream in streams}), 7)
+        self.assertEqual(len({stream.initial_seed for stream in SearchRandom(5).spawn(100)}), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
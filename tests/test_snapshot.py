@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import os
+import tempfile
+import unittest
+from collections import Counter, defaultdict
+
+from mcts.mcts import MCTSAgent, Node
+from mcts.snapshot import TreeSnapshot, save_tree
+from mcts.state import TIES
+from mcts.ttt import BitboardTicTacToeState
+
+
+class Colliding(BitboardTicTacToeState):
+    """Tic Tac Toe states whose hashes all collide."""
+
+    def __hash__(self) -> int:
+        return 0
+
+
+def colliding(*moves) -> Colliding:
+    state = BitboardTicTacToeState()
+    for move in moves:
+        state = state.next_move(state.current_player, move)
+    return Colliding(state.boards, state.players, state.turn)
+
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "tree.bin")
+
+        agent = MCTSAgent(iterations=500, seed=9)
+        agent.reset(BitboardTicTacToeState())
+        agent.search()
+        self.root = agent.curr_node
+
+    def test_round_trip(self):
+        # Every node is saved with its win counts, ties included, and can be
+        # found by index or by state. Transposed positions appear at several
+        # nodes, and a state finds any one of them.
+        count = save_tree(self.root, self.path, self.root.state.players)
+        self.assertEqual(count, self.root.count_nodes())
+
+        with TreeSnapshot(self.path) as snapshot:
+            self.assertEqual(len(snapshot), count)
+            self.assertEqual(snapshot.players, ("X", "O"))
+
+            indices = defaultdict(set)
+            stack = [(self.root, 0)]
+            while stack:
+                node, index = stack.pop()
+                indices[node.state].add(index)
+                self.assertEqual(snapshot.scores(index), +node.scores)
+
+                children = snapshot.children(index)
+                self.assertEqual(children.keys(), node.children.keys())
+                stack.extend((child, children[move]) for move, child in node.children.items())
+
+            self.assertEqual(sum(map(len, indices.values())), count)
+            for state, found in indices.items():
+                index = snapshot.find(state)
+                self.assertIn(index, found)
+                self.assertEqual(snapshot.lookup(state), snapshot.scores(index))
+
+    def test_unknown_state(self):
+        save_tree(self.root, self.path, self.root.state.players)
+
+        # A full board is never in a tree searched from the empty board
+        state = BitboardTicTacToeState()
+        for move in ("A0", "B0", "C0", "A1", "B1", "C1", "A2", "B2", "C2"):
+            if state.outcome.is_decided:
+                break
+            state = state.next_move(state.current_player, move)
+
+        with TreeSnapshot(self.path) as snapshot:
+            self.assertIsNone(snapshot.find(state))
+            self.assertEqual(snapshot.lookup(state), {})
+
+    def test_collisions(self):
+        # States are only found under their own statistics, even when their
+        # hashes collide
+        root = Node(colliding(), scores=Counter({"X": 3, TIES: 1}))
+        for i, move in enumerate(("A0", "B1", "C2")):
+            child = root.children[move] = Node(colliding(move), scores=Counter({"O": i + 1}), parent=root)
+            child.move = move
+        save_tree(root, self.path, ("X", "O"))
+
+        with TreeSnapshot(self.path) as snapshot:
+            self.assertEqual(snapshot.lookup(colliding()), Counter({"X": 3, TIES: 1}))
+            for i, move in enumerate(("A0", "B1", "C2")):
+                self.assertEqual(snapshot.find(colliding(move)), snapshot.children(0)[move])
+                self.assertEqual(snapshot.lookup(colliding(move)), Counter({"O": i + 1}))
+
+            self.assertIsNone(snapshot.find(colliding("A2")))
+            self.assertEqual(snapshot.lookup(colliding("A2")), {})
+
+    def test_invalid_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a snapshot" * 4)
+
+        with self.assertRaises(ValueError):
+            TreeSnapshot(self.path)
+
+    def test_warm_start(self):
+        # New nodes for saved states start with the saved statistics
+        save_tree(self.root, self.path, self.root.state.players)
+
+        with TreeSnapshot(self.path) as snapshot:
+            agent = MCTSAgent(iterations=1, seed=10, snapshot=snapshot)
+            agent.reset(BitboardTicTacToeState())
+            self.assertEqual(agent.curr_node.scores, +self.root.scores)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import unittest
+
+import mcts
+from mcts.state import AbstractState, Undecided
+
+# Prints the hash of a state in a new process
+SCRIPT = "from tests.test_state import Counting; print(hash(Counting(7)))"
+
+
+class Counting(AbstractState):
+    """A game that only counts its moves, keeping the default hash."""
+
+    def __init__(self, count):
+        self.count = count
+
+    outcome = Undecided()
+    current_player = "X"
+
+    def possible_moves(self):
+        return [1]
+
+    def next_move(self, player, move):
+        return Counting(self.count + move)
+
+    def __eq__(self, value):
+        return isinstance(value, Counting) and self.count == value.count
+
+    def __str__(self):
+        return f"count {self.count}"
+
+
+class TestDefaultHash(unittest.TestCase):
+    def test_hashable(self):
+        # Defining __eq__ does not make states unhashable
+        self.assertEqual(hash(Counting(3)), hash(Counting(2).next_move("X", 1)))
+        self.assertNotEqual(hash(Counting(3)), hash(Counting(4)))
+        self.assertEqual(len({Counting(1), Counting(1), Counting(2)}), 2)
+
+    def test_stable_across_processes(self):
+        # The hash does not depend on the string hashing seed of the process
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        path = os.pathsep.join([os.path.dirname(os.path.dirname(mcts.__file__)), root])
+        hashes = set()
+        for seed in ("1", "2"):
+            env = dict(os.environ, PYTHONHASHSEED=seed, PYTHONPATH=path)
+            output = subprocess.run([sys.executable, "-c", SCRIPT], env=env, capture_output=True, text=True, check=True).stdout
+            hashes.add(int(output))
+        self.assertEqual(hashes, {hash(Counting(7))})
+
+
+if __name__ == "__main__":
+    unittest.main()
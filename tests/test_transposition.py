@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import unittest
+
+from mcts.mcts import MCTSAgent
+from mcts.transposition import TranspositionTable
+from mcts.ttt import BitboardTicTacToeState
+
+
+class Colliding(BitboardTicTacToeState):
+    """Tic Tac Toe states whose hashes all collide."""
+
+    def __hash__(self) -> int:
+        return 0
+
+
+def position(moves, cls=BitboardTicTacToeState):
+    state = BitboardTicTacToeState()
+    for move in moves:
+        state = state.next_move(state.current_player, move)
+    return cls(state.boards, state.players, state.turn)
+
+
+class TestTranspositionTable(unittest.TestCase):
+    def test_transpositions(self):
+        # Move orders reaching the same position share their statistics
+        table = TranspositionTable()
+        a = table.lookup(position(("A0", "B1", "C2")))
+        b = table.lookup(position(("C2", "B1", "A0")))
+        self.assertIs(a, b)
+        self.assertEqual((table.hits, table.misses, len(table)), (1, 1, 1))
+
+    def test_collisions(self):
+        # Positions whose hashes collide are kept apart
+        table = TranspositionTable()
+        a = position(("A0",), Colliding)
+        b = position(("B1",), Colliding)
+        self.assertEqual(hash(a), hash(b))
+
+        self.assertIsNot(table.lookup(a), table.lookup(b))
+        self.assertEqual(len(table), 2)
+        self.assertIs(table.lookup(a), table.lookup(position(("A0",), Colliding)))
+
+    def test_symmetric(self):
+        # Rotations and reflections share statistics only in a symmetric table
+        corners = [position((move,)) for move in ("A0", "C0", "A2", "C2")]
+        table = TranspositionTable()
+        symmetric = TranspositionTable(symmetric=True)
+        for state in corners:
+            table.lookup(state)
+            symmetric.lookup(state)
+
+        self.assertEqual(len(table), 4)
+        self.assertEqual(len(symmetric), 1)
+        self.assertNotIn(position(("B1",)), symmetric)
+
+    def test_max_size(self):
+        # The least recently used position is dropped
+        table = TranspositionTable(max_size=2)
+        a, b, c = (position((move,)) for move in ("A0", "B1", "C2"))
+        table.lookup(a)
+        table.lookup(b)
+        table.lookup(a)
+        table.lookup(c)
+        self.assertEqual((a in table, b in table, c in table), (True, False, True))
+
+    def test_search(self):
+        # Every position searched has one entry
+        table = TranspositionTable()
+        agent = MCTSAgent(iterations=300, seed=1, table=table)
+        agent.reset(BitboardTicTacToeState())
+        agent.search()
+
+        states = set()
+        stack = [agent.curr_node]
+        while stack:
+            node = stack.pop()
+            states.add(node.state)
+            self.assertIs(node.scores, table.lookup(node.state))
+            stack.extend(node.children.values())
+        self.assertEqual(len(table), len(states))
+
+
+if __name__ == "__main__":
+    unittest.main()
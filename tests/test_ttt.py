@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import unittest
+
+from mcts.ttt import BitboardTicTacToeState, TicTacToeState
+
+def positions():
+    """Every reachable position, as pairs of equal states of both classes."""
+    seen = set()
+    stack = [(TicTacToeState(), BitboardTicTacToeState())]
+    while stack:
+        state, bitboard = stack.pop()
+        if bitboard in seen:
+            continue
+        seen.add(bitboard)
+        yield state, bitboard
+
+        for move in state.possible_moves():
+            player = state.current_player
+            stack.append((state.next_move(player, move), bitboard.next_move(player, move)))
+
+
+def describe(outcome):
+    return "undecided" if outcome.is_undecided else "tie" if outcome.is_tie else outcome.winner
+
+
+class TestTicTacToeState(unittest.TestCase):
+    def test_sibling_players(self):
+        # Sibling states once shared their parent's players iterator, so
+        # every other sibling had the wrong player to move
+        state = TicTacToeState()
+        children = [state.next_move("X", move) for move in state.possible_moves()]
+
+        self.assertEqual(state.current_player, "X")
+        self.assertEqual([child.current_player for child in children], ["O"] * len(children))
+
+        grandchildren = [child.next_move("O", move) for child in children[:3] for move in child.possible_moves()]
+        self.assertEqual({grandchild.current_player for grandchild in grandchildren}, {"X"})
+
+    def test_invalid_moves(self):
+        state = TicTacToeState()
+        for move in ("", "A", "A3", "D0", "a0", "A00", None, 4):
+            with self.subTest(move=move):
+                with self.assertRaises(ValueError):
+                    state.next_move("X", move)
+
+        with self.assertRaises(ValueError):
+            state.next_move("X", "A0").next_move("O", "A0")
+
+
+class TestBitboardTicTacToeState(unittest.TestCase):
+    def test_matches_ticktacktoe_state(self):
+        # Both classes agree on every reachable position
+        count = 0
+        for state, bitboard in positions():
+            count += 1
+            self.assertEqual(state.rows, bitboard.rows)
+            self.assertEqual(describe(state.outcome), describe(bitboard.outcome), repr(state))
+            self.assertEqual(state.current_player, bitboard.current_player)
+            self.assertEqual(sorted(state.possible_moves()), sorted(bitboard.possible_moves()))
+            self.assertEqual(sorted(state.legal_move_indices()), sorted(bitboard.legal_move_indices()))
+
+        self.assertEqual(count, 5478)
+
+    def test_equal_states_hash_equally(self):
+        # Transpositions reached by different move orders are equal
+        a = BitboardTicTacToeState().next_move("X", "A0").next_move("O", "B1").next_move("X", "C2")
+        b = BitboardTicTacToeState().next_move("X", "C2").next_move("O", "B1").next_move("X", "A0")
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertEqual(a, BitboardTicTacToeState(a.boards, a.players, a.turn))
+
+
+class TestCanonical(unittest.TestCase):
+    def test_canonical_forms(self):
+        # Positions fold into the 765 classes of Tic Tac Toe under the
+        # symmetries of the board, with the same classes for both states
+        for index in (0, 1):
+            with self.subTest(state=("TicTacToeState", "BitboardTicTacToeState")[index]):
+                canonical = {pair[index].canonical()[0] for pair in positions()}
+                self.assertEqual(len(canonical), 765)
+
+    def test_move_mapping(self):
+        # Moves map to equivalent moves of the canonical state and back
+        for state, bitboard in positions():
+            for s in (state, bitboard):
+                canonical, symmetry = s.canonical()
+                self.assertEqual(canonical.canonical()[0], canonical)
+                for index in s.legal_move_indices():
+                    mapped = s.to_canonical_index(index, symmetry)
+                    self.assertEqual(s.from_canonical_index(mapped, symmetry), index)
+                    self.assertEqual(s.apply_unchecked(index).canonical()[0], canonical.apply_unchecked(mapped).canonical()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()